@@ -0,0 +1,160 @@
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from multiprocessing import Pool
+import contextlib
+import io
+import json
+import random
+import shutil
+import tempfile
+import time
+from functions.product_manager import save_products, load_products
+from functions.order_manager import add_order, load_orders
+from functions.category_manager import update_category_name, resolve_category_names
+
+
+def _quietly(fn, *args, **kwargs):
+    """Call fn with its progress prints swallowed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+# ---------------- Concurrent order placement ----------------
+
+def _stress_worker(job: Tuple[str, int, int, int]) -> int:
+    data_dir, worker_no, n_orders, n_products = job
+    orders_path = Path(data_dir) / "orders.json"
+    products_path = Path(data_dir) / "product_catalog.json"
+    rng = random.Random(worker_no)
+    placed = 0
+    for _ in range(n_orders):
+        items = [{"product_id": rng.randint(1, n_products), "qty": rng.randint(1, 3)}]
+        order = _quietly(add_order, items, customer_id=worker_no + 1,
+                         orders_path=orders_path, products_path=products_path)
+        if order:
+            placed += 1
+    return placed
+
+
+def stress_order_placement(
+    *,
+    workers: int = 4,
+    orders_per_worker: int = 100,
+    products: int = 5,
+    stock: int = 100,
+    data_dir: Optional[Path] = None
+) -> Dict:
+    """
+    Place orders from `workers` parallel processes against one shared catalog
+    whose total stock is smaller than the demand, then check that no unit was
+    sold twice: for every product, initial stock == final stock + units ordered,
+    and no stock is negative.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(data_dir or tmp)
+        products_path = base / "product_catalog.json"
+        orders_path = base / "orders.json"
+        save_products([
+            {"product_id": pid, "name": f"Stress product {pid}", "price": 1.0,
+             "product_stock": stock, "product_total_ordered": 0, "category_id": None, "category_name": None}
+            for pid in range(1, products + 1)
+        ], products_path)
+
+        jobs = [(str(base), w, orders_per_worker, products) for w in range(workers)]
+        started = time.perf_counter()
+        with Pool(workers) as pool:
+            placed = sum(pool.map(_stress_worker, jobs))
+        elapsed = time.perf_counter() - started
+
+        ordered = {pid: 0 for pid in range(1, products + 1)}
+        orders = load_orders(orders_path)
+        for o in orders:
+            for li in o.get("items", []):
+                ordered[int(li["product_id"])] += int(li["qty"])
+        final = {int(p["product_id"]): int(p.get("product_stock", 0)) for p in load_products(products_path)}
+
+    negative = [pid for pid, s in final.items() if s < 0]
+    mismatched = [pid for pid in ordered if final.get(pid, 0) + ordered[pid] != stock]
+    return {
+        "workers": workers,
+        "attempted": workers * orders_per_worker,
+        "placed": placed,
+        "orders_on_file": len(orders),
+        "units_sold": sum(ordered.values()),
+        "units_available": products * stock,
+        "oversold": bool(negative or mismatched or len(orders) != placed),
+        "seconds": round(elapsed, 3),
+        "orders_per_sec": round(workers * orders_per_worker / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+# ---------------- Category rename propagation ----------------
+
+def _legacy_rename(category_id: int, new_name: str, categories_path: Path, products_path: Path) -> None:
+    """The pre-index behaviour: save categories, then load, patch and save every product."""
+    with categories_path.open("r", encoding="utf-8") as f:
+        categories = json.load(f)
+    for c in categories:
+        if c["category_id"] == category_id:
+            c["name"] = new_name
+    with categories_path.open("w", encoding="utf-8") as f:
+        json.dump(categories, f, indent=2)
+    products = load_products(products_path)
+    for product in products:
+        try:
+            if int(product.get("category_id", -1)) == category_id:
+                product["category_name"] = new_name
+        except (TypeError, ValueError):
+            continue
+    save_products(products, products_path)
+
+
+def bench_category_rename(
+    *,
+    products: int = 20000,
+    categories: int = 50,
+    backend: str = "json",
+    data_dir: Optional[Path] = None
+) -> Dict:
+    """
+    Rename one category whose products are 1/categories of the catalog and time:
+      full_rewrite  the old behaviour (every product loaded and saved)
+      batch         update_category_name: only the category's products, one Transaction
+      lazy          update_category_name(propagate=False) + resolve_category_names on one full read
+    Each strategy starts from an identical copy of the data. backend is "json" or "db".
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(data_dir or tmp)
+        seed_dir = base / "seed"
+        seed_dir.mkdir(parents=True, exist_ok=True)
+        cats = [{"category_id": cid, "name": f"Category {cid}", "parent_id": None} for cid in range(1, categories + 1)]
+        (seed_dir / "category_catalog.json").write_text(json.dumps(cats), encoding="utf-8")
+        _quietly(save_products, [
+            {"product_id": pid, "name": f"Product {pid}", "price": 1.0, "product_stock": 10,
+             "category_id": pid % categories + 1, "category_name": f"Category {pid % categories + 1}"}
+            for pid in range(1, products + 1)
+        ], seed_dir / f"product_catalog.{backend}")
+
+        timings: Dict[str, float] = {}
+        for strategy in ("full_rewrite", "batch", "lazy"):
+            run_dir = base / strategy
+            shutil.copytree(seed_dir, run_dir)
+            categories_path = run_dir / "category_catalog.json"
+            products_path = run_dir / f"product_catalog.{backend}"
+            started = time.perf_counter()
+            if strategy == "full_rewrite":
+                _legacy_rename(1, "Renamed", categories_path, products_path)
+            elif strategy == "batch":
+                _quietly(update_category_name, 1, "Renamed", path=categories_path, products_path=products_path)
+            else:
+                _quietly(update_category_name, 1, "Renamed", path=categories_path,
+                         products_path=products_path, propagate=False)
+                resolve_category_names(load_products(products_path), categories_path)
+            timings[strategy] = round(time.perf_counter() - started, 4)
+
+    return {
+        "products": products,
+        "renamed_products": len(range(categories, products + 1, categories)),
+        "backend": backend,
+        "seconds": timings,
+    }
@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import threading
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, size, inode) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileCache:
+    """
+    In-process cache of parsed data files, keyed on the resolved path.
+
+    An entry is reused only while the file's (mtime, size, inode) signature is
+    unchanged, so writes from another process are picked up automatically.
+    Saves in this process also call invalidate() explicitly (see journal.py),
+    which covers filesystems with coarse mtimes.
+
+    Structures derived from a file (sort keys, trees, lookup maps) are cached
+    under the same path with a `tag`, so they are rebuilt once per version of
+    the file and dropped along with it.
+    """
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(Path(path).resolve())
+
+    @staticmethod
+    def _signature(path: Path, depends_on: Iterable[Path]) -> Optional[Tuple]:
+        sig = file_signature(path)
+        if sig is not None and depends_on:
+            sig = (sig,) + tuple(file_signature(Path(d)) for d in depends_on)
+        return sig
+
+    def get(self, path: Path, loader: Callable[[Path], Any], tag: str = "", depends_on: Iterable[Path] = ()) -> Any:
+        """
+        Return loader(path), parsing the file again only if it changed since the last call.
+        A derived entry that also reads other files lists them in depends_on.
+        """
+        key = (self._key(path), tag)
+        # take the signature before loading: if the file changes mid-read the
+        # next call sees a different signature and reloads
+        sig = self._signature(path, depends_on)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and sig is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        data = loader(path)
+        if sig is not None:
+            with self._lock:
+                self._entries[key] = (sig, data)
+        return data
+
+    def put(self, path: Path, data: Any, tag: str = "", depends_on: Iterable[Path] = ()) -> None:
+        """
+        Store data as current for path's present version. For writers that derive the
+        new value from the old one instead of reloading (call right after the write).
+        """
+        sig = self._signature(path, depends_on)
+        if sig is not None:
+            with self._lock:
+                self._entries[(self._key(path), tag)] = (sig, data)
+
+    def peek(self, path: Path, tag: str = "", depends_on: Iterable[Path] = ()) -> Any:
+        """The cached data for path if it is still current, else None. Never loads."""
+        sig = self._signature(path, depends_on)
+        with self._lock:
+            entry = self._entries.get((self._key(path), tag))
+            if entry is not None and sig is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        """Drop one file's entries (including derived ones), or everything when path is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                key = self._key(path)
+                for k in [k for k in self._entries if k[0] == key]:
+                    del self._entries[k]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Shared by every manager module
+file_cache = FileCache()
+
+
+def copy_records(records: list) -> list:
+    """
+    Per-record copy of a cached list so callers can edit fields and append/remove
+    records without touching the cache. Nested values (addresses, order items)
+    are shared: replace them rather than editing them in place.
+    """
+    return [dict(r) if isinstance(r, dict) else r for r in records]
+
+def _read_json_list(path: Path) -> List:
+    if not path.exists():
+        return []
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (json.JSONDecodeError, OSError):
+        return []
+
+def cached_json_list(path: Path) -> List[Dict]:
+    """A JSON array file as a list of records, served from the cache when unchanged."""
+    return copy_records(file_cache.get(Path(path), _read_json_list))
+
+def cache_stats() -> Dict[str, int]:
+    return file_cache.stats()
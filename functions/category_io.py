@@ -0,0 +1,211 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Iterator, Tuple, Union, IO
+from collections import deque
+import csv
+import json
+from functions.category_manager import (
+    Category, DEFAULT_CATEGORIES_PATH, get_category_tree, _load_categories, _save_categories, _next_category_id, _name_key,
+)
+from functions.sequences import reserve_ids
+
+CSV_FIELDS = ("category_id", "name", "parent_id")
+
+# A row to import: (key, name, parent key or None). Keys are only meaningful inside the source.
+Row = Tuple[str, str, Optional[str]]
+
+
+# ---------------- Reading sources ----------------
+
+def _rows_from_nested(nodes: list, parent: Optional[str], rows: List[Row], errors: List[str]) -> None:
+    """
+    Flatten nested JSON: [{"name": ..., "children": [...]}, ...]. The shape written by
+    export_category_tree / list_category_tree ({"node": {...}, "children": [...]}) is accepted too.
+    """
+    pending = deque((node, parent) for node in nodes)
+    while pending:
+        node, parent_key = pending.popleft()
+        if not isinstance(node, dict):
+            errors.append(f"Malformed node under {parent_key or 'the root'}: expected an object.")
+            continue
+        fields = node.get("node") if isinstance(node.get("node"), dict) else node
+        key = f"#{len(rows) + 1}"
+        rows.append((key, str(fields.get("name", "")).strip(), parent_key))
+        children = node.get("children") or []
+        if not isinstance(children, list):
+            errors.append(f"'children' of '{fields.get('name', '')}' must be a list.")
+            continue
+        pending.extend((child, key) for child in children)
+
+def _rows_from_csv(f: IO[str], rows: List[Row], errors: List[str]) -> None:
+    """CSV with a header: category_id,name,parent_id (ids local to the file; parent_id empty for top level)."""
+    reader = csv.DictReader(f)
+    missing = [c for c in CSV_FIELDS if c not in (reader.fieldnames or [])]
+    if missing:
+        errors.append(f"CSV header is missing: {', '.join(missing)}.")
+        return
+    for line_no, record in enumerate(reader, start=2):
+        key = str(record.get("category_id") or "").strip()
+        if not key:
+            errors.append(f"Line {line_no}: category_id is required.")
+            continue
+        parent = str(record.get("parent_id") or "").strip() or None
+        rows.append((key, str(record.get("name") or "").strip(), parent))
+
+def read_category_source(source: Union[Path, str]) -> Tuple[List[Row], List[str]]:
+    """Parse a .json (nested) or .csv (flat, id/parent_id) taxonomy into rows + errors."""
+    source = Path(source)
+    rows: List[Row] = []
+    errors: List[str] = []
+    if source.suffix.lower() == ".csv":
+        with source.open("r", encoding="utf-8", newline="") as f:
+            _rows_from_csv(f, rows, errors)
+        return rows, errors
+    try:
+        with source.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        return [], [f"Cannot read {source}: {e}"]
+    if isinstance(data, dict) and isinstance(data.get("categories"), list):
+        data = data["categories"]
+    if not isinstance(data, list):
+        return [], ["Expected a JSON list of top-level categories."]
+    _rows_from_nested(data, None, rows, errors)
+    return rows, errors
+
+
+# ---------------- Import ----------------
+
+def import_category_tree(
+    source: Union[Path, str],
+    *,
+    under: Optional[int] = None,
+    merge_existing: bool = False,
+    path: Path = DEFAULT_CATEGORIES_PATH
+) -> Dict:
+    """
+    Import a whole taxonomy in one pass and one write.
+
+    Top-level source categories go under `under` (None => top level). Names must be
+    unique per parent, case-insensitively, both within the source and against the
+    categories already there; with merge_existing=True an existing sibling of the
+    same name is reused instead (its children are matched the same way).
+    Unknown parents and parent_id cycles (CSV) are reported. Any error cancels the
+    import and nothing is written.
+
+    Returns {"added": [category dict, ...], "merged": int, "errors": [str, ...]}.
+    """
+    report: Dict = {"added": [], "merged": 0, "errors": []}
+    rows, errors = read_category_source(source)
+    tree = get_category_tree(path)
+    under = int(under) if under is not None else None
+    if under is not None and under not in tree.by_id:
+        errors.append(f"Parent category {under} not found.")
+
+    by_key: Dict[str, Row] = {}
+    children: Dict[Optional[str], List[Row]] = {}
+    for row in rows:
+        key, name, parent = row
+        if key in by_key:
+            errors.append(f"Duplicate category_id {key} in source.")
+            continue
+        if not name:
+            errors.append(f"Category {key} has no name.")
+        by_key[key] = row
+        children.setdefault(parent, []).append(row)
+    for parent in children:
+        if parent is not None and parent not in by_key:
+            errors.append(f"Unknown parent_id {parent} (used by {len(children[parent])} categories).")
+
+    # Walk from the roots; each node is visited once, so anything left over sits on a cycle.
+    # A node's parent is ("id", real id) if it already exists, or ("new", source key).
+    seen_names = set()
+    placed: Dict[str, Tuple[str, Union[int, str]]] = {}
+    new_rows: List[Tuple[str, str, Tuple[str, Union[int, str]]]] = []
+    pending = deque((row, ("id", under)) for row in children.get(None, []))
+    while pending:
+        (key, name, _), parent = pending.popleft()
+        folded = _name_key(name)
+        if (parent, folded) in seen_names:
+            errors.append(f"Duplicate name '{name}' under the same parent in source.")
+            continue
+        seen_names.add((parent, folded))
+        match = tree.find_child(parent[1], name) if parent[0] == "id" else None
+        if match is not None and not merge_existing:
+            errors.append(f"'{name}' already exists under this parent (id={match}).")
+            continue
+        if match is not None:
+            placed[key] = ("id", match)
+            report["merged"] += 1
+        else:
+            placed[key] = ("new", key)
+            new_rows.append((key, name, parent))
+        pending.extend((child, placed[key]) for child in children.get(key, []))
+
+    cyclic = [key for key in by_key if key not in placed and by_key[key][2] in by_key]
+    if cyclic and not errors:
+        errors.append(f"parent_id cycle involving categories {', '.join(sorted(cyclic)[:10])}.")
+
+    if errors:
+        report["errors"] = errors
+        print(f"Import cancelled: {len(errors)} problem(s) found.")
+        return report
+
+    categories, wrapped = _load_categories(path)
+    ids = reserve_ids(path, len(new_rows), seed=lambda: _next_category_id(categories)) if new_rows else []
+    real_id = dict(zip((key for key, _, _ in new_rows), ids))
+    for (key, name, parent), new_id in zip(new_rows, ids):
+        parent_id = parent[1] if parent[0] == "id" else real_id[parent[1]]
+        category = Category(category_id=new_id, name=name, parent_id=parent_id)
+        categories.append(category)
+        report["added"].append(category.to_dict())
+    if new_rows:
+        _save_categories(categories, wrapped, path)
+    print(f"Imported {len(new_rows)} categories ({report['merged']} matched existing).")
+    return report
+
+
+# ---------------- Export ----------------
+
+def iter_category_rows(path: Path = DEFAULT_CATEGORIES_PATH, start_at: int = 10) -> Iterator[Dict]:
+    """Every category in display (pre-)order as {category_id, name, parent_id, display_code, depth}."""
+    tree = get_category_tree(path, start_at)
+    depth: Dict[Optional[int], int] = {}
+    for cid in tree.preorder:
+        c = tree.by_id[cid]
+        depth[cid] = depth.get(c.parent_id, -1) + 1
+        yield {**c.to_dict(), "display_code": tree.code_for(cid), "depth": depth[cid]}
+
+def export_category_tree(destination: Union[Path, str], *, path: Path = DEFAULT_CATEGORIES_PATH) -> int:
+    """
+    Write the taxonomy to .csv (category_id,name,parent_id) or nested .json
+    ([{"category_id", "name", "children": [...]}]), one category at a time.
+    Both formats can be read back by import_category_tree. Returns the count.
+    """
+    destination = Path(destination)
+    count = 0
+    with destination.open("w", encoding="utf-8", newline="") as f:
+        if destination.suffix.lower() == ".csv":
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for row in iter_category_rows(path):
+                writer.writerow({**row, "parent_id": "" if row["parent_id"] is None else row["parent_id"]})
+                count += 1
+            return count
+
+        # nested JSON, streamed: a node's "children" list stays open until a
+        # row at the same or a shallower depth arrives
+        f.write("[")
+        open_nodes = 0
+        need_comma = False
+        for row in iter_category_rows(path):
+            while open_nodes > row["depth"]:
+                f.write("]}")
+                open_nodes -= 1
+                need_comma = True
+            head = json.dumps({"category_id": row["category_id"], "name": row["name"]}, ensure_ascii=False)
+            f.write(("," if need_comma else "") + head[:-1] + ', "children": [')
+            open_nodes += 1
+            need_comma = False
+            count += 1
+        f.write("]}" * open_nodes + "]\n")
+    return count
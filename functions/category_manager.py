@@ -1,8 +1,17 @@
 import os
 from typing import List, Dict, Tuple, Optional, Iterable, Set
 from pathlib import Path
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
+import itertools
 import json
-from functions.product_manager import load_products, save_products
+from functions.product_manager import load_products, save_products, stage_product_updates, tracking_product_changes
+from functions.product_store import get_product_store, _category_id
+from functions.product_sort import _safe_int, _safe_float
+from functions.journal import atomic_write_json, Transaction
+from functions.cache import file_cache, file_signature
+from functions.sequences import next_id
 from env import DEFAULT_PRODUCT_PATH, DEFAULT_CATEGORIES_PATH, DEFAULT_CUSTOMER_PATH
    
 # Resolve storage
@@ -46,7 +55,7 @@ class Category:
 
 # Import products helpers for propagation / checks
 
-def _load_categories(path: Path = DEFAULT_CATEGORIES_PATH) -> Tuple[List[Category], bool]:
+def _parse_categories(path: Path) -> Tuple[List[Category], bool]:
     """
     Returns (categories, wrapped). If file missing/invalid: ([], False).
     Supports legacy shapes:
@@ -82,10 +91,463 @@ def _load_categories(path: Path = DEFAULT_CATEGORIES_PATH) -> Tuple[List[Categor
             continue
     return out, wrapped
 
+def _load_categories(path: Path = DEFAULT_CATEGORIES_PATH) -> Tuple[List[Category], bool]:
+    """Cached _parse_categories; returns fresh Category objects so callers may edit them."""
+    categories, wrapped = file_cache.get(path, _parse_categories)
+    return [Category(c.category_id, c.name, c.parent_id) for c in categories], wrapped
+
+def _categories_payload(categories: List[Category], wrapped: bool):
+    return {"categories": [c.to_dict() for c in categories]} if wrapped else [c.to_dict() for c in categories]
+
 def _save_categories(categories: List[Category], wrapped: bool, path: Path = DEFAULT_CATEGORIES_PATH) -> None:
-    payload = {"categories": [c.to_dict() for c in categories]} if wrapped else [c.to_dict() for c in categories]
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    atomic_write_json(path, _categories_payload(categories, wrapped))
+
+# =============== Materialised tree ===============
+
+DEFAULT_CODE_START = 10
+
+# (category_id, old display code, new display code); None = no code before/after
+CodeMove = Tuple[int, Optional[str], Optional[str]]
+
+class CategoryTree:
+    """
+    View of one version of the category catalog, built once and cached until
+    the file changes (see get_category_tree); this process's own edits advance
+    it in place (see updated):
+      by_id        {category_id: Category}
+      by_parent    {parent_id: [Category, ...]} siblings sorted by name
+      id_to_code   {category_id: '10.2'}  and  code_to_id {'10.2': category_id}
+      by_name      {(parent_id, casefolded name): category_id} for sibling uniqueness
+      preorder     category ids in depth-first (display) order
+      interval     {category_id: (pre, last)}: the category sits at preorder[pre]
+                   and its descendants fill preorder[pre+1 : last+1]
+    With the intervals, "is x under c" is a range comparison and a subtree
+    is one slice. The Category objects are shared: use _load_categories() to edit.
+    """
+    def __init__(self, categories: List[Category], start_at: int = 10):
+        self.start_at = start_at
+        self.by_id: Dict[int, Category] = {c.category_id: c for c in categories}
+        self.by_parent = _build_parent_index(categories)
+        self.by_name: Dict[Tuple[Optional[int], str], int] = {}
+        for c in categories:
+            self.by_name.setdefault((c.parent_id, _name_key(c.name)), c.category_id)
+        self.id_to_code: Dict[int, str] = {}
+        self.code_to_id: Dict[str, int] = {}
+        self._number(None, None)
+        self._index_intervals()
+
+    def _index_intervals(self) -> None:
+        self.preorder: List[int] = []
+        self.interval: Dict[int, Tuple[int, int]] = {}
+        # top-level categories first, then orphans whose parent is missing
+        roots = [c.category_id for c in self.children(None)]
+        roots += [c.category_id for c in self.by_id.values() if c.parent_id is not None and c.parent_id not in self.by_id]
+        for root in roots:
+            self._walk(root)
+
+    def _number(self, parent_id: Optional[int], prefix: Optional[str]) -> None:
+        """Depth-first numbering: top level start_at, start_at+1, ...; children prefix.1, prefix.2, ..."""
+        for n, c in enumerate(self.by_parent.get(parent_id, [])):
+            code = f"{self.start_at + n}" if prefix is None else f"{prefix}.{n + 1}"
+            self.id_to_code[c.category_id] = code
+            self.code_to_id[code] = c.category_id
+            self._number(c.category_id, code)
+
+    # ---------- incremental maintenance ----------
+
+    def _recode(self, category_id: int, code: str, moves: List[CodeMove]) -> None:
+        """Give category_id `code`; descend only while codes actually change."""
+        stack = [(category_id, code)]
+        while stack:
+            cid, code = stack.pop()
+            old = self.id_to_code.get(cid)
+            if old == code:
+                continue   # same code => its whole subtree keeps its codes too
+            if old is not None and self.code_to_id.get(old) == cid:
+                del self.code_to_id[old]
+            self.id_to_code[cid] = code
+            self.code_to_id[code] = cid
+            moves.append((cid, old, code))
+            stack.extend((k.category_id, f"{code}.{n + 1}") for n, k in enumerate(self.children(cid)))
+
+    def _renumber_siblings(self, parent_id: Optional[int], moves: List[CodeMove]) -> None:
+        prefix = None if parent_id is None else self.id_to_code.get(parent_id)
+        if parent_id is not None and prefix is None:
+            return   # parent has no code (orphaned subtree): neither do its children
+        for n, c in enumerate(self.children(parent_id)):
+            self._recode(c.category_id, f"{self.start_at + n}" if prefix is None else f"{prefix}.{n + 1}", moves)
+
+    def updated(self, change: Tuple) -> Tuple["CategoryTree", List[CodeMove]]:
+        """
+        Advance this tree in place by one edit and return it, plus the display codes that
+        moved as [(category_id, old_code, new_code), ...] (old None = added, new None = removed):
+          ("add", Category)  ("rename", category_id, new_name)  ("delete", category_id)
+        Only the edited sibling group is re-sorted, only subtrees whose code changed are
+        recoded, and only the pre-order positions from the edit on are shifted. The maps
+        are edited, not copied, so the tree for the previous version is gone: call this
+        only once that version has been superseded (see _advance_tree).
+        """
+        moves: List[CodeMove] = []
+        kind = change[0]
+        if kind == "add":
+            c = change[1]
+            self._insert_sibling(c)
+            self.by_id[c.category_id] = c
+            if self.children(c.category_id) or not self._place_leaf(c):
+                self._index_intervals()   # it adopts orphans, or hangs off one: walk again
+        else:
+            old = self.by_id[int(change[1])]
+            self.by_parent[old.parent_id] = [c for c in self.children(old.parent_id) if c.category_id != old.category_id]
+            if self.by_name.get((old.parent_id, _name_key(old.name))) == old.category_id:
+                del self.by_name[(old.parent_id, _name_key(old.name))]
+            if kind == "delete":
+                del self.by_id[old.category_id]
+                code = self.id_to_code.pop(old.category_id, None)
+                if code is not None:
+                    if self.code_to_id.get(code) == old.category_id:
+                        del self.code_to_id[code]
+                    moves.append((old.category_id, code, None))
+                if self.children(old.category_id):
+                    # its children are orphaned: they lose their codes and are walked again
+                    stack = [k.category_id for k in self.children(old.category_id)]
+                    while stack:
+                        cid = stack.pop()
+                        code = self.id_to_code.pop(cid, None)
+                        if code is None:
+                            continue
+                        if self.code_to_id.get(code) == cid:
+                            del self.code_to_id[code]
+                        moves.append((cid, code, None))
+                        stack.extend(k.category_id for k in self.children(cid))
+                    self._index_intervals()
+                elif not self._remove_leaf(old):
+                    self._index_intervals()
+            else:
+                c = Category(old.category_id, str(change[2]).strip(), old.parent_id)
+                self.by_id[c.category_id] = c   # keeps its place in by_id (orphan order)
+                self._insert_sibling(c)
+                if not self._move_subtree(c):
+                    self._index_intervals()
+        self._renumber_siblings(c.parent_id if kind == "add" else old.parent_id, moves)
+        return self, moves
+
+    def _insert_sibling(self, c: Category) -> None:
+        siblings = list(self.children(c.parent_id))
+        siblings.insert(bisect_right([s.name.casefold() for s in siblings], c.name.casefold()), c)
+        self.by_parent[c.parent_id] = siblings
+        self.by_name.setdefault((c.parent_id, _name_key(c.name)), c.category_id)
+
+    def _start_of(self, c: Category) -> Optional[int]:
+        """
+        Pre-order position where c's subtree begins, from its parent and the sibling sorted
+        before it (c's own block is ignored). None if c is not walked from a top-level category.
+        """
+        siblings = self.children(c.parent_id)
+        n = next(i for i, s in enumerate(siblings) if s is c)
+        if n:
+            before = self.interval.get(siblings[n - 1].category_id)
+            if before is None:
+                return None
+            end = before[1] + 1
+            own = self.interval.get(c.category_id)
+            return end - (own[1] - own[0] + 1) if own is not None and own[0] < end else end
+        if c.parent_id is None:
+            return 0
+        return self.interval[c.parent_id][0] + 1 if c.parent_id in self.interval else None
+
+    def _shift(self, start: int, by: int, ancestors_of: Optional[int]) -> None:
+        """Move positions start.. by `by` and stretch the intervals of ancestors_of and its ancestors."""
+        for pos in range(start, len(self.preorder)):
+            cid = self.preorder[pos]
+            pre, last = self.interval[cid]
+            self.interval[cid] = (pos, last + by)
+        seen = set()
+        while ancestors_of in self.interval and ancestors_of not in seen:
+            seen.add(ancestors_of)
+            pre, last = self.interval[ancestors_of]
+            self.interval[ancestors_of] = (pre, last + by)
+            ancestors_of = self.by_id[ancestors_of].parent_id
+
+    def _place_leaf(self, c: Category) -> bool:
+        """Give a new leaf its interval; False when the tree has to be walked again instead."""
+        if c.parent_id is not None and c.parent_id not in self.by_id:
+            return False   # a new orphan: orphans are walked in by_id order, after every top-level subtree
+        start = self._start_of(c)
+        if start is None:
+            return True    # under a parent_id cycle: no interval, like a fresh build
+        self.preorder.insert(start, c.category_id)
+        self._shift(start + 1, 1, c.parent_id)
+        self.interval[c.category_id] = (start, start)
+        return True
+
+    def _remove_leaf(self, c: Category) -> bool:
+        if c.parent_id is not None and c.parent_id not in self.by_id:
+            return False
+        if c.category_id not in self.interval:
+            return True
+        start = self.interval.pop(c.category_id)[0]
+        del self.preorder[start]
+        self._shift(start, -1, c.parent_id)
+        return True
+
+    def _move_subtree(self, c: Category) -> bool:
+        """After c moved within its sibling group, move its block: only positions in between shift."""
+        if c.parent_id is not None and c.parent_id not in self.by_id:
+            return False
+        if c.category_id not in self.interval:
+            return True
+        pre, last = self.interval[c.category_id]
+        to = self._start_of(c)
+        block = self.preorder[pre:last + 1]
+        del self.preorder[pre:last + 1]
+        self.preorder[to:to] = block
+        for pos in range(min(pre, to), max(pre, to) + len(block)):
+            cid = self.preorder[pos]
+            old_pre, old_last = self.interval[cid]
+            self.interval[cid] = (pos, pos + old_last - old_pre)
+        return True
+
+    def _walk(self, root: int) -> None:
+        """Assign pre-order intervals to root's subtree (iterative, so depth is unbounded)."""
+        stack = [(root, False)]
+        while stack:
+            cid, done = stack.pop()
+            if done:
+                self.interval[cid] = (self.interval[cid][0], len(self.preorder) - 1)
+                continue
+            if cid in self.interval:
+                continue
+            self.interval[cid] = (len(self.preorder), -1)
+            self.preorder.append(cid)
+            stack.append((cid, True))
+            stack.extend((k.category_id, False) for k in reversed(self.children(cid)))
+
+    def children(self, parent_id: Optional[int]) -> List[Category]:
+        return self.by_parent.get(parent_id, [])
+
+    def descendant_ids(self, category_id: int) -> Set[int]:
+        """All descendant ids of category_id (not including itself)."""
+        cid = int(category_id)
+        if cid in self.interval:
+            pre, last = self.interval[cid]
+            return set(self.preorder[pre + 1:last + 1])
+        # only reachable for ids inside a parent_id cycle
+        return _descendant_ids(list(self.by_id.values()), cid)
+
+    def is_within(self, category_id: int, root_id: int) -> bool:
+        """True if category_id is root_id or one of its descendants (a range check)."""
+        inner, outer = self.interval.get(int(category_id)), self.interval.get(int(root_id))
+        if inner is None or outer is None:
+            return int(category_id) == int(root_id) or int(category_id) in self.descendant_ids(root_id)
+        return outer[0] <= inner[0] <= outer[1]
+
+    def subtree_ids(self, category_id: int) -> Set[int]:
+        """category_id plus all its descendants."""
+        return self.descendant_ids(category_id) | {int(category_id)}
+
+    def find_child(self, parent_id: Optional[int], name: str) -> Optional[int]:
+        """Id of parent_id's child called `name` (case-insensitive), or None."""
+        return self.by_name.get((parent_id, _name_key(name)))
+
+    def id_for_path(self, names: Iterable[str]) -> Optional[int]:
+        """Follow names from the top level down: ["Clothing", "Men", "Shirts"] -> id."""
+        cid = None
+        for name in names:
+            cid = self.find_child(cid, name)
+            if cid is None:
+                return None
+        return cid
+
+    def path_for(self, category_id: int) -> List[str]:
+        """Names from the top level down to category_id ([] if unknown)."""
+        names: List[str] = []
+        c = self.by_id.get(int(category_id))
+        while c is not None and len(names) <= len(self.by_id):
+            names.append(c.name)
+            c = self.by_id.get(c.parent_id) if c.parent_id is not None else None
+        return names[::-1]
+
+    def code_for(self, category_id: int) -> str:
+        return self.id_to_code.get(int(category_id), "")
+
+    def id_for_code(self, code: str) -> Optional[int]:
+        return self.code_to_id.get(str(code).strip())
+
+
+def _build_tree(path: Path, start_at: int) -> CategoryTree:
+    if start_at == DEFAULT_CODE_START:
+        _publish_code_moves(path, None)   # rebuilt from the file: any code may have moved
+    return CategoryTree(file_cache.get(path, _parse_categories)[0], start_at)
+
+def get_category_tree(path: Path = DEFAULT_CATEGORIES_PATH, start_at: int = DEFAULT_CODE_START) -> CategoryTree:
+    """The CategoryTree for the catalog at `path`, rebuilt only when the file changes."""
+    path = Path(path)
+    return file_cache.get(path, lambda p: _build_tree(p, start_at), tag=f"tree:{start_at}")
+
+def _advance_tree(path: Path, before: CategoryTree, change: Tuple) -> None:
+    """
+    After this process saved `change`: advance `before` (the cached tree for the version
+    just replaced) to the current version, cache it and publish the codes that moved.
+    Trees for other start_at values are rebuilt on next use.
+    """
+    if before.start_at != DEFAULT_CODE_START:
+        return
+    after, moves = before.updated(change)
+    file_cache.put(Path(path), after, tag=f"tree:{after.start_at}")
+    _publish_code_moves(path, moves)
+
+
+# =============== Display-code change feed ===============
+# Every display-code move made by this process is numbered. A consumer that
+# caches anything keyed by code (menu pages, code-based filters) remembers the
+# last number it saw and asks category_code_changes(since=n) what moved, so it
+# only invalidates the affected subtrees. A None change list means the tree was
+# rebuilt from the file (first use, another process wrote, or the feed was
+# trimmed past `since`): drop everything.
+
+CODE_FEED_LIMIT = 1000
+_code_feed: Dict[str, deque] = {}
+_code_feed_seq = itertools.count(1)
+
+def _publish_code_moves(path: Path, moves: Optional[List[CodeMove]]) -> None:
+    feed = _code_feed.setdefault(str(Path(path).resolve()), deque(maxlen=CODE_FEED_LIMIT))
+    if moves is None:
+        feed.append((next(_code_feed_seq), None))
+    else:
+        for move in moves:
+            feed.append((next(_code_feed_seq), move))
+
+def category_code_changes(since: int = 0, path: Path = DEFAULT_CATEGORIES_PATH) -> Tuple[int, Optional[List[Dict]]]:
+    """
+    (latest sequence number, display-code moves after `since`) for the default
+    code numbering. Each move is {category_id, old_code, new_code}; None instead
+    of a list means "everything may have moved".
+    """
+    feed = _code_feed.get(str(Path(path).resolve()))
+    if not feed:
+        return since, ([] if since else None)
+    latest = feed[-1][0]
+    if since < feed[0][0] - 1:
+        return latest, None
+    changes: List[Dict] = []
+    for seq, move in feed:
+        if seq <= since:
+            continue
+        if move is None:
+            return latest, None
+        changes.append({"category_id": move[0], "old_code": move[1], "new_code": move[2]})
+    return latest, changes
+
+# =============== Rollups ===============
+# Per-category totals over the category's products and all its descendants'.
+# Built with one catalog pass per (catalog, category file) version; after that,
+# product writers wrap their write in track_rollups() so each changed product
+# only moves its contribution along its category's ancestor chain. They live in
+# the file cache under both files' signatures, so a write from another process
+# (which only updates its own copy) makes the next read here rebuild them.
+
+ROLLUP_FIELDS = ("product_count", "total_stock", "stock_value", "product_total_ordered")
+
+def _rollup_values(product: Dict) -> Tuple[int, int, float, int]:
+    stock = _safe_int(product.get("product_stock", product.get("stock")))
+    return 1, stock, _safe_float(product.get("price")) * stock, _safe_int(product.get("product_total_ordered"))
+
+class CategoryRollups:
+    """
+    totals {category_id: [product_count, total_stock, stock_value, product_total_ordered]},
+    each including every descendant category. `contributions` remembers what each product
+    added, so apply() can take it back out without the old record.
+    """
+    def __init__(self, products: Iterable[Dict], tree: CategoryTree):
+        self.tree = tree
+        self.totals: Dict[int, List] = {cid: [0, 0, 0.0, 0] for cid in tree.by_id}
+        self.contributions: Dict[int, Tuple[Optional[int], Tuple[int, int, float, int]]] = {}
+        for product in products:
+            self.apply(product.get("product_id"), product)
+
+    def _ancestry(self, category_id: Optional[int]) -> List[int]:
+        chain: List[int] = []
+        while category_id in self.tree.by_id and category_id not in chain:   # stops on parent_id cycles
+            chain.append(category_id)
+            category_id = self.tree.by_id[category_id].parent_id
+        return chain
+
+    def _add(self, category_id: Optional[int], values: Tuple, sign: int) -> None:
+        for cid in self._ancestry(category_id):
+            totals = self.totals[cid]
+            for i, v in enumerate(values):
+                totals[i] += sign * v
+
+    def apply(self, product_id, product: Optional[Dict]) -> None:
+        """Replace product_id's contribution with `product`'s (None: the product was deleted). O(depth)."""
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return
+        old = self.contributions.pop(product_id, None)
+        if old is not None:
+            self._add(old[0], old[1], -1)
+        if product is not None:
+            new = (_category_id(product), _rollup_values(product))
+            self.contributions[product_id] = new
+            self._add(new[0], new[1], 1)
+
+    def get(self, category_id: int) -> Dict:
+        totals = self.totals.get(int(category_id), [0, 0, 0.0, 0])
+        rollup = dict(zip(ROLLUP_FIELDS, totals))
+        rollup["stock_value"] = round(rollup["stock_value"], 2)
+        return rollup
+
+
+# products path -> category files whose rollups over that catalog have been built
+_rollup_views: Dict[str, Set[Path]] = {}
+
+def _rollup_tag(categories_path: Path) -> str:
+    return f"rollups:{Path(categories_path).resolve()}"
+
+def get_category_rollups(path: Path = DEFAULT_CATEGORIES_PATH, products_path: Path = DEFAULT_PRODUCT_PATH) -> CategoryRollups:
+    """The rollups for this catalog and category file (don't modify)."""
+    path, products_path = Path(path), Path(products_path)
+    _rollup_views.setdefault(str(products_path.resolve()), set()).add(path)
+    return file_cache.get(
+        products_path,
+        lambda p: CategoryRollups(get_product_store(p).load_all(), get_category_tree(path)),
+        tag=_rollup_tag(path),
+        depends_on=(path,),
+    )
+
+def category_rollup(category_id: int, *, path: Path = DEFAULT_CATEGORIES_PATH, products_path: Path = DEFAULT_PRODUCT_PATH) -> Dict:
+    """{product_count, total_stock, stock_value, product_total_ordered} for category_id and everything below it."""
+    return get_category_rollups(path, products_path).get(category_id)
+
+@contextmanager
+def track_rollups(products_path: Path = DEFAULT_PRODUCT_PATH):
+    """
+    Wrap a product write: yields a set to add the ids of written or deleted products to.
+    Takes the store lock so nothing else writes in between; when the block succeeds the
+    cached rollups are updated for those products and kept for the new catalog version
+    (no-op if none are cached).
+    """
+    products_path = Path(products_path)
+    store = get_product_store(products_path)
+    with store.lock():
+        current = []
+        for categories_path in _rollup_views.get(str(products_path.resolve()), ()):
+            rollups = file_cache.peek(products_path, tag=_rollup_tag(categories_path), depends_on=(categories_path,))
+            if rollups is not None:
+                current.append((categories_path, rollups, file_signature(categories_path)))
+        touched: Set[int] = set()
+        yield touched
+        if not current or not touched:
+            return
+        written = store.get_many(touched)
+        for categories_path, rollups, categories_sig in current:
+            if file_signature(categories_path) != categories_sig:
+                continue   # the tree changed as well: rebuild on next read
+            for pid in touched:
+                rollups.apply(pid, written.get(int(pid)))
+            file_cache.put(products_path, rollups, tag=_rollup_tag(categories_path), depends_on=(categories_path,))
+
 
 # =============== Helpers ===============
 
@@ -120,13 +582,13 @@ def _descendant_ids(categories: List[Category], root_id: int) -> Set[int]:
                 pending.append(k.category_id)
     return ids
 
-def _name_exists(categories: List[Category], name: str, parent_id: Optional[int]) -> bool:
-    """Case-insensitive name uniqueness per same parent."""
-    norm = name.strip().casefold()
-    for c in categories:
-        if c.parent_id == parent_id and c.name.strip().casefold() == norm:
-            return True
-    return False
+def _name_key(name: str) -> str:
+    return str(name).strip().casefold()
+
+def _name_exists(tree: CategoryTree, name: str, parent_id: Optional[int], exclude_id: Optional[int] = None) -> bool:
+    """Case-insensitive name uniqueness per same parent (hashed lookup in the cached tree)."""
+    found = tree.find_child(parent_id, name)
+    return found is not None and found != exclude_id
 
 # =============== Public API (flat + tree) ===============
 
@@ -135,31 +597,35 @@ def list_categories(path: Path = DEFAULT_CATEGORIES_PATH) -> List[Dict]:
     Flat list (for back-compat): each dict has category_id, name, parent_id.
     Sorted: parents first (name), then their subcategories (name).
     """
-    categories, _ = _load_categories(path)
+    tree = get_category_tree(path)
     result: List[Category] = []
-    parents = sorted(_children_of(categories, None), key=lambda c: c.name.casefold())
-    for p in parents:
+    for p in tree.children(None):
         result.append(p)
-        children = sorted(_children_of(categories, p.category_id), key=lambda c: c.name.casefold())
-        result.extend(children)
+        result.extend(tree.children(p.category_id))
     return [c.to_dict() for c in result]
 
-def list_category_tree(path: Path = DEFAULT_CATEGORIES_PATH) -> List[Dict]:
+def list_category_tree(
+    path: Path = DEFAULT_CATEGORIES_PATH,
+    *,
+    with_rollups: bool = False,
+    products_path: Path = DEFAULT_PRODUCT_PATH
+) -> List[Dict]:
     """
     Hierarchical structure for display:
     [ { node: {id,name,parent_id}, children: [ ... ] }, ... ]
+    with_rollups=True adds "rollup": {product_count, total_stock, stock_value, product_total_ordered}
+    to each entry (subtree totals, from the maintained rollups).
     """
-    categories, _ = _load_categories(path)
-    by_parent: Dict[Optional[int], List[Category]] = {}
-    for c in categories:
-        by_parent.setdefault(c.parent_id, []).append(c)
-    for v in by_parent.values():
-        v.sort(key=lambda c: c.name.casefold())
+    tree = get_category_tree(path)
+    rollups = get_category_rollups(path, products_path) if with_rollups else None
 
     def build(parent_id: Optional[int]) -> List[Dict]:
         nodes = []
-        for c in by_parent.get(parent_id, []):
-            nodes.append({"node": c.to_dict(), "children": build(c.category_id)})
+        for c in tree.children(parent_id):
+            entry = {"node": c.to_dict(), "children": build(c.category_id)}
+            if rollups is not None:
+                entry["rollup"] = rollups.get(c.category_id)
+            nodes.append(entry)
         return nodes
 
     return build(None)
@@ -175,19 +641,22 @@ def add_subcategory(name: str, parent_id: Optional[int], path: Path = DEFAULT_CA
         return None
 
     categories, wrapped = _load_categories(path)
+    tree = get_category_tree(path)
     if parent_id is not None:
-        index = _index(categories)
-        if int(parent_id) not in index:
+        parent_id = int(parent_id)
+        if parent_id not in tree.by_id:
             print("Parent category not found.")
             return None
 
-    if _name_exists(categories, name, parent_id):
+    if _name_exists(tree, name, parent_id):
         print("Category already exists under this parent.")
         return None
 
-    new_cat = Category(category_id=_next_category_id(categories), name=name.strip(), parent_id=parent_id)
+    new_id = next_id(path, seed=lambda: _next_category_id(categories))
+    new_cat = Category(category_id=new_id, name=name.strip(), parent_id=parent_id)
     categories.append(new_cat)
     _save_categories(categories, wrapped, path)
+    _advance_tree(path, tree, ("add", Category(new_cat.category_id, new_cat.name, new_cat.parent_id)))
     level = "Parent" if parent_id is None else f"Sub-category of {parent_id}"
     print(f"Added {level}: '{new_cat.name}' (id={new_cat.category_id})")
     return new_cat.to_dict()
@@ -197,9 +666,15 @@ def update_category_name(
     new_name: str,
     *,
     path: Path = DEFAULT_CATEGORIES_PATH,
-    products_path: Path = DEFAULT_PRODUCT_PATH
+    products_path: Path = DEFAULT_PRODUCT_PATH,
+    propagate: bool = True
 ) -> bool:
-    """Rename a category (unique among siblings). Propagate new name to products referencing this category_id."""
+    """
+    Rename a category (unique among siblings). Propagate new name to products referencing this category_id:
+    only those products are read (via the category index) and rewritten, in the same Transaction
+    as the category file. With propagate=False only the category is saved and readers are expected
+    to use resolve_category_names().
+    """
     if not new_name or not new_name.strip():
         print("New name cannot be empty.")
         return False
@@ -211,29 +686,51 @@ def update_category_name(
         print("Category ID not found.")
         return False
 
-    if _name_exists(categories, new_name, target.parent_id):
+    # renaming to a different case of its own name is allowed
+    tree = get_category_tree(path)
+    if _name_exists(tree, new_name, target.parent_id, exclude_id=target.category_id):
         print("A category with that name already exists under the same parent.")
         return False
 
     old = target.name
     target.name = new_name.strip()
-    _save_categories(categories, wrapped, path)
+    if not propagate:
+        _save_categories(categories, wrapped, path)
+        _advance_tree(path, tree, ("rename", target.category_id, target.name))
+        print(f"Renamed category id={category_id} from '{old}' to '{target.name}'")
+        return True
 
     # Propagate to products (only this exact category_id)
-    products = load_products(products_path)
-    changed = False
+    store = get_product_store(products_path)
+    with tracking_product_changes(products_path) as touched:
+        affected = store.get_many(store.product_ids_in_categories([int(category_id)]))
+        changed = [p for p in affected.values() if p.get("category_name") != target.name]
+        for product in changed:
+            product["category_name"] = target.name
+        txn = Transaction(Path(path).parent)
+        txn.write_json(path, _categories_payload(categories, wrapped))
+        stage_product_updates(txn, changed, products_path)
+        txn.commit()
+        touched.update(affected)
+    _advance_tree(path, tree, ("rename", target.category_id, target.name))
+
+    print(f"Renamed category id={category_id} from '{old}' to '{target.name}'")
+    return True
+
+def resolve_category_names(products: List[Dict], path: Path = DEFAULT_CATEGORIES_PATH) -> List[Dict]:
+    """
+    Set each product's category_name from the cached category tree (in place; returns products).
+    For readers of catalogs renamed with propagate=False.
+    """
+    tree = get_category_tree(path)
     for product in products:
         try:
-            if int(product.get("category_id", -1)) == int(category_id):
-                product["category_name"] = target.name
-                changed = True
+            category = tree.by_id.get(int(product.get("category_id")))
         except (TypeError, ValueError):
             continue
-    if changed:
-        save_products(products, products_path)
-
-    print(f"Renamed category id={category_id} from '{old}' to '{target.name}'")
-    return True
+        if category is not None:
+            product["category_name"] = category.name
+    return products
 
 def delete_category(
     category_id: int,
@@ -255,20 +752,15 @@ def delete_category(
         return False
 
     # Block if there are children
-    has_children = any(c.parent_id == int(category_id) for c in categories)
+    tree = get_category_tree(path)
+    has_children = bool(tree.children(int(category_id)))
     if has_children:
         print("Cannot delete: category has sub-categories. Delete or move them first.")
         return False
 
-    # Block if products reference this category
-    products = load_products(products_path)
-    blockers = []
-    for products in products:
-        try:
-            if int(products.get("category_id", -1)) == int(category_id):
-                blockers.append(products)
-        except (TypeError, ValueError):
-            continue
+    # Block if products reference this category (category index: no catalog scan)
+    store = get_product_store(products_path)
+    blockers = store.get_in_order(store.product_ids_in_categories([int(category_id)]))
 
     if blockers:
         for products in blockers:
@@ -279,6 +771,7 @@ def delete_category(
     # Perform delete
     kept = [c for c in categories if int(c.category_id) != int(category_id)]
     _save_categories(kept, wrapped, path)
+    _advance_tree(path, tree, ("delete", int(category_id)))
     print(f"Deleted category id={category_id} ('{target.name}')")
     return True
 
@@ -297,8 +790,9 @@ def delete_all_categories(
         print("All categories deleted.")
         return True
 
-    products = load_products(products_path)
-    blockers = [products for products in products if products.get("category_id") not in (None, "", 0)]
+    store = get_product_store(products_path)
+    assigned = [pid for cid, pids in store.ids_by_category().items() if cid != 0 for pid in pids]
+    blockers = store.get_in_order(assigned)
     if blockers:
         for products in blockers:
             print(f"Assigned to product ({products.get('name','(unnamed)')} and ID {products.get('product_id','unknown')}). "
@@ -329,33 +823,25 @@ def compute_category_display_codes(
       ParentB -> '11',   ChildB1 -> '11.1'
     Codes are computed by (name-sorted) sibling order.
     """
-    categories, _ = _load_categories(path)
-    by_parent = _build_parent_index(categories)
-    id_to_code: Dict[int, str] = {}
-
-    # depth-first numbering
-    def assign_codes(parent_id: Optional[int], prefix: Optional[str], next_num_start: int) -> None:
-        siblings = by_parent.get(parent_id, [])
-        if prefix is None:
-            # top-level: 10, 11, 12, ...
-            num = next_num_start
-            for c in siblings:
-                code = f"{num}"
-                id_to_code[c.category_id] = code
-                # children: 10.1, 10.2...
-                assign_codes(c.category_id, code, 1)
-                num += 1
-        else:
-            # children: prefix.1, prefix.2, ...
-            index = 1
-            for c in siblings:
-                code = f"{prefix}.{index}"
-                id_to_code[c.category_id] = code
-                assign_codes(c.category_id, code, 1)
-                index += 1
+    return dict(get_category_tree(path, start_at).id_to_code)
 
-    assign_codes(None, None, start_at)
-    return id_to_code
+def get_category_id_by_path(
+    category_path: str,
+    path: Path = DEFAULT_CATEGORIES_PATH,
+    sep: str = "/"
+) -> Optional[int]:
+    """
+    Resolve a name path like 'Clothing/Men/Shirts' (case-insensitive) to a category_id.
+    One hashed lookup per level.
+    """
+    names = [n for n in str(category_path).split(sep) if n.strip()]
+    if not names:
+        return None
+    return get_category_tree(path).id_for_path(names)
+
+def get_category_path(category_id: int, path: Path = DEFAULT_CATEGORIES_PATH, sep: str = "/") -> str:
+    """The reverse: category_id -> 'Clothing/Men/Shirts' ('' if unknown)."""
+    return sep.join(get_category_tree(path).path_for(category_id))
 
 def get_category_id_by_display_code(
     code: str,
@@ -365,12 +851,7 @@ def get_category_id_by_display_code(
     """
     Resolve a dotted display code like '10' or '10.2' to an integer category_id.
     """
-    mapping = compute_category_display_codes(path=path, start_at=start_at)
-    # invert the mapping
-    for cid, ccode in mapping.items():
-        if ccode == code.strip():
-            return cid
-    return None
+    return get_category_tree(path, start_at).id_for_code(code)
 
 def list_subcategories_by_parent_code(
     parent_code: str,
@@ -385,24 +866,18 @@ def list_subcategories_by_parent_code(
     - include_all_descendants=True: all levels (children, grandchildren, ...)
     Each result is a dict: {category_id, name, parent_id}
     """
-    parent_id = get_category_id_by_display_code(parent_code, path=path, start_at=start_at)
+    tree = get_category_tree(path, start_at)
+    parent_id = tree.id_for_code(parent_code)
     if parent_id is None:
         print("Parent code not found.")
         return []
 
-    categories, _ = _load_categories(path)
-
     if not include_all_descendants:
-        # Direct children only
-        children = sorted(
-            _children_of(categories, parent_id),
-            key=lambda c: c.name.casefold()
-        )
-        return [c.to_dict() for c in children]
+        # Direct children only (already name-sorted)
+        return [c.to_dict() for c in tree.children(parent_id)]
 
     # All descendants (any depth)
-    desc_ids = _descendant_ids(categories, int(parent_id))
-    results = [c.to_dict() for c in categories if int(c.category_id) in desc_ids]
+    results = [tree.by_id[cid].to_dict() for cid in tree.descendant_ids(parent_id)]
     # Sort nicely by (level via name path). Simple name sort is OK for now:
     results.sort(key=lambda d: str(d.get("name", "")).casefold())
     return results
@@ -418,7 +893,7 @@ def list_subcategories_with_codes_by_parent_code(
     Same as list_subcategories_by_parent_code, but includes a 'display_code' in each result.
     Returns: [{category_id, name, parent_id, display_code}, ...]
     """
-    id_to_code = compute_category_display_codes(path=path, start_at=start_at)
+    tree = get_category_tree(path, start_at)
     items = list_subcategories_by_parent_code(
         parent_code,
         path=path,
@@ -426,11 +901,10 @@ def list_subcategories_with_codes_by_parent_code(
         include_all_descendants=include_all_descendants
     )
     for it in items:
-        it["display_code"] = id_to_code.get(int(it["category_id"]), "")
+        it["display_code"] = tree.code_for(it["category_id"])
     # Sort by code for a tidy hierarchical feel
     items.sort(key=lambda d: d.get("display_code",""))
     return items
 
 def _code_for_id(category_id: int, categories_path: Path, code_start: int) -> str:
-    codes = compute_category_display_codes(categories_path, start_at=code_start)
-    return codes.get(int(category_id), "")
+    return get_category_tree(categories_path, code_start).code_for(category_id)
@@ -0,0 +1,221 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Iterable
+from bisect import insort, bisect_left, bisect_right
+from functions.cache import file_cache
+from functions.customer_store import get_customer_store
+from functions.sidecar import read_sidecar, save_sidecar, stamp_of
+
+
+def customer_index_path_for(customers_path: Path) -> Path:
+    """storage/customers.json -> storage/customers.json.index.json (customers.shards gets its own)"""
+    customers_path = Path(customers_path)
+    return customers_path.with_name(f"{customers_path.name}.index.json")
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def email_key(email: str) -> str:
+    return str(email or "").strip().casefold()
+
+def postcode_key(postcode: str) -> str:
+    """'sw1a 1aa' -> 'SW1A1AA'"""
+    return "".join(str(postcode or "").split()).upper()
+
+
+def name_key(customer: Dict) -> Tuple[str, str, Optional[int]]:
+    """(casefolded last name, casefolded first name, customer_id): the by_name order, and a paging cursor."""
+    return (
+        str(customer.get("last_name", "")).casefold(),
+        str(customer.get("first_name", "")).casefold(),
+        _int(customer.get("customer_id")),
+    )
+
+
+class CustomerIndex:
+    """
+    Lookup indexes over the customers file:
+      positions    {customer_id: position in the customers list (all shards, in id order)}
+      by_email     {casefolded email: customer_id}
+      by_postcode  {delivery postcode without spaces, upper case: [customer_id, ...]}
+      postcodes    sorted by_postcode keys, for area (prefix) queries
+      by_name      sorted (casefolded last name, casefolded first name, customer_id),
+                   the list_customers_sorted order, for paging and name seeks
+    Kept up to date by add_customer and import_customers, which record each
+    change so saving appends it to a delta log (see functions/sidecar.py).
+    """
+    def __init__(self):
+        self.positions: Dict[int, int] = {}
+        self.by_email: Dict[str, int] = {}
+        self.by_postcode: Dict[str, List[int]] = {}
+        self.postcodes: List[str] = []
+        self.by_name: List[Tuple[str, str, int]] = []
+        self.source: Optional[list] = None   # signature of the customers file this matches
+        self.changes: List[list] = []        # recorded since the last save
+
+    # ---------- build / (de)serialise ----------
+
+    @classmethod
+    def build(cls, customers: Iterable[Dict]) -> "CustomerIndex":
+        index = cls()
+        for pos, customer in enumerate(customers):
+            if isinstance(customer, dict):
+                index._link(customer, pos)
+                key = name_key(customer)
+                if key[-1] is not None:
+                    index.by_name.append(key)
+        index.by_name.sort()
+        index.postcodes = sorted(index.by_postcode)
+        return index
+
+    def to_dict(self) -> Dict:
+        return {
+            "positions": {str(k): v for k, v in self.positions.items()},
+            "by_email": self.by_email,
+            "by_postcode": self.by_postcode,
+            "by_name": self.by_name,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "CustomerIndex":
+        index = cls()
+        index.positions = {int(k): int(v) for k, v in d.get("positions", {}).items()}
+        index.by_email = {str(k): int(v) for k, v in d.get("by_email", {}).items()}
+        index.by_postcode = {str(k): [int(c) for c in v] for k, v in d.get("by_postcode", {}).items()}
+        index.postcodes = sorted(index.by_postcode)
+        index.by_name = [(str(last), str(first), int(cid)) for last, first, cid in d.get("by_name", [])]
+        return index
+
+    # ---------- incremental maintenance ----------
+
+    def _link(self, customer: Dict, pos: int) -> Optional[str]:
+        """Index one customer (all but by_name); returns its postcode key if that postcode is new."""
+        cid = _int(customer.get("customer_id"))
+        if cid is None:
+            return None
+        self.positions[cid] = pos
+        email = email_key(customer.get("email"))
+        if email:
+            self.by_email.setdefault(email, cid)   # first holder wins, as a linear scan would
+        postcode = postcode_key((customer.get("delivery_address") or {}).get("postcode"))
+        if not postcode:
+            return None
+        ids = self.by_postcode.setdefault(postcode, [])
+        ids.append(cid)
+        return postcode if len(ids) == 1 else None
+
+    @staticmethod
+    def _slim(customer: Dict) -> Dict:
+        """The fields the index reads, as recorded in a change."""
+        return {
+            "customer_id": customer.get("customer_id"),
+            "email": customer.get("email"),
+            "first_name": customer.get("first_name", ""),
+            "last_name": customer.get("last_name", ""),
+            "delivery_address": {"postcode": (customer.get("delivery_address") or {}).get("postcode")},
+        }
+
+    def apply_change(self, change: List) -> None:
+        """Replay one recorded change."""
+        kind, customer, position = change
+        {"add": self._add}[kind](customer, position)
+
+    def add(self, customer: Dict, position: int) -> None:
+        """Index a customer appended at `position` in the customers list."""
+        self.changes.append(["add", self._slim(customer), position])
+        self._add(customer, position)
+
+    def _add(self, customer: Dict, position: int) -> None:
+        new_postcode = self._link(customer, position)
+        key = name_key(customer)
+        if key[-1] is not None:
+            insort(self.by_name, key)
+        if new_postcode:
+            insort(self.postcodes, new_postcode)
+
+    # ---------- lookups ----------
+
+    def position_of(self, customer_id: int) -> Optional[int]:
+        return self.positions.get(int(customer_id))
+
+    def customer_id_for_email(self, email: str) -> Optional[int]:
+        return self.by_email.get(email_key(email))
+
+    def customers_for_postcode(self, postcode: str) -> List[int]:
+        return list(self.by_postcode.get(postcode_key(postcode), []))
+
+    def ids_by_name(self, start: int = 0, count: Optional[int] = None) -> List[int]:
+        """Customer ids in name order, positions start..start+count."""
+        stop = len(self.by_name) if count is None else start + max(0, count)
+        return [key[-1] for key in self.by_name[max(0, start):stop]]
+
+    def name_position(self, last_name: str, first_name: str = "") -> int:
+        """Where a customer with these names is (or would be) in name order."""
+        return bisect_left(self.by_name, (str(last_name).casefold(), str(first_name).casefold()))
+
+    def position_after(self, key: Tuple[str, str, int]) -> int:
+        """Name-order position just past `key` (a name_key cursor)."""
+        return bisect_right(self.by_name, key)
+
+    def customers_in_area(self, prefix: str) -> List[int]:
+        """Customers whose delivery postcode starts with `prefix` (e.g. 'SW1A' or 'SW')."""
+        prefix = postcode_key(prefix)
+        if not prefix:
+            return []
+        found: List[int] = []
+        for i in range(bisect_left(self.postcodes, prefix), len(self.postcodes)):
+            if not self.postcodes[i].startswith(prefix):
+                break
+            found.extend(self.by_postcode[self.postcodes[i]])
+        return found
+
+
+# ---------------- Persistence ----------------
+
+def save_customer_index(
+    index: CustomerIndex,
+    customers_path: Path,
+    *,
+    snapshot: bool = False,
+    stamp: Optional[list] = None
+) -> None:
+    """
+    Persist the index's recorded changes (a line appended to its delta log, or a
+    full snapshot with snapshot=True) stamped with the customers file's (or shard
+    manifest's) current signature, and share it in this process.
+    """
+    store = get_customer_store(customers_path)
+    save_sidecar(index, customer_index_path_for(customers_path), store.stamp_path, snapshot=snapshot, stamp=stamp)
+    if index.source == stamp_of(store.stamp_path):
+        file_cache.put(store.stamp_path, index, tag="customer_index")
+
+def rebuild_customer_index(customers_path: Path) -> CustomerIndex:
+    """Regenerate the index from the customers file (or shards) and save a snapshot."""
+    store = get_customer_store(customers_path)
+    with store.lock():   # no add_customer lands mid-rebuild
+        # stamped with the version read: if a write still slips in, the index is stale and rebuilt
+        stamp = stamp_of(store.stamp_path)
+        index = CustomerIndex.build(store.records())
+        save_customer_index(index, customers_path, snapshot=True, stamp=stamp)
+    return index
+
+def _load_or_rebuild(customers_path: Path) -> CustomerIndex:
+    index = read_sidecar(customer_index_path_for(customers_path), CustomerIndex.from_dict)
+    if index is None or index.source != stamp_of(get_customer_store(customers_path).stamp_path):
+        return rebuild_customer_index(customers_path)
+    return index
+
+def load_customer_index(customers_path: Path) -> CustomerIndex:
+    """
+    The persisted index (snapshot plus delta log) if it matches the customers file
+    as it is now; otherwise (missing, corrupt, or the customers file was written
+    without updating it) it is rebuilt. Parsed once per version and shared:
+    writers update it only while holding the customers lock, and save it straight
+    after saving the customers.
+    """
+    customers_path = Path(customers_path)
+    stamp_path = get_customer_store(customers_path).stamp_path
+    return file_cache.get(stamp_path, lambda _: _load_or_rebuild(customers_path), tag="customer_index")
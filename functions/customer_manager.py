@@ -1,30 +1,29 @@
 # functions/customer_store.py
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
 from pathlib import Path
+from multiprocessing import Pool
 import json
 import re
+import time
 from datetime import datetime
 from env import BASE_DIR, DEFAULT_CATEGORIES_PATH, DEFAULT_CUSTOMER_PATH, DEFAULT_ORDER_PATH, DEFAULT_PRODUCT_PATH
 from decimal import Decimal
+from functions.customer_index import load_customer_index, save_customer_index, email_key, name_key
+from functions.customer_store import get_customer_store
+from functions.customer_summary import load_customer_summaries
+from functions.order_index import load_order_index, orders_at
+from functions.sequences import next_id, reserve_ids
 
 
 # ---------------- Basic load/save ----------------
 
 def load_customers(path: Path = DEFAULT_CUSTOMER_PATH) -> List[Dict]:
-    if not path.exists():
-        return []
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, OSError):
-        return []
+    return get_customer_store(path).load_all()
 
 def save_customers(customers: List[Dict], path: Path = DEFAULT_CUSTOMER_PATH) -> None:
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(customers, f, ensure_ascii=False, indent=2)
+    get_customer_store(path).save_all(customers)
 
-def _next_customer_id(customers: List[Dict]) -> int:
+def _next_customer_id(customers: Iterable[Dict]) -> int:
     max_id = 0
     for c in customers:
         try:
@@ -67,9 +66,23 @@ def _card_brand(num: str) -> str:
         return "Discover"
     return "Card"
 
-# ---------------- Public API ----------------
+# ---------------- Record building ----------------
 
-def add_customer(
+def _text(value) -> str:
+    """A field as a trimmed string; imported rows may carry numbers or null where text is expected."""
+    return "" if value is None else str(value).strip()
+
+def _address(address: Optional[Dict]) -> Dict:
+    address = address or {}
+    return {
+        "line1": _text(address.get("line1")),
+        "line2": _text(address.get("line2")),
+        "line3": _text(address.get("line3")),
+        "postcode": _text(address.get("postcode")),
+        "country": _text(address.get("country")),
+    }
+
+def _validate_customer(
     *,
     title: str,
     first_name: str,
@@ -79,46 +92,52 @@ def add_customer(
     mobile: str,
     home_address: Dict,
     delivery_address: Dict,
-    payment_methods: List[Dict],            # each: {type, brand?, last4?, exp_month?, exp_year?}
-    preferred_payment_method: str,          # "credit_card" | "debit_card" | "paypal"
-    path: Path = DEFAULT_CUSTOMER_PATH
-) -> Optional[Dict]:
+    payment_methods: List[Dict],
+    preferred_payment_method: str
+) -> Tuple[Optional[Dict], Optional[str]]:
     """
-    Create a customer record. Only stores non-sensitive card info (brand, last4, expiry).
-    Returns the created customer dict or None on validation error.
+    Validate and normalise one customer's fields, masking card data.
+    Returns (record without customer_id/created_at, None) or (None, error message).
+    Shared by add_customer and import_customers so both store exactly the same thing.
     """
+    first_name, last_name, email = _text(first_name), _text(last_name), _text(email)
+
     # Names
     if not first_name.strip() or not last_name.strip():
-        print("First and Last names are required.")
-        return None
+        return None, "First and Last names are required."
 
     # Email
     if not validate_email(email):
-        print("Invalid email address.")
-        return None
+        return None, "Invalid email address."
+
+    # Addresses are objects of address lines
+    for label, address in (("Home", home_address), ("Delivery", delivery_address)):
+        if address and not isinstance(address, dict):
+            return None, f"{label} address must be an object with line1, line2, line3, postcode and country."
 
     # Normalize & validate payment methods (mask card data!)
+    if payment_methods and not isinstance(payment_methods, list):
+        return None, "Payment methods must be a list."
     safe_payments: List[Dict] = []
     for pm in (payment_methods or []):
-        pm_type = (pm.get("type") or "").strip().lower()
+        if not isinstance(pm, dict):
+            return None, "Payment method type must be one of: credit_card, debit_card, paypal."
+        pm_type = _text(pm.get("type")).lower()
         if pm_type not in ("credit_card", "debit_card", "paypal"):
-            print("Payment method type must be one of: credit_card, debit_card, paypal.")
-            return None
+            return None, "Payment method type must be one of: credit_card, debit_card, paypal."
 
         if pm_type in ("credit_card", "debit_card"):
-            raw = (pm.get("card_number") or "").strip()
-            exp_m = str(pm.get("exp_month") or "").strip()
-            exp_y = str(pm.get("exp_year") or "").strip()
-            holder = (pm.get("card_holder") or "").strip()
+            raw = _text(pm.get("card_number"))
+            exp_m = _text(pm.get("exp_month"))
+            exp_y = _text(pm.get("exp_year"))
+            holder = _text(pm.get("card_holder"))
 
             digits = "".join(ch for ch in raw if ch.isdigit())
             if len(digits) < 12 or not _luhn_check(digits):
-                print("Invalid card number.")
-                return None
+                return None, "Invalid card number."
             brand = _card_brand(digits)
-            if not (exp_m.isdigit() and 1 <= int(exp_m) <= 12 and exp_y.isdigit() and len(exp_y) in (2, 4)):
-                print("Invalid card expiry.")
-                return None
+            if not (exp_m.isdecimal() and 1 <= int(exp_m) <= 12 and exp_y.isdecimal() and len(exp_y) in (2, 4)):
+                return None, "Invalid card expiry."
 
             safe_payments.append({
                 "type": pm_type,
@@ -130,68 +149,293 @@ def add_customer(
             })
         else:
             # PayPal needs an email (we can reuse the customer email if not provided)
-            paypal_email = (pm.get("paypal_email") or email).strip()
+            paypal_email = _text(pm.get("paypal_email")) or email
             if not validate_email(paypal_email):
-                print("Invalid PayPal email.")
-                return None
+                return None, "Invalid PayPal email."
             safe_payments.append({
                 "type": "paypal",
                 "paypal_email": paypal_email
             })
 
     if preferred_payment_method not in ("credit_card", "debit_card", "paypal"):
-        print("Preferred payment method must be credit_card, debit_card, or paypal.")
-        return None
+        return None, "Preferred payment method must be credit_card, debit_card, or paypal."
 
-    customers = load_customers(path)
-    new_id = _next_customer_id(customers)
-
-    customer = {
-        "customer_id": new_id,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "title": title.strip() if title else "",
-        "first_name": first_name.strip(),
-        "last_name": last_name.strip(),
-        "email": email.strip(),
-        "phone": phone.strip(),
-        "mobile": mobile.strip(),
-        "home_address": {
-            "line1": (home_address.get("line1") or "").strip(),
-            "line2": (home_address.get("line2") or "").strip(),
-            "line3": (home_address.get("line3") or "").strip(),
-            "postcode": (home_address.get("postcode") or "").strip(),
-            "country": (home_address.get("country") or "").strip(),
-        },
-        "delivery_address": {
-            "line1": (delivery_address.get("line1") or "").strip(),
-            "line2": (delivery_address.get("line2") or "").strip(),
-            "line3": (delivery_address.get("line3") or "").strip(),
-            "postcode": (delivery_address.get("postcode") or "").strip(),
-            "country": (delivery_address.get("country") or "").strip(),
-        },
+    return {
+        "title": _text(title),
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "phone": _text(phone),
+        "mobile": _text(mobile),
+        "home_address": _address(home_address),
+        "delivery_address": _address(delivery_address),
         "payment_methods": safe_payments,                 # non-sensitive only
         "preferred_payment_method": preferred_payment_method,
+    }, None
+
+def _new_customer(customer_id: int, record: Dict, created_at: Optional[str] = None) -> Dict:
+    return {
+        "customer_id": customer_id,
+        "created_at": created_at or datetime.utcnow().isoformat() + "Z",
+        **record,
     }
 
-    customers.append(customer)
-    save_customers(customers, path)
+# ---------------- Public API ----------------
+
+def add_customer(
+    *,
+    title: str,
+    first_name: str,
+    last_name: str,
+    email: str,
+    phone: str,
+    mobile: str,
+    home_address: Dict,
+    delivery_address: Dict,
+    payment_methods: List[Dict],            # each: {type, brand?, last4?, exp_month?, exp_year?}
+    preferred_payment_method: str,          # "credit_card" | "debit_card" | "paypal"
+    path: Path = DEFAULT_CUSTOMER_PATH
+) -> Optional[Dict]:
+    """
+    Create a customer record. Only stores non-sensitive card info (brand, last4, expiry).
+    Returns the created customer dict or None on validation error.
+    """
+    record, error = _validate_customer(
+        title=title, first_name=first_name, last_name=last_name, email=email, phone=phone, mobile=mobile,
+        home_address=home_address, delivery_address=delivery_address,
+        payment_methods=payment_methods, preferred_payment_method=preferred_payment_method,
+    )
+    if error:
+        print(error)
+        return None
+
+    # Hold the customers lock from the duplicate-email check until the index is saved
+    store = get_customer_store(path)
+    with store.lock():
+        index = load_customer_index(path)
+        if index.customer_id_for_email(email) is not None:
+            print("A customer with that email address already exists.")
+            return None
+
+        customer = _new_customer(next_id(path, seed=lambda: _next_customer_id(store.records())), record)
+        position = store.count()
+        store.append([customer])   # sharded: rewrites only the last shard
+        index.add(customer, position)
+        save_customer_index(index, path)
     print(f"Added customer '{customer['first_name']} {customer['last_name']}' (id {customer['customer_id']}).")
     return customer
 
-def get_customer_by_id(customer_id: int, path: Path = DEFAULT_CUSTOMER_PATH) -> Optional[Dict]:
-    for c in load_customers(path):
-        try:
-            if int(c.get("customer_id")) == int(customer_id):
-                return c
-        except (TypeError, ValueError):
+
+# ---------------- Bulk import ----------------
+
+CUSTOMER_FIELDS = (
+    "title", "first_name", "last_name", "email", "phone", "mobile",
+    "home_address", "delivery_address", "payment_methods", "preferred_payment_method",
+)
+
+def _validate_rows(rows: List[Tuple[int, object]]) -> List[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Pool worker: validate a chunk of (row number, row) pairs."""
+    out = []
+    for row_no, row in rows:
+        if not isinstance(row, dict):
+            out.append((row_no, None, "Malformed row: expected a JSON object."))
             continue
-    return None
+        try:
+            record, error = _validate_customer(**{field: row.get(field) for field in CUSTOMER_FIELDS})
+        except (TypeError, ValueError, AttributeError) as exc:
+            # one badly shaped row is reported, not allowed to abort the whole import
+            record, error = None, f"Malformed row: {exc}"
+        out.append((row_no, record, error))
+    return out
+
+def _chunked(rows: Iterable, size: int) -> Iterator[List[Tuple[int, object]]]:
+    chunk: List[Tuple[int, object]] = []
+    for item in enumerate(rows, start=1):
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def read_customers_jsonl(path: Path) -> Iterator:
+    """
+    Stream customers from a JSONL file (one object per line, add_customer's fields)
+    for import_customers. Blank lines are skipped; malformed lines are passed
+    through as raw text so the import report can reject them.
+    """
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+
+def import_customers(
+    rows: Iterable,
+    *,
+    path: Path = DEFAULT_CUSTOMER_PATH,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    all_or_nothing: bool = False
+) -> Dict:
+    """
+    Import many customers with one write. Rows (dicts with add_customer's fields) are
+    validated in chunks by a process pool (workers=1: in this process) with the same
+    rules and card masking as add_customer. Emails already on file or repeated in the
+    stream are rejected. Ids are reserved in one block and the customers file (or the
+    shards the new ids fall in) and its index are written once.
+
+    Returns {"imported": int, "rejected": [{"row": n, "error": str}, ...],
+             "rows": int, "seconds": float, "rows_per_sec": float}.
+    """
+    started = time.perf_counter()
+    report: Dict = {"imported": 0, "rejected": [], "rows": 0}
+    accepted: List[Dict] = []
+    seen: set = set()
+    chunks = _chunked(rows, max(1, int(chunk_size)))
+
+    store = get_customer_store(path)
+    with store.lock():
+        index = load_customer_index(path)
+        pool = Pool(workers) if workers != 1 else None
+        try:
+            results = pool.imap(_validate_rows, chunks) if pool else map(_validate_rows, chunks)
+            for chunk in results:
+                for row_no, record, error in chunk:
+                    report["rows"] += 1
+                    if error is None:
+                        key = email_key(record["email"])
+                        if key in seen or index.customer_id_for_email(key) is not None:
+                            error = "A customer with that email address already exists."
+                        else:
+                            seen.add(key)
+                    if error:
+                        report["rejected"].append({"row": row_no, "error": error})
+                    else:
+                        accepted.append(record)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        if accepted and not (all_or_nothing and report["rejected"]):
+            first = store.count()
+            ids = reserve_ids(path, len(accepted), seed=lambda: _next_customer_id(store.records()))
+            created_at = datetime.utcnow().isoformat() + "Z"
+            new = [_new_customer(cid, record, created_at) for cid, record in zip(ids, accepted)]
+            store.append(new)
+            for position, customer in enumerate(new, start=first):
+                index.add(customer, position)
+            save_customer_index(index, path)
+            report["imported"] = len(accepted)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["rows_per_sec"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+    print(f"Imported {report['imported']} of {report['rows']} customers "
+          f"({len(report['rejected'])} rejected) in {report['seconds']}s ({report['rows_per_sec']} rows/sec).")
+    return report
+
+def get_customer_by_id(customer_id: int, path: Path = DEFAULT_CUSTOMER_PATH) -> Optional[Dict]:
+    """O(1) by id; with sharded storage only the shard holding the id is read."""
+    try:
+        return get_customer_store(path).get(int(customer_id))
+    except (TypeError, ValueError):
+        return None
+
+def get_customer_by_email(email: str, path: Path = DEFAULT_CUSTOMER_PATH) -> Optional[Dict]:
+    """Case-insensitive email lookup, O(1) via the customer index."""
+    customer_id = load_customer_index(path).customer_id_for_email(email)
+    return None if customer_id is None else get_customer_store(path).get(customer_id)
+
+def get_customers_by_postcode(postcode: str, *, area: bool = False, path: Path = DEFAULT_CUSTOMER_PATH) -> List[Dict]:
+    """
+    Customers whose delivery postcode is `postcode` (spaces and case ignored), or with
+    area=True starts with it (e.g. 'SW1A'), in file order.
+    """
+    index = load_customer_index(path)
+    ids = index.customers_in_area(postcode) if area else index.customers_for_postcode(postcode)
+    store = get_customer_store(path)
+    ordered = sorted((p, cid) for cid in ids for p in [index.position_of(cid)] if p is not None)
+    return [c for c in (store.get(cid) for _, cid in ordered) if c is not None]
+
+def _customers_in_order(ids: List[int], path: Path) -> List[Dict]:
+    found = get_customer_store(path).get_many(ids)
+    return [found[cid] for cid in ids if cid in found]
 
 def list_customers_sorted(path: Path = DEFAULT_CUSTOMER_PATH) -> List[Dict]:
-    return sorted(
-        load_customers(path),
-        key=lambda c: (c.get("last_name","").casefold(), c.get("first_name","").casefold())
-    )
+    """By last name, first name, then id; read off the customer index's name order, no sort."""
+    return _customers_in_order(load_customer_index(path).ids_by_name(), path)
+
+def customer_page(start: int = 0, page_size: int = 50, *, path: Path = DEFAULT_CUSTOMER_PATH) -> Tuple[List[Dict], int]:
+    """(customers start .. start+page_size-1 in list_customers_sorted order, customer count)."""
+    index = load_customer_index(path)
+    return _customers_in_order(index.ids_by_name(max(0, int(start)), int(page_size)), path), len(index.by_name)
+
+def customers_after(
+    after: Optional[int] = None,
+    limit: int = 50,
+    *,
+    path: Path = DEFAULT_CUSTOMER_PATH
+) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Cursor paging in list_customers_sorted order: the `limit` customers after customer
+    id `after` (None: from the start), and the cursor for the next page (None: no more).
+    The cursor stays valid while customers are added around it. Returns ([], None) if
+    `after` is not a customer.
+    """
+    index = load_customer_index(path)
+    start = 0
+    if after is not None:
+        customer = get_customer_by_id(after, path)
+        if customer is None:
+            return [], None
+        start = index.position_after(name_key(customer))
+    ids = index.ids_by_name(start, max(0, int(limit)))
+    more = start + len(ids) < len(index.by_name)
+    return _customers_in_order(ids, path), (ids[-1] if ids and more else None)
+
+def seek_customer_name(last_name: str, path: Path = DEFAULT_CUSTOMER_PATH) -> int:
+    """Position (for customer_page) of the first customer whose last name is at or after `last_name`."""
+    return load_customer_index(path).name_position(last_name)
+
+def get_customer_summary(customer_id: int, *, orders_path: Path = DEFAULT_ORDER_PATH, top: int = 3) -> Dict:
+    """
+    Order count, lifetime spend, last order time, top products [(product_id, units), ...]
+    and the orders (id, created_at, total; most recent first) of one customer, from the
+    maintained customer summaries - the orders file is not read.
+    """
+    return load_customer_summaries(orders_path).summary_for(customer_id, top)
+
+def customer_segment(
+    *,
+    min_orders: int = 0,
+    min_spend: float = 0.0,
+    ordered_since: Optional[str] = None,
+    not_ordered_since: Optional[str] = None,
+    path: Path = DEFAULT_CUSTOMER_PATH,
+    orders_path: Path = DEFAULT_ORDER_PATH
+) -> List[Dict]:
+    """
+    Customers who have ordered, filtered on their summaries (see CustomerSummaries.segment),
+    biggest spenders first. Each customer gets "order_count", "lifetime_spend" and
+    "last_order_at". E.g. lapsed big spenders:
+        customer_segment(min_spend=500, not_ordered_since="2025-01-01")
+    """
+    summaries = load_customer_summaries(orders_path)
+    matched = summaries.segment(min_orders=min_orders, min_spend=min_spend,
+                                ordered_since=ordered_since, not_ordered_since=not_ordered_since)
+    found = get_customer_store(path).get_many(cid for cid, _ in matched)
+    out = []
+    for cid, _ in matched:
+        if cid in found:
+            summary = summaries.summary_for(cid, top=0)
+            found[cid].update({k: summary[k] for k in ("order_count", "lifetime_spend", "last_order_at")})
+            out.append(found[cid])
+    return out
 
 def get_customer_orders(
     customer_id: int,
@@ -199,20 +443,8 @@ def get_customer_orders(
     orders_path: Path,
 ) -> List[Dict]:
     """
-    Return this customer's orders, most recent first.
+    Return this customer's orders, most recent first. Only their records are read
+    (at their indexed offsets in an order log).
     """
-    if not orders_path.exists():
-        return []
-    try:
-        with orders_path.open("r", encoding="utf-8") as f:
-            orders = json.load(f)
-        if not isinstance(orders, list):
-            return []
-    except (json.JSONDecodeError, OSError):
-        return []
-
-    filtered = [o for o in orders if int(o.get("customer_id", -1)) == int(customer_id)]
-    # Most recent first by created_at then order_id
-    def _key(o):
-        return (o.get("created_at", ""), int(o.get("order_id", 0)))
-    return sorted(filtered, key=_key, reverse=True)
+    index = load_order_index(orders_path)
+    return orders_at(orders_path, index.orders_for_customer(customer_id), index)
@@ -0,0 +1,226 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Iterator
+import json
+import os
+from multiprocessing import Pool
+from functions.cache import cached_json_list, copy_records, file_cache, file_signature, _read_json_list
+from functions.journal import atomic_write_json, Transaction
+from functions.locks import file_lock, lock_path_for
+
+
+# A path with this suffix is a directory of id-range shards plus a manifest.
+SHARDED_SUFFIX = ".shards"
+MANIFEST_NAME = "manifest.json"
+DEFAULT_SHARD_SIZE = 50000
+
+
+def _customer_id(customer: Dict) -> Optional[int]:
+    try:
+        return int(customer.get("customer_id"))
+    except (TypeError, ValueError):
+        return None
+
+def _ids_of(records: List[Dict]) -> Dict[int, int]:
+    """{customer_id: position} for one file's records."""
+    positions: Dict[int, int] = {}
+    for i, customer in enumerate(records):
+        cid = _customer_id(customer) if isinstance(customer, dict) else None
+        if cid is not None:
+            positions.setdefault(cid, i)
+    return positions
+
+
+# ---------------- Single JSON file (original layout) ----------------
+
+class JsonCustomerStore:
+    """storage/customers.json: one JSON array."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.stamp_path = self.path   # its signature changes on every write
+
+    def lock(self):
+        return file_lock(lock_path_for(self.path))
+
+    def load_all(self) -> List[Dict]:
+        return cached_json_list(self.path)
+
+    def records(self) -> Iterator[Dict]:
+        """The cached records, uncopied (don't modify)."""
+        return iter(file_cache.get(self.path, _read_json_list))
+
+    def count(self) -> int:
+        return len(file_cache.get(self.path, _read_json_list))
+
+    def save_all(self, customers: List[Dict]) -> None:
+        atomic_write_json(self.path, customers)
+
+    def get_many(self, customer_ids: Iterable[int]) -> Dict[int, Dict]:
+        records = file_cache.get(self.path, _read_json_list)
+        positions = file_cache.get(self.path, lambda p: _ids_of(records), tag="ids")
+        return {cid: dict(records[positions[cid]]) for cid in {int(c) for c in customer_ids} if cid in positions}
+
+    def get(self, customer_id: int) -> Optional[Dict]:
+        return self.get_many([customer_id]).get(int(customer_id))
+
+    def append(self, customers: List[Dict]) -> None:
+        if customers:
+            atomic_write_json(self.path, self.load_all() + list(customers))
+
+
+
+# ---------------- Sharded directory ----------------
+
+def _read_manifest(path: Path) -> Optional[Dict]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) and isinstance(data.get("shards"), list) else None
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+class ShardedCustomerStore:
+    """
+    storage/customers.shards/: customers partitioned by customer_id range into
+    shard files of `shard_size` ids each (000000.json holds ids 1..shard_size, ...),
+    listed in manifest.json:
+
+        {"shard_size": 50000, "shards": [{"file": "000000.json", "first_id": 1, "count": 49871}, ...]}
+
+    Point reads and appends touch only the shards holding the ids (new ids land in the last one);
+    multi-shard writes and the manifest go through one Transaction. Records
+    without a usable customer_id live in the first shard.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.stamp_path = self.path / MANIFEST_NAME   # rewritten by every write
+
+    def lock(self):
+        return file_lock(lock_path_for(self.path))
+
+    def manifest(self) -> Dict:
+        manifest = file_cache.get(self.stamp_path, _read_manifest) if self.stamp_path.exists() else None
+        return manifest or {"shard_size": DEFAULT_SHARD_SIZE, "shards": []}
+
+    def _shard_no(self, customer_id: Optional[int], shard_size: int) -> int:
+        return max(0, (customer_id - 1) // shard_size) if customer_id is not None else 0
+
+    def _shard_path(self, shard_no: int) -> Path:
+        return self.path / f"{shard_no:06d}.json"
+
+    def shard_paths(self) -> List[Path]:
+        return [self.path / s["file"] for s in self.manifest()["shards"]]
+
+    def _prefetch(self, paths: List[Path], workers: Optional[int] = None) -> None:
+        """
+        Parse the shards among `paths` not yet in the cache with a process pool, when
+        there are several and more than one CPU (workers=1: leave them to be read here).
+        """
+        missing = [p for p in paths if file_cache.peek(p) is None]
+        workers = workers or os.cpu_count() or 1
+        if len(missing) > 1 and workers > 1:
+            before = [file_signature(p) for p in missing]
+            with Pool(min(workers, len(missing))) as pool:
+                loaded = pool.map(_read_json_list, missing)
+            for p, sig, records in zip(missing, before, loaded):
+                if file_signature(p) == sig:   # unchanged while it was being read
+                    file_cache.put(p, records)
+
+    def load_shards(self, workers: Optional[int] = None) -> List[List[Dict]]:
+        """Every shard's records (cached lists, don't modify), in id order."""
+        paths = self.shard_paths()
+        self._prefetch(paths, workers)
+        return [file_cache.get(p, _read_json_list) for p in paths]
+
+    def records(self, workers: Optional[int] = None) -> Iterator[Dict]:
+        """The cached records of every shard in id order, uncopied (don't modify)."""
+        return (c for shard in self.load_shards(workers) for c in shard)
+
+    def load_all(self, workers: Optional[int] = None) -> List[Dict]:
+        return copy_records(list(self.records(workers)))
+
+    def count(self) -> int:
+        """From the manifest; no shard is read."""
+        return sum(int(s.get("count", 0)) for s in self.manifest()["shards"])
+
+    def _write(self, shards: Dict[int, List[Dict]], shard_size: int, replace: bool = False) -> None:
+        """
+        Write the given shards (shard_no -> records) and the manifest in one Transaction.
+        replace=True: the manifest lists only these shards; otherwise they are merged in.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        entries = {} if replace else {int(Path(s["file"]).stem): s for s in self.manifest()["shards"]}
+        txn = Transaction(self.path.parent)
+        for shard_no, records in sorted(shards.items()):
+            path = self._shard_path(shard_no)
+            txn.write_json(path, records)
+            entries[shard_no] = {"file": path.name, "first_id": shard_no * shard_size + 1, "count": len(records)}
+        txn.write_json(self.stamp_path, {"shard_size": shard_size, "shards": [entries[n] for n in sorted(entries)]})
+        txn.commit()
+
+    def save_all(self, customers: List[Dict], shard_size: Optional[int] = None) -> None:
+        """Replace everything, re-partitioning into shards of shard_size ids (default: keep the current size)."""
+        shard_size = int(shard_size or self.manifest()["shard_size"])
+        shards: Dict[int, List[Dict]] = {}
+        for customer in customers:
+            shards.setdefault(self._shard_no(_customer_id(customer), shard_size), []).append(customer)
+        kept = {self._shard_path(n) for n in shards}
+        stale = [p for p in self.shard_paths() if p not in kept]
+        self._write(shards, shard_size, replace=True)
+        for p in stale:   # no longer in the manifest, so never read again
+            p.unlink(missing_ok=True)
+            file_cache.invalidate(p)
+
+    def get_many(self, customer_ids: Iterable[int], workers: Optional[int] = None) -> Dict[int, Dict]:
+        """Reads only the shards the ids fall in."""
+        manifest = self.manifest()
+        listed = {s["file"] for s in manifest["shards"]}
+        wanted: Dict[Path, List[int]] = {}
+        for cid in {int(c) for c in customer_ids}:
+            path = self._shard_path(self._shard_no(cid, manifest["shard_size"]))
+            if path.name in listed:
+                wanted.setdefault(path, []).append(cid)
+        self._prefetch(list(wanted), workers)
+        found: Dict[int, Dict] = {}
+        for path, ids in wanted.items():
+            records = file_cache.get(path, _read_json_list)
+            positions = file_cache.get(path, lambda p: _ids_of(records), tag="ids")
+            found.update((cid, dict(records[positions[cid]])) for cid in ids if cid in positions)
+        return found
+
+    def get(self, customer_id: int) -> Optional[Dict]:
+        return self.get_many([customer_id]).get(int(customer_id))
+
+    def append(self, customers: List[Dict]) -> None:
+        """Add new customers, rewriting only the shards their ids fall in."""
+        if not customers:
+            return
+        manifest = self.manifest()
+        shard_size = manifest["shard_size"]
+        listed = {s["file"] for s in manifest["shards"]}
+        shards: Dict[int, List[Dict]] = {}
+        for customer in customers:
+            shard_no = self._shard_no(_customer_id(customer), shard_size)
+            if shard_no not in shards:
+                path = self._shard_path(shard_no)
+                shards[shard_no] = copy_records(file_cache.get(path, _read_json_list)) if path.name in listed else []
+            shards[shard_no].append(customer)
+        self._write(shards, shard_size)
+
+
+def get_customer_store(path: Path):
+    """Pick the layout from the path: *.shards => sharded directory, otherwise one JSON file."""
+    path = Path(path)
+    if path.suffix.lower() == SHARDED_SUFFIX:
+        return ShardedCustomerStore(path)
+    return JsonCustomerStore(path)
+
+def migrate_customers(source: Path, destination: Path, shard_size: int = DEFAULT_SHARD_SIZE) -> int:
+    """Copy every customer from one layout to another (e.g. customers.json -> customers.shards). Returns the count."""
+    customers = get_customer_store(source).load_all()
+    store = get_customer_store(destination)
+    if isinstance(store, ShardedCustomerStore):
+        store.save_all(customers, shard_size=shard_size)
+    else:
+        store.save_all(customers)
+    return len(customers)
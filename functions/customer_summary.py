@@ -0,0 +1,234 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Iterable
+from bisect import insort, bisect_left
+import heapq
+from functions.cache import file_cache
+from functions.order_stream import iter_orders
+from functions.locks import file_lock, lock_path_for
+from functions.sidecar import read_sidecar, save_sidecar, stamp_of
+
+
+def summary_path_for(orders_path: Path) -> Path:
+    """storage/orders.json -> storage/orders.json.summaries.json (orders.jsonl gets its own)"""
+    orders_path = Path(orders_path)
+    return orders_path.with_name(f"{orders_path.name}.summaries.json")
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _money(value) -> float:
+    try:
+        return round(float(value or 0), 2)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CustomerSummaries:
+    """
+    Per-customer order history summaries, derived from the orders file:
+      by_customer  {customer_id: {
+                       "orders":   [(created_at, order_id, order_total), ...] sorted ascending,
+                       "spend":    lifetime spend (sum of order totals),
+                       "products": {product_id: units ordered},
+                   }}
+    Order count and last order time come from "orders". Kept up to date by
+    add_order / add_orders_bulk / edit_order / delete_order, which record each
+    change so saving appends it to a delta log (see functions/sidecar.py).
+    """
+    def __init__(self):
+        self.by_customer: Dict[int, Dict] = {}
+        self.source: Optional[list] = None   # signature of the orders file this matches
+        self.changes: List[list] = []        # recorded since the last save
+
+    # ---------- build / (de)serialise ----------
+
+    @classmethod
+    def build(cls, orders: Iterable[Dict]) -> "CustomerSummaries":
+        summaries = cls()
+        for order in orders:
+            summaries._link(order, sort=False)
+        for summary in summaries.by_customer.values():
+            summary["orders"].sort()
+        return summaries
+
+    def to_dict(self) -> Dict:
+        return {
+            "by_customer": {
+                str(cid): {
+                    "orders": [list(t) for t in s["orders"]],
+                    "spend": s["spend"],
+                    "products": {str(pid): qty for pid, qty in s["products"].items()},
+                }
+                for cid, s in self.by_customer.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "CustomerSummaries":
+        summaries = cls()
+        for cid, s in d.get("by_customer", {}).items():
+            summaries.by_customer[int(cid)] = {
+                "orders": [(str(c), int(o), float(t)) for c, o, t in s.get("orders", [])],
+                "spend": float(s.get("spend", 0.0)),
+                "products": {int(pid): int(qty) for pid, qty in s.get("products", {}).items()},
+            }
+        return summaries
+
+    # ---------- incremental maintenance ----------
+
+    @staticmethod
+    def _units(order: Dict) -> Dict[int, int]:
+        units: Dict[int, int] = {}
+        for li in order.get("items", []):
+            pid, qty = _int(li.get("product_id")), _int(li.get("qty"))
+            if pid is not None and qty:
+                units[pid] = units.get(pid, 0) + qty
+        return units
+
+    @staticmethod
+    def _slim(order: Dict) -> Dict:
+        """The fields the summaries read, as recorded in a change."""
+        return {
+            "order_id": order.get("order_id"),
+            "customer_id": order.get("customer_id"),
+            "created_at": order.get("created_at", ""),
+            "order_total": order.get("order_total"),
+            "items": [{"product_id": li.get("product_id"), "qty": li.get("qty")} for li in order.get("items", [])],
+        }
+
+    def apply_change(self, change: List) -> None:
+        """Replay one recorded change."""
+        kind, order = change
+        {"add": self._link, "remove": self._unlink}[kind](order)
+
+    def _link(self, order: Dict, sort: bool = True) -> None:
+        cid, oid = _int(order.get("customer_id")), _int(order.get("order_id"))
+        if cid is None or oid is None:
+            return
+        summary = self.by_customer.setdefault(cid, {"orders": [], "spend": 0.0, "products": {}})
+        entry = (str(order.get("created_at", "")), oid, _money(order.get("order_total")))
+        if sort:
+            insort(summary["orders"], entry)
+        else:
+            summary["orders"].append(entry)
+        summary["spend"] = round(summary["spend"] + entry[2], 2)
+        for pid, qty in self._units(order).items():
+            summary["products"][pid] = summary["products"].get(pid, 0) + qty
+
+    def add(self, order: Dict) -> None:
+        """Count a new order."""
+        self.changes.append(["add", self._slim(order)])
+        self._link(order)
+
+    def remove(self, order: Dict) -> None:
+        """Uncount a deleted order (or the old version of an edited one)."""
+        self.changes.append(["remove", self._slim(order)])
+        self._unlink(order)
+
+    def _unlink(self, order: Dict) -> None:
+        cid, oid = _int(order.get("customer_id")), _int(order.get("order_id"))
+        summary = self.by_customer.get(cid)
+        if summary is None or oid is None:
+            return
+        entry = (str(order.get("created_at", "")), oid, _money(order.get("order_total")))
+        i = bisect_left(summary["orders"], entry[:2])
+        if i >= len(summary["orders"]) or summary["orders"][i][:2] != entry[:2]:
+            return
+        summary["spend"] = round(summary["spend"] - summary["orders"].pop(i)[2], 2)
+        for pid, qty in self._units(order).items():
+            left = summary["products"].get(pid, 0) - qty
+            if left > 0:
+                summary["products"][pid] = left
+            else:
+                summary["products"].pop(pid, None)
+        if not summary["orders"]:
+            del self.by_customer[cid]
+
+    def replace(self, old_order: Dict, new_order: Dict) -> None:
+        """An order's items/total changed (edit_order)."""
+        self.remove(old_order)
+        self.add(new_order)
+
+    # ---------- lookups ----------
+
+    def summary_for(self, customer_id: int, top: int = 3) -> Dict:
+        """
+        {"order_count", "lifetime_spend", "last_order_at", "top_products": [(product_id, units), ...],
+         "orders": [{"order_id", "created_at", "order_total"}, ...] most recent first}
+        """
+        summary = self.by_customer.get(int(customer_id))
+        if summary is None:
+            return {"order_count": 0, "lifetime_spend": 0.0, "last_order_at": None, "top_products": [], "orders": []}
+        return {
+            "order_count": len(summary["orders"]),
+            "lifetime_spend": summary["spend"],
+            "last_order_at": summary["orders"][-1][0],
+            "top_products": heapq.nsmallest(top, summary["products"].items(), key=lambda kv: (-kv[1], kv[0])),
+            "orders": [{"order_id": o, "created_at": c, "order_total": t} for c, o, t in reversed(summary["orders"])],
+        }
+
+    def segment(
+        self,
+        *,
+        min_orders: int = 0,
+        min_spend: float = 0.0,
+        ordered_since: Optional[str] = None,
+        not_ordered_since: Optional[str] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        (customer_id, lifetime spend) for customers with at least min_orders orders and
+        min_spend spend, whose last order is at/after ordered_since and/or before
+        not_ordered_since (ISO strings). Biggest spenders first.
+        """
+        found = []
+        for cid, s in self.by_customer.items():
+            last = s["orders"][-1][0]
+            if len(s["orders"]) < min_orders or s["spend"] < min_spend:
+                continue
+            if ordered_since is not None and last < ordered_since:
+                continue
+            if not_ordered_since is not None and last >= not_ordered_since:
+                continue
+            found.append((cid, s["spend"]))
+        return sorted(found, key=lambda t: (-t[1], t[0]))
+
+
+# ---------------- Persistence ----------------
+
+def save_customer_summaries(summaries: CustomerSummaries, orders_path: Path, *, snapshot: bool = False) -> None:
+    """
+    Persist the summaries' recorded changes (a line appended to their delta log,
+    or a full snapshot with snapshot=True) stamped with the orders file's current
+    signature, and share them in this process.
+    """
+    orders_path = Path(orders_path)
+    save_sidecar(summaries, summary_path_for(orders_path), orders_path, snapshot=snapshot)
+    file_cache.put(orders_path, summaries, tag="customer_summaries")
+
+def rebuild_customer_summaries(orders_path: Path) -> CustomerSummaries:
+    """Recompute the summaries from the order history (streamed) and save a snapshot."""
+    orders_path = Path(orders_path)
+    with file_lock(lock_path_for(orders_path)):   # no write lands mid-rebuild
+        summaries = CustomerSummaries.build(iter_orders(orders_path))
+        save_customer_summaries(summaries, orders_path, snapshot=True)
+    return summaries
+
+def _load_or_rebuild(orders_path: Path) -> CustomerSummaries:
+    summaries = read_sidecar(summary_path_for(orders_path), CustomerSummaries.from_dict)
+    if summaries is None or summaries.source != stamp_of(orders_path):
+        return rebuild_customer_summaries(orders_path)
+    return summaries
+
+def load_customer_summaries(orders_path: Path) -> CustomerSummaries:
+    """
+    The persisted summaries (snapshot plus delta log) if they match the orders
+    file as it is now; otherwise (missing, corrupt, or the orders file was
+    written without updating them) they are rebuilt. Parsed once per version
+    and shared: order writers update them only while holding the orders lock,
+    and save them straight after committing.
+    """
+    return file_cache.get(Path(orders_path), _load_or_rebuild, tag="customer_summaries")
@@ -0,0 +1,200 @@
+from pathlib import Path
+from typing import List, Dict, Any, Iterable
+import json
+import os
+import uuid
+from functions.cache import file_cache
+from functions.locks import file_lock
+
+# Each commit writes its own journal next to the data files it protects:
+# <directory>/.commit_journal.<32 hex>.json
+JOURNAL_PREFIX = ".commit_journal"
+# Committers hold this lock shared while their journal exists; recovery holds it
+# exclusively, so it never replays a commit that is still being applied.
+JOURNAL_LOCK_NAME = ".commit_journal.lock"
+TMP_SUFFIX = ".tmp"
+
+
+# ---------------- Low-level durable writes ----------------
+
+def _fsync_dir(directory: Path) -> None:
+    """Flush a rename to disk. Not supported on every platform (e.g. Windows), so best effort."""
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _write_tmp_json(path: Path, payload: Any) -> Path:
+    """Write payload to a fsynced temp file beside `path` and return the temp path."""
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}{TMP_SUFFIX}")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
+
+def atomic_write_json(path: Path, payload: Any) -> None:
+    """
+    Replace `path` with payload as JSON: temp file + fsync + rename.
+    Readers see either the old file or the new one, never a truncated one.
+    """
+    path = Path(path)
+    tmp = _write_tmp_json(path, payload)
+    os.replace(tmp, path)
+    file_cache.invalidate(path)
+    _fsync_dir(path.parent)
+
+def atomic_write_lines(path: Path, lines: Iterable[str]) -> None:
+    """Like atomic_write_json, for line-oriented files (one record per line)."""
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}{TMP_SUFFIX}")
+    with tmp.open("w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    file_cache.invalidate(path)
+    _fsync_dir(path.parent)
+
+def append_lines(path: Path, lines: List[str]) -> None:
+    """
+    Append lines to `path` and fsync. If an earlier append was cut off mid-line,
+    the partial line is terminated first so it cannot swallow the new records.
+    """
+    path = Path(path)
+    created = not path.exists()
+    with path.open("ab") as f:
+        if not created and path.stat().st_size > 0:
+            with path.open("rb") as r:
+                r.seek(-1, os.SEEK_END)
+                if r.read(1) != b"\n":
+                    f.write(b"\n")
+        f.write("".join(line + "\n" for line in lines).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    file_cache.invalidate(path)
+    if created:
+        _fsync_dir(path.parent)
+
+
+# ---------------- Multi-file transactions ----------------
+
+def _apply_op(op: Dict, recovering: bool = False) -> None:
+    """
+    Apply one journal operation. Every op is idempotent so recovery can replay it:
+    while recovering, a "replace" whose temp file is gone was already applied. In a
+    live commit a missing temp file is an error.
+    """
+    kind = op.get("op")
+    if kind == "replace":
+        tmp = Path(op["tmp"])
+        if tmp.exists() or not recovering:
+            os.replace(tmp, Path(op["path"]))
+        file_cache.invalidate(Path(op["path"]))
+    elif kind == "put_products":
+        # imported here: product_store itself writes through this module. Not put_many:
+        # that takes the store lock, which a live committer holds while it waits for
+        # the journal lock recovery holds, so the two would deadlock.
+        from functions.product_store import SqliteProductStore
+        SqliteProductStore(Path(op["path"]))._put_rows(op["products"])
+    elif kind == "append":
+        # replaying an append repeats records that are already there; the order
+        # log is last-record-wins, so a repeated put/tombstone changes nothing
+        append_lines(Path(op["path"]), op["lines"])
+
+
+class Transaction:
+    """
+    Commit changes to several storage files as one unit.
+
+        txn = Transaction(orders_path.parent)
+        txn.write_json(orders_path, orders)
+        txn.write_json(products_path, products)
+        txn.commit()
+
+    Staged files are written to fsynced temp files first. commit() then
+    writes this transaction's own journal listing every pending operation,
+    applies them and removes the journal. If the process dies after the journal
+    is written, recover_journal() rolls the commit forward on the next start; if
+    it dies before, the old data is untouched.
+    """
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.journal_path = self.directory / f"{JOURNAL_PREFIX}.{uuid.uuid4().hex}.json"
+        self.ops: List[Dict] = []
+
+    def write_json(self, path: Path, payload: Any) -> None:
+        """Stage a full replacement of `path`."""
+        path = Path(path)
+        # a later write to the same file supersedes the earlier one
+        for op in self.ops:
+            if op.get("op") == "replace" and op["path"] == str(path):
+                Path(op["tmp"]).unlink(missing_ok=True)
+        self.ops = [op for op in self.ops if not (op.get("op") == "replace" and op["path"] == str(path))]
+        tmp = _write_tmp_json(path, payload)
+        self.ops.append({"op": "replace", "path": str(path), "tmp": str(tmp)})
+
+    def add_op(self, op: Dict) -> None:
+        """Stage a backend-specific operation (see _apply_op)."""
+        self.ops.append(op)
+
+    def commit(self) -> None:
+        if not self.ops:
+            return
+        with file_lock(self.directory / JOURNAL_LOCK_NAME, shared=True):
+            missing = [op["tmp"] for op in self.ops if op.get("op") == "replace" and not Path(op["tmp"]).exists()]
+            if missing:
+                # nothing has been applied yet, so the data files are untouched
+                self.abort()
+                raise FileNotFoundError(f"Staged file(s) missing, nothing was saved: {', '.join(missing)}")
+            atomic_write_json(self.journal_path, {"ops": self.ops})
+            for op in self.ops:
+                _apply_op(op)
+            touched = {Path(op["path"]).parent for op in self.ops if op.get("op") == "replace"}
+            for directory in touched:
+                _fsync_dir(directory)
+            self.journal_path.unlink(missing_ok=True)
+        self.ops = []
+
+    def abort(self) -> None:
+        for op in self.ops:
+            if op.get("op") == "replace":
+                Path(op["tmp"]).unlink(missing_ok=True)
+        self.ops = []
+
+
+def recover_journal(directory: Path) -> bool:
+    """
+    Finish the commits in `directory` that were interrupted after writing their
+    journal. Call at start-up; safe while other processes are committing, since it
+    waits for their journals to be removed and only touches the files the
+    interrupted journals list. Returns True if a pending commit was rolled forward.
+    """
+    directory = Path(directory)
+    recovered = 0
+    with file_lock(directory / JOURNAL_LOCK_NAME):
+        # oldest first, so a later commit to the same file wins as it would have
+        journals = sorted(directory.glob(f"{JOURNAL_PREFIX}*.json"), key=lambda p: (p.stat().st_mtime_ns, p.name))
+        for journal_path in journals:
+            try:
+                with journal_path.open("r", encoding="utf-8") as f:
+                    ops = json.load(f).get("ops", [])
+            except (json.JSONDecodeError, OSError, AttributeError):
+                ops = []   # journals are written atomically; an unreadable one was never committed
+            for op in ops:
+                _apply_op(op, recovering=True)
+            for op in ops:
+                if op.get("op") == "replace":
+                    Path(op["tmp"]).unlink(missing_ok=True)
+            journal_path.unlink(missing_ok=True)
+            recovered += len(ops)
+    if recovered:
+        print(f"Recovered an interrupted save ({recovered} pending writes).")
+    return bool(recovered)
@@ -0,0 +1,62 @@
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Locks held by the current thread: {lock path: depth}. Lets a function that
+# holds a lock call helpers that take the same lock without deadlocking.
+_held = threading.local()
+
+
+def lock_path_for(path: Path) -> Path:
+    """storage/orders.json -> storage/orders.json.lock"""
+    path = Path(path)
+    return path.with_name(f"{path.name}.lock")
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """
+    Exclusive lock shared by every process using the same lock file.
+    Blocks until the lock is free; released when the block exits.
+    Re-entrant within a thread (a nested call keeps the mode already held).
+    shared=True: many holders at once, but none while someone holds it
+    exclusively (Windows has no shared mode, so it is exclusive there).
+    """
+    key = str(Path(path).resolve())
+    held: Dict[str, int] = getattr(_held, "locks", None)
+    if held is None:
+        held = _held.locks = {}
+    if held.get(key):
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    fd = os.open(key, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        held[key] = 1
+        try:
+            yield
+        finally:
+            held.pop(key, None)
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
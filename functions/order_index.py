@@ -0,0 +1,288 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
+from bisect import insort, bisect_left, bisect_right
+from functions.cache import file_cache
+from functions.order_stream import iter_orders, is_order_log, iter_order_log_entries, read_orders_at
+from functions.locks import file_lock, lock_path_for
+from functions.sidecar import read_sidecar, save_sidecar, stamp_of
+
+
+def index_path_for(orders_path: Path) -> Path:
+    """storage/orders.json -> storage/orders.json.index.json (orders.jsonl gets its own)"""
+    orders_path = Path(orders_path)
+    return orders_path.with_name(f"{orders_path.name}.index.json")
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class OrderIndex:
+    """
+    Secondary indexes over the orders file:
+      by_customer  {customer_id: [order_id, ...]}
+      by_product   {product_id: [order_id, ...]}
+      by_created   [(created_at, order_id), ...] sorted ascending
+      positions    {order_id: position in the orders list}
+      offsets      {order_id: byte offset of its latest put}   (order log layout only)
+    Kept up to date by add_order / edit_order / delete_order, which record each
+    change so saving appends it to the index's delta log (see functions/sidecar.py).
+    """
+    def __init__(self):
+        self.by_customer: Dict[int, List[int]] = {}
+        self.by_product: Dict[int, List[int]] = {}
+        self.by_created: List[Tuple[str, int]] = []
+        self.positions: Dict[int, int] = {}
+        self.offsets: Dict[int, int] = {}
+        self.source: Optional[list] = None   # signature of the orders file this matches
+        self.changes: List[list] = []        # recorded since the last save
+
+    # ---------- build / (de)serialise ----------
+
+    @classmethod
+    def build(cls, orders: Iterable[Dict]) -> "OrderIndex":
+        index = cls()
+        for pos, order in enumerate(orders):
+            if index._link(order, pos):
+                index.by_created.append((str(order.get("created_at", "")), int(order["order_id"])))
+        index.by_created.sort()
+        return index
+
+    def to_dict(self) -> Dict:
+        return {
+            "by_customer": {str(k): v for k, v in self.by_customer.items()},
+            "by_product": {str(k): v for k, v in self.by_product.items()},
+            "by_created": [list(t) for t in self.by_created],
+            "positions": {str(k): v for k, v in self.positions.items()},
+            "offsets": {str(k): v for k, v in self.offsets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "OrderIndex":
+        index = cls()
+        index.by_customer = {int(k): list(v) for k, v in d.get("by_customer", {}).items()}
+        index.by_product = {int(k): list(v) for k, v in d.get("by_product", {}).items()}
+        index.by_created = [(str(c), int(o)) for c, o in d.get("by_created", [])]
+        index.positions = {int(k): int(v) for k, v in d.get("positions", {}).items()}
+        index.offsets = {int(k): int(v) for k, v in d.get("offsets", {}).items()}
+        return index
+
+    # ---------- incremental maintenance ----------
+
+    @staticmethod
+    def _product_ids(order: Dict) -> List[int]:
+        return sorted({pid for pid in (_int(li.get("product_id")) for li in order.get("items", [])) if pid is not None})
+
+    def _link(self, order: Dict, pos: int, offset: Optional[int] = None) -> bool:
+        """Index everything except by_created; False if the order has no usable id."""
+        oid = _int(order.get("order_id"))
+        if oid is None:
+            return False
+        self.positions[oid] = pos
+        if offset is not None:
+            self.offsets[oid] = offset
+        cid = _int(order.get("customer_id"))
+        if cid is not None:
+            self.by_customer.setdefault(cid, []).append(oid)
+        for pid in self._product_ids(order):
+            self.by_product.setdefault(pid, []).append(oid)
+        return True
+
+    def _unlink_products(self, order: Dict, oid: int) -> None:
+        for pid in self._product_ids(order):
+            ids = self.by_product.get(pid, [])
+            if oid in ids:
+                ids.remove(oid)
+            if not ids:
+                self.by_product.pop(pid, None)
+
+    @staticmethod
+    def _slim(order: Dict) -> Dict:
+        """The fields the index reads, as recorded in a change."""
+        return {
+            "order_id": order.get("order_id"),
+            "customer_id": order.get("customer_id"),
+            "created_at": order.get("created_at", ""),
+            "items": [{"product_id": li.get("product_id")} for li in order.get("items", [])],
+        }
+
+    def apply_change(self, change: List) -> None:
+        """Replay one recorded change."""
+        kind, *args = change
+        {"add": self._add, "replace_items": self._replace_items, "remove": self._remove}[kind](*args)
+
+    def add(self, order: Dict, position: int, offset: Optional[int] = None) -> None:
+        """Index an order appended at `position` in the orders list (and at byte `offset` of an order log)."""
+        self.changes.append(["add", self._slim(order), position, offset])
+        self._add(order, position, offset)
+
+    def replace_items(self, old_order: Dict, new_order: Dict) -> None:
+        """An order's line items changed (edit_order)."""
+        self.changes.append(["replace_items", self._slim(old_order), self._slim(new_order)])
+        self._replace_items(old_order, new_order)
+
+    def remove(self, order: Dict) -> None:
+        """Drop an order removed from the orders list; later positions shift down by one."""
+        self.changes.append(["remove", self._slim(order)])
+        self._remove(order)
+
+    def _add(self, order: Dict, position: int, offset: Optional[int] = None) -> None:
+        if self._link(order, position, offset):
+            insort(self.by_created, (str(order.get("created_at", "")), int(order["order_id"])))
+
+    def _replace_items(self, old_order: Dict, new_order: Dict) -> None:
+        oid = _int(new_order.get("order_id"))
+        if oid is None:
+            return
+        self._unlink_products(old_order, oid)
+        for pid in self._product_ids(new_order):
+            insort(self.by_product.setdefault(pid, []), oid)
+
+    def _remove(self, order: Dict) -> None:
+        oid = _int(order.get("order_id"))
+        if oid is None:
+            return
+        pos = self.positions.pop(oid, None)
+        self.offsets.pop(oid, None)
+        cid = _int(order.get("customer_id"))
+        ids = self.by_customer.get(cid, [])
+        if oid in ids:
+            ids.remove(oid)
+        if not ids:
+            self.by_customer.pop(cid, None)
+        self._unlink_products(order, oid)
+        key = (str(order.get("created_at", "")), oid)
+        i = bisect_left(self.by_created, key)
+        if i < len(self.by_created) and self.by_created[i] == key:
+            del self.by_created[i]
+        if pos is not None:
+            for k, v in self.positions.items():
+                if v > pos:
+                    self.positions[k] = v - 1
+
+    # ---------- lookups ----------
+
+    def orders_for_customer(self, customer_id: int) -> List[int]:
+        return list(self.by_customer.get(int(customer_id), []))
+
+    def orders_for_product(self, product_id: int) -> List[int]:
+        return list(self.by_product.get(int(product_id), []))
+
+    def orders_created_between(self, start: str = "", end: Optional[str] = None) -> List[int]:
+        """Order ids with start <= created_at <= end (ISO strings compare chronologically)."""
+        lo = bisect_left(self.by_created, (start, -1))
+        hi = len(self.by_created) if end is None else bisect_right(self.by_created, (end, float("inf")))
+        return [oid for _, oid in self.by_created[lo:hi]]
+
+    def position_of(self, order_id: int) -> Optional[int]:
+        return self.positions.get(int(order_id))
+
+    def offsets_of(self, order_ids: Iterable[int]) -> Optional[Dict[int, int]]:
+        """{order_id: byte offset} for the ids, or None unless every one is known (order log layout)."""
+        found = {}
+        for oid in order_ids:
+            offset = self.offsets.get(int(oid))
+            if offset is None:
+                return None
+            found[int(oid)] = offset
+        return found
+
+
+# ---------------- Persistence ----------------
+
+def save_order_index(index: OrderIndex, orders_path: Path, *, snapshot: bool = False) -> None:
+    """
+    Persist the index's recorded changes (a line appended to its delta log, or
+    a full snapshot with snapshot=True) stamped with the orders file's current
+    signature, and share it in this process.
+    """
+    orders_path = Path(orders_path)
+    save_sidecar(index, index_path_for(orders_path), orders_path, snapshot=snapshot)
+    file_cache.put(orders_path, index, tag="order_index")
+
+def rebuild_order_index(orders_path: Path) -> OrderIndex:
+    """Regenerate the index from the orders file (streamed) and save a snapshot."""
+    orders_path = Path(orders_path)
+    with file_lock(lock_path_for(orders_path)):   # no write lands mid-rebuild
+        if not is_order_log(orders_path):
+            index = OrderIndex.build(iter_orders(orders_path))
+        else:
+            # read from disk rather than a cached replay, noting where each order is
+            offsets: Dict[int, int] = {}
+            def orders() -> Iterator[Dict]:
+                for offset, order in iter_order_log_entries(orders_path):
+                    oid = _int(order.get("order_id"))
+                    if oid is not None:
+                        offsets[oid] = offset
+                    yield order
+            index = OrderIndex.build(orders())
+            index.offsets = offsets
+        save_order_index(index, orders_path, snapshot=True)
+    return index
+
+def _load_or_rebuild(orders_path: Path) -> OrderIndex:
+    index = read_sidecar(index_path_for(orders_path), OrderIndex.from_dict)
+    if index is None or index.source != stamp_of(orders_path):
+        return rebuild_order_index(orders_path)
+    return index
+
+def load_order_index(orders_path: Path) -> OrderIndex:
+    """
+    The persisted index (snapshot plus delta log) if it matches the orders file
+    as it is now; otherwise (missing, corrupt, or the orders file was written
+    without updating it) it is rebuilt. Parsed once per version of the orders
+    file and shared: order writers update it only while holding the orders lock,
+    and save it straight after committing. Everyone else must treat it as read-only.
+    """
+    return file_cache.get(Path(orders_path), _load_or_rebuild, tag="order_index")
+
+
+# ---------------- Reading indexed orders ----------------
+
+def _find_order_position(orders: List[Dict], order_id: int, index: OrderIndex) -> int:
+    """Position of order_id in `orders` via the index (falls back to a scan); -1 if absent."""
+    try:
+        oid = int(order_id)
+    except (TypeError, ValueError):
+        return -1
+    pos = index.position_of(oid)
+    if pos is not None and pos < len(orders) and str(orders[pos].get("order_id")) == str(oid):
+        return pos
+    for i, o in enumerate(orders):
+        try:
+            if int(o.get("order_id")) == oid:
+                return i
+        except (TypeError, ValueError):
+            continue
+    return -1
+
+def _recent_first(orders: Iterable[Dict]) -> List[Dict]:
+    def _key(o):
+        return (o.get("created_at", ""), int(o.get("order_id", 0)))
+    return sorted(orders, key=_key, reverse=True)
+
+def orders_at(orders_path: Path, order_ids: List[int], index: OrderIndex) -> List[Dict]:
+    """
+    Resolve indexed order ids to records, most recent first. Uses the cached
+    orders list when it is already in memory; for an order log, reads just those
+    records at their indexed byte offsets; otherwise streams the file and keeps
+    only the requested orders.
+    """
+    if not order_ids:
+        return []
+    cached = file_cache.peek(orders_path)
+    if cached is not None:
+        out = []
+        for oid in order_ids:
+            pos = _find_order_position(cached, oid, index)
+            if pos >= 0:
+                out.append(dict(cached[pos]))
+        return _recent_first(out)
+    offsets = index.offsets_of(order_ids)
+    found = read_orders_at(orders_path, offsets) if offsets else None
+    if found is not None:
+        return _recent_first(dict(o) for o in found)
+    return _recent_first(dict(o) for o in iter_orders(orders_path, order_ids=order_ids))
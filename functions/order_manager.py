@@ -1,15 +1,25 @@
 # functions/order_store.py
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
 from pathlib import Path
 import json
 from datetime import datetime
 import uuid
+import functools
 from decimal import Decimal
 from env import DEFAULT_ORDER_PATH, DEFAULT_PRODUCT_PATH, DEFAULT_CATEGORIES_PATH, DEFAULT_CUSTOMER_PATH
-from functions.product_manager import delete_product, load_products, save_products, add_product, _convert_product_price_from_string, _convert_product_stock, _sorted_product, sort_products, _convert_product_price_from_string
+from functions.product_manager import delete_product, load_products, save_products, get_products_by_id, update_products, stage_product_updates, tracking_product_changes, add_product, _convert_product_price_from_string, _convert_product_stock, _sorted_product, sort_products, _convert_product_price_from_string
 from functions.category_manager import list_categories, add_category
 from functions.product_categories import get_category_menu, assign_category_to_product_by_index
 from functions.customer_manager import list_customers_sorted, get_customer_by_id, get_customer_orders
+from functions.cache import file_cache
+from functions.journal import Transaction
+from functions.order_stream import iter_orders
+from functions.order_store import get_order_store
+from functions.sequences import next_id, reserve_ids
+from functions.product_store import get_product_store, product_version, versions_match
+from functions.locks import file_lock, lock_path_for
+from functions.order_index import OrderIndex, load_order_index, save_order_index, rebuild_order_index, orders_at, _recent_first
+from functions.customer_summary import load_customer_summaries, save_customer_summaries
 
 ORDERS_PATH: Path = DEFAULT_ORDER_PATH
 PRODUCT_PATH: Path = DEFAULT_PRODUCT_PATH
@@ -20,18 +30,10 @@ CATEGORY_PATH: Path = DEFAULT_CATEGORIES_PATH
 # ---------------- Load ----------------
 
 def load_orders(path: Path = DEFAULT_ORDER_PATH) -> List[Dict]:
-    if not path.exists():
-        return []
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, OSError):
-        return []
+    return get_order_store(path).load_all()
 
 def save_orders(orders: List[Dict], path: Path = DEFAULT_ORDER_PATH) -> None:
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(orders, f, ensure_ascii=False, indent=2)
+    get_order_store(path).save_all(orders)
 
 def _next_order_id(orders: List[Dict]) -> int:
     max_id = 0
@@ -88,8 +90,100 @@ def _calc_lines_and_total(norm: List[Dict], product_by_id: Dict[int, Dict]) -> T
         })
     return line_items, grand_total
 
+def _get_order(orders_path: Path, order_id, index: OrderIndex) -> Optional[Dict]:
+    """A private copy of one order, or None if absent."""
+    try:
+        oid = int(order_id)
+    except (TypeError, ValueError):
+        return None
+    found = orders_at(orders_path, [oid], index)
+    return found[0] if found else None
+
+def _parse_customer_id(customer_id) -> Optional[int]:
+    try:
+        cid = int(customer_id)
+    except (TypeError, ValueError):
+        return None
+    return cid if cid > 0 else None
+
+def _parse_created_at(value) -> Optional[str]:
+    """A feed's created_at as an ISO-8601 string (as add_order writes them), or None if it isn't one."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError:
+        return None
+    return value
+
+def _stock_error(norm: List[Dict], product_by_id: Dict[int, Dict], allow_negative_stock: bool) -> Optional[str]:
+    """Return why `norm` can't be fulfilled from product_by_id, or None if it can."""
+    for it in norm:
+        pid = it["product_id"]
+        qty = it["qty"]
+        product = product_by_id.get(pid)
+        if not product:
+            return f"Product with product_id {pid} not found."
+        cur_stock = int(product.get("product_stock", 0) or 0)
+        if not allow_negative_stock and cur_stock - qty < 0:
+            name = product.get("name", "(unnamed)")
+            return f"Insufficient stock for '{name}' (id {pid}). Have {cur_stock}, need {qty}."
+    return None
+
+def _apply_stock(norm: List[Dict], product_by_id: Dict[int, Dict]) -> None:
+    """Decrement stock and increment totals in place for an accepted order."""
+    for it in norm:
+        p = product_by_id[it["product_id"]]
+        p["product_total_ordered"] = int(p.get("product_total_ordered", 0) or 0) + it["qty"]
+        p["product_stock"] = int(p.get("product_stock", 0) or 0) - it["qty"]
+        p["version"] = product_version(p) + 1
+
+# ---------------- Concurrency ----------------
+# Every order writer holds the orders lock for its whole read-validate-write cycle,
+# and the product store lock from the moment it reads stock until it commits, so
+# two checkout processes can never both pass the stock check on the same units.
+# Product records also carry a "version" that is bumped on every stock change;
+# the commit is a compare-and-set against the versions that were read.
+
+def _serialised(fn):
+    """Run an order writer under the orders lock and the product store lock."""
+    @functools.wraps(fn)
+    def wrapper(*args, orders_path: Path = DEFAULT_ORDER_PATH, products_path: Path = DEFAULT_PRODUCT_PATH, **kwargs):
+        with file_lock(lock_path_for(orders_path)), get_product_store(products_path).lock():
+            return fn(*args, orders_path=orders_path, products_path=products_path, **kwargs)
+    return wrapper
+
+def _commit(
+    orders_path: Path,
+    products_path: Path,
+    products: Iterable[Dict],
+    expected_versions: Dict[int, int],
+    *,
+    put: Iterable[Dict] = (),
+    delete: Iterable[int] = ()
+) -> bool:
+    """
+    Write new/changed orders (put), deleted order ids and changed products in one
+    Transaction, if no product changed since it was read.
+    """
+    store = get_product_store(products_path)
+    products = list(products)
+    # holds the store lock; keeps category rollups and the search index current
+    with tracking_product_changes(products_path) as touched:
+        if not versions_match(store, expected_versions):
+            print("Stock changed while the order was being processed. Nothing was saved; please try again.")
+            return False
+        txn = Transaction(orders_path.parent)
+        get_order_store(orders_path).stage_changes(txn, put=put, delete=delete)
+        stage_product_updates(txn, products, products_path)
+        txn.commit()
+        touched.update(int(p["product_id"]) for p in products)
+    return True
+
 # ---------------- Public API ----------------
 
+@_serialised
 def add_order(
     items: List[Dict],
     *,
@@ -107,37 +201,27 @@ def add_order(
         print("Invalid items. Expect a non-empty list of {product_id, qty>=1}.")
         return None
 
-    try:
-        cid = int(customer_id)
-        if cid <= 0:
-            raise ValueError
-    except (TypeError, ValueError):
+    cid = _parse_customer_id(customer_id)
+    if cid is None:
         print("Invalid customer_id.")
         return None
 
-    products = load_products(products_path)
-    if not products:
+    product_by_id = get_products_by_id([it["product_id"] for it in norm], products_path)
+    if not product_by_id:
         print("No products exist.")
         return None
-    product_by_id = _index_products_by_id(products)
+    expected = {pid: product_version(p) for pid, p in product_by_id.items()}
 
     # Validate existence + stock
-    for it in norm:
-        pid = it["product_id"]
-        qty = it["qty"]
-        product = product_by_id.get(pid)
-        if not product:
-            print(f"Product with product_id {pid} not found.")
-            return None
-        cur_stock = int(product.get("product_stock", 0) or 0)
-        if not allow_negative_stock and cur_stock - qty < 0:
-            name = product.get("name", "(unnamed)")
-            print(f"Insufficient stock for '{name}' (id {pid}). Have {cur_stock}, need {qty}.")
-            return None
+    error = _stock_error(norm, product_by_id, allow_negative_stock)
+    if error:
+        print(error)
+        return None
 
     # Build order object
-    orders = load_orders(orders_path)
-    order_id = _next_order_id(orders)
+    index = load_order_index(orders_path)
+    summaries = load_customer_summaries(orders_path)
+    order_id = next_id(orders_path, seed=lambda: _next_order_id(load_orders(orders_path)))
     order_uuid = str(uuid.uuid4())
     created_at = datetime.utcnow().isoformat() + "Z"
 
@@ -151,19 +235,130 @@ def add_order(
         "items": line_items,          # each has price and subtotal
         "order_total": grand_total,   # grand total
     }
-    orders.append(order)
-    save_orders(orders, orders_path)
 
     # Update product totals & stock
-    for it in norm:
-        p = product_by_id[it["product_id"]]
-        p["product_total_ordered"] = int(p.get("product_total_ordered", 0) or 0) + it["qty"]
-        p["product_stock"] = int(p.get("product_stock", 0) or 0) - it["qty"]
-    save_products(products, products_path)
+    _apply_stock(norm, product_by_id)
+
+    # Orders and stock are committed together (see functions/journal.py)
+    store = get_order_store(orders_path)
+    start = store.end_offset()
+    if not _commit(orders_path, products_path, product_by_id.values(), expected, put=[order]):
+        return None
+    index.add(order, len(index.positions), store.offsets_since(start).get(order_id))
+    save_order_index(index, orders_path)
+    summaries.add(order)
+    save_customer_summaries(summaries, orders_path)
 
     print(f"Created order #{order_id} (uuid {order_uuid}) for customer #{cid} | total £{grand_total:.2f}")
     return order
 
+@_serialised
+def add_orders_bulk(
+    orders_in: Iterable[Dict],
+    *,
+    orders_path: Path = DEFAULT_ORDER_PATH,
+    products_path: Path = DEFAULT_PRODUCT_PATH,
+    allow_negative_stock: bool = False,
+    all_or_nothing: bool = False
+) -> Dict:
+    """
+    Create many orders with one catalog load and one commit.
+    Each entry is {"customer_id": int, "items": [{product_id, qty}, ...]} and may carry
+    its own "created_at" (e.g. when replaying a marketplace feed).
+
+    Stock is checked against a single in-memory product index, so later orders in the
+    batch see the stock taken by earlier ones. Invalid orders are rejected and reported;
+    with all_or_nothing=True one rejection cancels the whole batch.
+
+    Returns a report: {"accepted": [order, ...], "rejected": [{"entry", "reason"}, ...], "committed": bool}
+    """
+    products = load_products(products_path)
+    product_by_id = _index_products_by_id(products)
+    loaded_versions = {pid: product_version(p) for pid, p in product_by_id.items()}
+    index = load_order_index(orders_path)
+    summaries = load_customer_summaries(orders_path)
+
+    accepted: List[Dict] = []
+    rejected: List[Dict] = []
+    touched: Dict[int, Dict] = {}
+
+    for entry_no, entry in enumerate(orders_in, start=1):
+        if not isinstance(entry, dict):
+            rejected.append({"entry": entry_no, "reason": "Malformed order (expected a JSON object)."})
+            continue
+        norm = _normalize_items(entry.get("items"))
+        if norm is None:
+            rejected.append({"entry": entry_no, "reason": "Invalid items. Expect a non-empty list of {product_id, qty>=1}."})
+            continue
+        cid = _parse_customer_id(entry.get("customer_id"))
+        if cid is None:
+            rejected.append({"entry": entry_no, "reason": "Invalid customer_id."})
+            continue
+        created_at = datetime.utcnow().isoformat() + "Z"
+        if entry.get("created_at") is not None:
+            created_at = _parse_created_at(entry.get("created_at"))
+            if created_at is None:
+                rejected.append({"entry": entry_no, "reason": "Invalid created_at (expected an ISO-8601 timestamp)."})
+                continue
+        error = _stock_error(norm, product_by_id, allow_negative_stock)
+        if error:
+            rejected.append({"entry": entry_no, "reason": error})
+            continue
+
+        line_items, grand_total = _calc_lines_and_total(norm, product_by_id)
+        order = {
+            "order_id": None,             # allocated for the whole batch below
+            "order_uuid": str(uuid.uuid4()),
+            "customer_id": cid,
+            "created_at": created_at,
+            "items": line_items,
+            "order_total": grand_total,
+        }
+        _apply_stock(norm, product_by_id)
+        for it in norm:
+            touched[it["product_id"]] = product_by_id[it["product_id"]]
+        accepted.append(order)
+
+    committed = False
+    if accepted and not (all_or_nothing and rejected):
+        for order, order_id in zip(accepted, reserve_ids(orders_path, len(accepted),
+                                                         seed=lambda: _next_order_id(load_orders(orders_path)))):
+            order["order_id"] = order_id
+        expected = {pid: loaded_versions[pid] for pid in touched}
+        store = get_order_store(orders_path)
+        start = store.end_offset()
+        committed = _commit(orders_path, products_path, touched.values(), expected, put=accepted)
+    if committed:
+        offsets = store.offsets_since(start)
+        for order in accepted:
+            index.add(order, len(index.positions), offsets.get(order["order_id"]))
+            summaries.add(order)
+        save_order_index(index, orders_path)
+        save_customer_summaries(summaries, orders_path)
+
+    if all_or_nothing and rejected:
+        print(f"Batch cancelled: {len(rejected)} of {len(accepted) + len(rejected)} orders rejected.")
+    else:
+        print(f"Imported {len(accepted)} orders, rejected {len(rejected)}.")
+    return {"accepted": accepted if committed else [], "rejected": rejected, "committed": committed}
+
+def read_orders_jsonl(path: Path) -> Iterator:
+    """
+    Stream orders from a JSONL file (one JSON object per line) for add_orders_bulk.
+    Blank lines are skipped; malformed lines are passed through as raw text so the
+    import report can reject them.
+    """
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+
+@_serialised
 def edit_order(
     order_id: int,
     new_items: List[Dict],
@@ -176,26 +371,23 @@ def edit_order(
     Replace an order's items with new_items (same format as add_order).
     Safely restocks previous items, then applies new stock deductions.
     """
-    orders = load_orders(orders_path)
-    target = None
-    for o in orders:
-        try:
-            if int(o.get("order_id")) == int(order_id):
-                target = o
-                break
-        except (TypeError, ValueError):
-            continue
-    if not target:
+    index = load_order_index(orders_path)
+    summaries = load_customer_summaries(orders_path)
+    target = _get_order(orders_path, order_id, index)
+    if target is None:
         print("Order not found.")
         return None
+    before = dict(target)
 
     norm = _normalize_items(new_items)
     if norm is None:
         print("Invalid items. Expect a non-empty list of {product_id, qty>=1}.")
         return None
 
-    products = load_products(products_path)
-    product_by_id = _index_products_by_id(products)
+    touched = {int(li.get("product_id")) for li in target.get("items", [])}
+    touched.update(it["product_id"] for it in norm)
+    product_by_id = get_products_by_id(touched, products_path)
+    expected = {pid: product_version(p) for pid, p in product_by_id.items()}
 
     # Step 1: Restock old items / roll back totals
     for li in target.get("items", []):
@@ -205,6 +397,7 @@ def edit_order(
         if p:
             p["product_total_ordered"] = int(p.get("product_total_ordered", 0) or 0) - qty
             p["product_stock"] = int(p.get("product_stock", 0) or 0) + qty
+            p["version"] = product_version(p) + 1
 
     # Step 2: Validate new stock availability
     for it in norm:
@@ -212,41 +405,38 @@ def edit_order(
         p = product_by_id.get(pid)
         if not p:
             print(f"Product with product_id {pid} not found.")
-            # restore original state
-            for li in target.get("items", []):
-                ps = product_by_id.get(int(li.get("product_id")))
-                if ps:
-                    ps["product_total_ordered"] = int(ps.get("product_total_ordered", 0) or 0) + int(li.get("qty", 0))
-                    ps["product_stock"] = int(ps.get("product_stock", 0) or 0) - int(li.get("qty", 0))
-            save_products(products, products_path)
+            # nothing has been written yet, so the stored stock is unchanged
             return None
         cur_stock = int(p.get("product_stock", 0) or 0)
         if not allow_negative_stock and cur_stock - qty < 0:
             print(f"Insufficient stock for '{p.get('name','(unnamed)')}' (id {pid}). Have {cur_stock}, need {qty}.")
-            # restore original state
-            for li in target.get("items", []):
-                ps = product_by_id.get(int(li.get("product_id")))
-                if ps:
-                    ps["product_total_ordered"] = int(ps.get("product_total_ordered", 0) or 0) + int(li.get("qty", 0))
-                    ps["product_stock"] = int(ps.get("product_stock", 0) or 0) - int(li.get("qty", 0))
-            save_products(products, products_path)
+            # nothing has been written yet, so the stored stock is unchanged
             return None
 
     # Step 3: Apply new items to stock + totals
-    for it in norm:
-        p = product_by_id[it["product_id"]]
-        p["product_total_ordered"] = int(p.get("product_total_ordered", 0) or 0) + it["qty"]
-        p["product_stock"] = int(p.get("product_stock", 0) or 0) - it["qty"]
-    save_products(products, products_path)
+    _apply_stock(norm, product_by_id)
 
     # Step 4: Recompute order lines + total
     line_items, grand_total = _calc_lines_and_total(norm, product_by_id)
     target["items"] = line_items
     target["order_total"] = grand_total
-    save_orders(orders, orders_path)
+
+    store = get_order_store(orders_path)
+    start = store.end_offset()
+    if not _commit(orders_path, products_path, product_by_id.values(), expected, put=[target]):
+        return None
+    if store.moves_on_update:
+        index.remove(before)
+        index.add(target, len(index.positions), store.offsets_since(start).get(int(target["order_id"])))
+    else:
+        index.replace_items(before, target)
+    save_order_index(index, orders_path)
+    summaries.replace(before, target)
+    save_customer_summaries(summaries, orders_path)
     print(f"Edited order #{order_id} | new total £{grand_total:.2f}")
     return target
 
+@_serialised
 def delete_order(
     order_id: int,
     *,
@@ -256,33 +446,33 @@ def delete_order(
     """
     Delete an order and restock products / roll back totals.
     """
-    orders = load_orders(orders_path)
-    index = -1
-    for i, o in enumerate(orders):
-        try:
-            if int(o.get("order_id")) == int(order_id):
-                index = i
-                break
-        except (TypeError, ValueError):
-            continue
-    if index == -1:
+    index = load_order_index(orders_path)
+    summaries = load_customer_summaries(orders_path)
+    removed = _get_order(orders_path, order_id, index)
+    if removed is None:
         print("Order not found.")
         return False
 
     # Restock + roll back totals
-    products = load_products(products_path)
-    product_by_id = _index_products_by_id(products)
-    for li in orders[index].get("items", []):
+    product_by_id = get_products_by_id(
+        [int(li.get("product_id")) for li in removed.get("items", [])], products_path)
+    expected = {pid: product_version(p) for pid, p in product_by_id.items()}
+    for li in removed.get("items", []):
         pid = int(li.get("product_id"))
         qty = int(li.get("qty", 0))
         p = product_by_id.get(pid)
         if p:
             p["product_total_ordered"] = int(p.get("product_total_ordered", 0) or 0) - qty
             p["product_stock"] = int(p.get("product_stock", 0) or 0) + qty
-    save_products(products, products_path)
+            p["version"] = product_version(p) + 1
 
-    removed = orders.pop(index)
-    save_orders(orders, orders_path)
+    if not _commit(orders_path, products_path, product_by_id.values(), expected,
+                   delete=[int(removed["order_id"])]):
+        return False
+    index.remove(removed)
+    save_order_index(index, orders_path)
+    summaries.remove(removed)
+    save_customer_summaries(summaries, orders_path)
     print(f"Deleted order #{removed.get('order_id')} (uuid {removed.get('order_uuid')}).")
     return True
 
@@ -290,20 +480,16 @@ def delete_order(
 
 def list_orders(*, orders_path: Path = DEFAULT_ORDER_PATH) -> List[Dict]:
     """All orders, most recent first."""
-    data = load_orders(orders_path)
-    def _key(o):
-        return (o.get("created_at", ""), int(o.get("order_id", 0)))
-    return sorted(data, key=_key, reverse=True)
+    return _recent_first(dict(o) for o in iter_orders(orders_path))
 
 def list_orders_for_customer(customer_id: int, *, orders_path: Path = DEFAULT_ORDER_PATH) -> List[Dict]:
-    out = [o for o in load_orders(orders_path) if int(o.get("customer_id", -1)) == int(customer_id)]
-    def _key(o):
-        return (o.get("created_at", ""), int(o.get("order_id", 0)))
-    return sorted(out, key=_key, reverse=True)
+    index = load_order_index(orders_path)
+    return orders_at(orders_path, index.orders_for_customer(customer_id), index)
 
 def get_orders_for_product(product_id: int, *, orders_path: Path = DEFAULT_ORDER_PATH) -> List[Dict]:
+    index = load_order_index(orders_path)
     out: List[Dict] = []
-    for o in load_orders(orders_path):
+    for o in orders_at(orders_path, index.orders_for_product(product_id), index):
         for li in o.get("items", []):
             try:
                 if int(li.get("product_id")) == int(product_id):
@@ -320,3 +506,13 @@ def get_orders_for_product(product_id: int, *, orders_path: Path = DEFAULT_ORDER
     def _key(r):
         return (r.get("created_at", ""), int(r.get("order_id", 0)))
     return sorted(out, key=_key, reverse=True)
+
+def list_orders_created_between(
+    start: str = "",
+    end: Optional[str] = None,
+    *,
+    orders_path: Path = DEFAULT_ORDER_PATH
+) -> List[Dict]:
+    """Orders with start <= created_at <= end (ISO-8601 strings), most recent first."""
+    index = load_order_index(orders_path)
+    return orders_at(orders_path, index.orders_created_between(start, end), index)
@@ -0,0 +1,164 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Tuple
+import json
+from functions.cache import cached_json_list, copy_records, file_cache, file_signature
+from functions.journal import atomic_write_json, atomic_write_lines, Transaction
+from functions.locks import file_lock, lock_path_for
+from functions.order_stream import is_order_log, iter_log_records, replay_order_log, log_put_offsets
+from functions.order_index import load_order_index, save_order_index
+from functions.customer_summary import load_customer_summaries, save_customer_summaries
+
+
+def _order_id(order: Dict) -> Optional[int]:
+    try:
+        return int(order.get("order_id"))
+    except (TypeError, ValueError):
+        return None
+
+def _put_line(order: Dict) -> str:
+    return json.dumps({"op": "put", "order": order}, ensure_ascii=False)
+
+def _del_line(order_id: int) -> str:
+    return json.dumps({"op": "del", "order_id": int(order_id)})
+
+
+# ---------------- JSON list file (original layout) ----------------
+
+class JsonOrderStore:
+    """
+    The original storage/orders.json layout: one JSON array, rewritten in
+    full on every change. Edited orders keep their position in the list.
+    """
+    moves_on_update = False
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load_all(self) -> List[Dict]:
+        return cached_json_list(self.path)
+
+    def save_all(self, orders: List[Dict]) -> None:
+        atomic_write_json(self.path, orders)
+
+    def stage_changes(self, txn: Transaction, put: Iterable[Dict] = (), delete: Iterable[int] = ()) -> None:
+        """Stage new/replaced orders and deletions as part of txn."""
+        orders = self.load_all()
+        gone = {int(oid) for oid in delete}
+        by_id = {_order_id(o): i for i, o in enumerate(orders) if isinstance(o, dict)}
+        for order in put:
+            i = by_id.get(_order_id(order))
+            if i is None:
+                by_id[_order_id(order)] = len(orders)
+                orders.append(order)
+            else:
+                orders[i] = order
+        if gone:
+            orders = [o for o in orders if not (isinstance(o, dict) and _order_id(o) in gone)]
+        txn.write_json(self.path, orders)
+
+    def end_offset(self) -> Optional[int]:
+        return None
+
+    def offsets_since(self, start: Optional[int]) -> Dict[int, int]:
+        """Records aren't addressable by byte offset in this layout."""
+        return {}
+
+
+# ---------------- Append-only log (.jsonl) ----------------
+
+class OrderLogStore:
+    """
+    Orders kept as an append-only log (see order_stream.py for the record
+    format). Placing an order appends one line instead of rewriting every
+    previous order; edits append the new version and deletes a tombstone.
+    compact() rewrites the log as a snapshot of the live orders.
+    """
+    moves_on_update = True
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load_all(self) -> List[Dict]:
+        return copy_records(file_cache.get(self.path, replay_order_log))
+
+    def save_all(self, orders: List[Dict]) -> None:
+        atomic_write_lines(self.path, (_put_line(o) for o in orders))
+
+    def stage_changes(self, txn: Transaction, put: Iterable[Dict] = (), delete: Iterable[int] = ()) -> None:
+        lines = [_put_line(o) for o in put] + [_del_line(oid) for oid in delete]
+        if lines:
+            txn.add_op({"op": "append", "path": str(self.path), "lines": lines})
+
+    def end_offset(self) -> Optional[int]:
+        """Where the next append starts (take it under the orders lock, before committing)."""
+        sig = file_signature(self.path)
+        return sig[1] if sig else 0
+
+    def offsets_since(self, start: Optional[int]) -> Dict[int, int]:
+        """{order_id: byte offset} of the orders put since end_offset() returned `start`."""
+        return log_put_offsets(self.path, start or 0)
+
+    def garbage(self) -> Tuple[int, int]:
+        """(records in the log, live orders); the difference is what compaction reclaims."""
+        records = sum(1 for _ in iter_log_records(self.path))
+        return records, len(file_cache.get(self.path, replay_order_log))
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Rewrite the log as one put per live order, in the same order, so the
+        order index only needs its byte offsets updated and the customer summaries
+        re-stamping; both are saved as fresh snapshots. Holds the orders lock so no append is lost. Returns (records before, records after).
+        """
+        with file_lock(lock_path_for(self.path)):
+            index = load_order_index(self.path)
+            summaries = load_customer_summaries(self.path)
+            before, _ = self.garbage()
+            orders = file_cache.get(self.path, replay_order_log)
+            offsets: Dict[int, int] = {}
+            def lines():
+                at = 0
+                for order in orders:
+                    line = _put_line(order)
+                    oid = _order_id(order)
+                    if oid is not None:
+                        offsets[oid] = at
+                    at += len(line.encode("utf-8")) + 1
+                    yield line
+            atomic_write_lines(self.path, lines())
+            index.offsets = offsets
+            save_order_index(index, self.path, snapshot=True)   # also folds its delta log
+            save_customer_summaries(summaries, self.path, snapshot=True)
+        return before, len(orders)
+
+
+def get_order_store(path: Path):
+    """Pick the layout from the file suffix: .jsonl => append-only log, otherwise a JSON array."""
+    path = Path(path)
+    if is_order_log(path):
+        return OrderLogStore(path)
+    return JsonOrderStore(path)
+
+
+def compact_orders(path: Path, *, min_garbage: int = 0, min_ratio: float = 0.0) -> Optional[Tuple[int, int]]:
+    """
+    Compact an order log if at least min_garbage records and min_ratio of the
+    log are superseded or deleted. Returns (records before, after), or None
+    when nothing was done.
+    """
+    store = get_order_store(path)
+    if not isinstance(store, OrderLogStore) or not store.path.exists():
+        return None
+    records, live = store.garbage()
+    dead = records - live
+    if dead <= 0 or dead < min_garbage or dead < min_ratio * records:
+        return None
+    return store.compact()
+
+
+def migrate_orders(source: Path, destination: Path) -> int:
+    """Copy every order from one layout to another (e.g. orders.json -> orders.jsonl). Returns the count."""
+    orders = get_order_store(source).load_all()
+    destination = Path(destination)
+    with file_lock(lock_path_for(destination)):
+        get_order_store(destination).save_all(orders)
+    return len(orders)
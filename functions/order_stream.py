@@ -0,0 +1,271 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Callable, Tuple
+import json
+from env import DEFAULT_ORDER_PATH
+from functions.cache import file_cache
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\r\n"
+
+# Orders paths ending in .jsonl use the append-only log layout (see order_store.py)
+LOG_SUFFIX = ".jsonl"
+
+
+def iter_json_array(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array one at a time, reading the
+    file in chunks, so memory is bounded by the largest single element rather
+    than the whole file. A missing, empty or truncated file simply ends the
+    iteration (same leniency as load_orders).
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    decoder = json.JSONDecoder()
+    with path.open("r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip(chars: str) -> Optional[str]:
+            """Skip `chars`; return the next significant character (None at EOF)."""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    return None
+
+        if skip(_WHITESPACE) != "[":
+            return
+        pos += 1
+        while True:
+            ch = skip(_WHITESPACE + ",")
+            if ch is None or ch == "]":
+                return
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # element continues in the next chunk
+                    if not fill():
+                        return
+                    continue
+                # a number cut off by the chunk end still decodes ("123" of "12345",
+                # "-9" of "-9.25"): only trust a decode followed by a delimiter, or at EOF
+                if (end < len(buf) and buf[end] in _WHITESPACE + ",]") or not fill():
+                    break
+            pos = end
+            yield item
+
+
+# ---------------- Append-only order log ----------------
+# One JSON record per line:
+#   {"op": "put", "order": {...}}    order created or replaced
+#   {"op": "del", "order_id": 7}     tombstone
+# The last record for an order id wins. Live orders are listed in the order
+# of their latest put, so an edited order moves to the end. The byte offset of
+# an order's latest put (kept in the order index) lets one order be read back
+# with a seek instead of a replay.
+
+def is_order_log(path: Path) -> bool:
+    return Path(path).suffix.lower() == LOG_SUFFIX
+
+def _log_order_id(record: Dict) -> Optional[int]:
+    try:
+        if record.get("op") == "del":
+            return int(record.get("order_id"))
+        return int(record["order"].get("order_id"))
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
+
+def _parse_log_line(line: bytes) -> Optional[Dict]:
+    """A well-formed put/del record, or None for a blank, torn or unknown line."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(record, dict):
+        return None
+    if record.get("op") == "put" and isinstance(record.get("order"), dict):
+        return record
+    if record.get("op") == "del":
+        return record
+    return None
+
+def _log_records(f) -> Iterator[Tuple[int, Dict]]:
+    """(byte offset, record) for the well-formed records of a log opened in binary mode, from where f is."""
+    offset = f.tell()
+    for line in f:
+        start, offset = offset, offset + len(line)
+        record = _parse_log_line(line)
+        if record is not None:
+            yield start, record
+
+def iter_log_records(path: Path) -> Iterator[Dict]:
+    """Yield the well-formed records of an order log; blank, torn or unknown lines are skipped."""
+    path = Path(path)
+    if not path.exists():
+        return
+    with path.open("rb") as f:
+        for _, record in _log_records(f):
+            yield record
+
+def replay_order_log(path: Path) -> List[Dict]:
+    """The live orders of a log as a list (one pass; holds every live order)."""
+    live: Dict = {}
+    for n, record in enumerate(iter_log_records(path)):
+        oid = _log_order_id(record)
+        key = oid if oid is not None else ("line", n)
+        live.pop(key, None)
+        if record["op"] == "put":
+            live[key] = record["order"]
+    return list(live.values())
+
+def iter_order_log_entries(path: Path) -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream (byte offset of its put, order) for the live orders of a log in two
+    passes: the first notes where each order id's final record is, the second
+    yields those puts. Memory is one int per order id rather than the orders themselves.
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    # both passes read the same open file, so a compaction that replaces the
+    # log in between cannot shift the offsets
+    with path.open("rb") as f:
+        last: Dict[int, int] = {}
+        for offset, record in _log_records(f):
+            oid = _log_order_id(record)
+            if oid is not None:
+                last[oid] = offset
+        f.seek(0)
+        for offset, record in _log_records(f):
+            if record["op"] != "put":
+                continue
+            oid = _log_order_id(record)
+            if oid is None or last.get(oid) == offset:
+                yield offset, record["order"]
+
+def iter_order_log(path: Path) -> Iterator[Dict]:
+    """The live orders of a log, streamed (see iter_order_log_entries)."""
+    for _, order in iter_order_log_entries(path):
+        yield order
+
+def log_put_offsets(path: Path, start: int = 0) -> Dict[int, int]:
+    """
+    {order_id: byte offset} of the puts at or after byte `start` (e.g. the log's
+    size before a commit), later records winning; tombstoned ids are dropped.
+    Reads only from `start` on.
+    """
+    path = Path(path)
+    offsets: Dict[int, int] = {}
+    if not path.exists():
+        return offsets
+    with path.open("rb") as f:
+        f.seek(start)
+        for offset, record in _log_records(f):
+            oid = _log_order_id(record)
+            if oid is None:
+                continue
+            if record["op"] == "put":
+                offsets[oid] = offset
+            else:
+                offsets.pop(oid, None)
+    return offsets
+
+def read_orders_at(path: Path, offsets: Dict[int, int]) -> Optional[List[Dict]]:
+    """
+    The orders {order_id: byte offset} points at, read with one seek each (in file
+    order). None if any offset doesn't hold a put of that order (the log was
+    rewritten since the offsets were taken), so the caller can fall back to a scan.
+    """
+    path = Path(path)
+    found: List[Dict] = []
+    try:
+        with path.open("rb") as f:
+            for oid, offset in sorted(offsets.items(), key=lambda kv: kv[1]):
+                f.seek(offset)
+                record = _parse_log_line(f.readline())
+                if record is None or record["op"] != "put" or _log_order_id(record) != oid:
+                    return None
+                found.append(record["order"])
+    except OSError:
+        return None
+    return found
+
+
+# ---------------- Filtered iteration ----------------
+
+def _has_product(order: Dict, product_id: int) -> bool:
+    for li in order.get("items", []):
+        try:
+            if int(li.get("product_id")) == product_id:
+                return True
+        except (TypeError, ValueError):
+            continue
+    return False
+
+
+def iter_orders(
+    path: Path = DEFAULT_ORDER_PATH,
+    *,
+    customer_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    order_ids: Optional[Iterable[int]] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    where: Optional[Callable[[Dict], bool]] = None
+) -> Iterator[Dict]:
+    """
+    Stream orders from the orders file (JSON array or order log), applying the filters as each order is
+    parsed so only matching orders are ever kept. If the file is already in the
+    in-process cache it is iterated from there instead of being read again.
+    Yielded dicts may be shared with the cache: copy before editing.
+    """
+    cid = int(customer_id) if customer_id is not None else None
+    pid = int(product_id) if product_id is not None else None
+    wanted = {int(i) for i in order_ids} if order_ids is not None else None
+
+    cached = file_cache.peek(Path(path))
+    if cached is not None:
+        source = cached
+    elif is_order_log(path):
+        source = iter_order_log(path)
+    else:
+        source = iter_json_array(path)
+    for order in source:
+        if not isinstance(order, dict):
+            continue
+        try:
+            if wanted is not None and int(order.get("order_id")) not in wanted:
+                continue
+            if cid is not None and int(order.get("customer_id", -1)) != cid:
+                continue
+        except (TypeError, ValueError):
+            continue
+        if pid is not None and not _has_product(order, pid):
+            continue
+        created = str(order.get("created_at", ""))
+        if created_from is not None and created < created_from:
+            continue
+        if created_to is not None and created > created_to:
+            continue
+        if where is not None and not where(order):
+            continue
+        yield order
@@ -1,11 +1,14 @@
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple, Iterator
 from pathlib import Path
+from bisect import bisect_left, bisect_right
+from functions.cache import file_cache
 from functions.category_manager import list_categories, add_category
 from functions.product_manager import load_products, save_products
 from env import DEFAULT_PRODUCT_PATH, DEFAULT_CATEGORIES_PATH
 
-from functions.product_manager import load_products, save_products, DEFAULT_PRODUCT_PATH
-from functions.category_manager import list_categories, add_category, update_category_name, delete_category, delete_all_categories, list_category_tree, compute_category_display_codes, get_category_id_by_display_code, list_subcategories_with_codes_by_parent_code, _code_for_id
+from functions.product_manager import load_products, save_products, update_products, DEFAULT_PRODUCT_PATH
+from functions.product_store import get_product_store
+from functions.category_manager import list_categories, add_category, update_category_name, delete_category, delete_all_categories, list_category_tree, compute_category_display_codes, get_category_id_by_display_code, list_subcategories_with_codes_by_parent_code, get_category_tree, CategoryTree
 
 PRODUCTS_PATH: Path = DEFAULT_PRODUCT_PATH
 CATEGORIES_PATH: Path = DEFAULT_CATEGORIES_PATH
@@ -66,23 +69,44 @@ def get_category_picker_with_codes(categories_path: Path = CATEGORIES_PATH) -> L
     Hierarchical picker with display codes like:
       - [10] Guitars (id=12)
         - [10.1] Electric (id=13)
-    Returns lines (strings) for printing.
+    Returns lines (strings) for printing. Menus should page with category_picker_page().
     """
-    tree = list_category_tree(categories_path)
-    codes = compute_category_display_codes(categories_path, start_at=10)
-
-    def _walk(nodes, depth=0) -> List[str]:
-        out: List[str] = []
-        for n in nodes:
-            d = n["node"]
-            code = codes.get(int(d["category_id"]), "")
-            indent = "  " * depth
-            tag = "(Parent)" if d.get("parent_id") in (None, "") else ""
-            out.append(f"{indent}- [{code}] {d['name']} (id={d['category_id']}) {tag}".rstrip())
-            out.extend(_walk(n["children"], depth + 1))
-        return out
-
-    return _walk(tree)
+    return list(iter_category_picker_lines(categories_path))
+
+
+def _picker_end(tree: CategoryTree) -> int:
+    """Pre-order positions [0, end) cover the top-level categories' subtrees (orphans come after)."""
+    roots = tree.children(None)
+    return tree.interval[roots[-1].category_id][1] + 1 if roots else 0
+
+def iter_category_picker_lines(categories_path: Path = CATEGORIES_PATH, start: int = 0, code_start: int = 10) -> Iterator[str]:
+    """The picker lines from pre-order position `start` on, generated one at a time from the cached tree."""
+    tree = get_category_tree(categories_path, code_start)
+    for pos in range(max(0, start), _picker_end(tree)):
+        category = tree.by_id[tree.preorder[pos]]
+        code = tree.code_for(category.category_id)
+        tag = "(Parent)" if category.parent_id is None else ""
+        yield f"{'  ' * code.count('.')}- [{code}] {category.name} (id={category.category_id}) {tag}".rstrip()
+
+def category_picker_page(
+    start: int = 0,
+    page_size: int = 20,
+    *,
+    categories_path: Path = CATEGORIES_PATH,
+    code_start: int = 10
+) -> Tuple[List[str], int]:
+    """(picker lines start .. start+page_size-1, total number of lines). O(page_size)."""
+    tree = get_category_tree(categories_path, code_start)
+    lines = iter_category_picker_lines(categories_path, start, code_start)
+    return [line for line, _ in zip(lines, range(max(0, int(page_size))))], _picker_end(tree)
+
+def seek_category_code(code: str, categories_path: Path = CATEGORIES_PATH, code_start: int = 10) -> Optional[int]:
+    """Picker line number (0-based) of the category with display code `code`, or None."""
+    tree = get_category_tree(categories_path, code_start)
+    cid = tree.id_for_code(code)
+    if cid is None or cid not in tree.interval:
+        return None
+    return tree.interval[cid][0]
 
 
 # ---------- Assignment helpers ----------
@@ -124,7 +148,7 @@ def assign_category_to_product_by_index(
 
     products[products_index]["category_id"] = cid
     products[products_index]["category_name"] = cname
-    save_products(products, products_path)
+    update_products([products[products_index]], products_path)
     print(f"Assigned '{products[products_index].get('name','(unnamed)')}' → {cname} (id={cid})")
     return True
 
@@ -144,17 +168,14 @@ def assign_category_to_product_by_code(
         print("Code is required.")
         return False
 
-    cid = get_category_id_by_display_code(category_code.strip(), path=categories_path, start_at=code_start)
+    tree = get_category_tree(categories_path, code_start)
+    cid = tree.id_for_code(category_code)
     if cid is None:
         print("Category code not found.")
         return False
 
     # find the category name for storing on the product
-    categories = list_categories(categories_path)
-    category = next((c for c in categories if int(c["category_id"]) == int(cid)), None)
-    if not category:
-        print("Category not found.")
-        return False
+    category = tree.by_id[cid].to_dict()
 
     products = load_products(products_path)
     if products_index < 0 or products_index >= len(products):
@@ -163,13 +184,55 @@ def assign_category_to_product_by_code(
 
     products[products_index]["category_id"] = int(cid)
     products[products_index]["category_name"] = category["name"]
-    save_products(products, products_path)
+    update_products([products[products_index]], products_path)
     print(f"Assigned '{products[products_index].get('name','(unnamed)')}' → {category['name']} [{category_code}] (id={cid})")
     return True
 
 
 # ---------- Filtering helpers ----------
 
+class ProductsByCategory:
+    """
+    Product ids grouped by their category's pre-order number (see
+    CategoryTree.interval), so every product under a category, at any depth,
+    is one contiguous run found with two bisects. Built from the product
+    store's category index once per version of the catalog and category files.
+    """
+    def __init__(self, ids_by_category: Dict[int, List[int]], tree: CategoryTree):
+        self.tree = tree
+        self.keys: List[int] = []
+        self.product_ids: List[int] = []
+        for pre, cid in enumerate(tree.preorder):
+            for pid in ids_by_category.get(cid, []):
+                self.keys.append(pre)
+                self.product_ids.append(pid)
+
+    def _run(self, category_id: int) -> Tuple[int, int]:
+        interval = self.tree.interval.get(int(category_id))
+        if interval is None:
+            return 0, 0
+        return bisect_left(self.keys, interval[0]), bisect_right(self.keys, interval[1])
+
+    def subtree_product_ids(self, category_id: int) -> List[int]:
+        """Ids of products in category_id or below it."""
+        lo, hi = self._run(category_id)
+        return self.product_ids[lo:hi]
+
+    def subtree_count(self, category_id: int) -> int:
+        lo, hi = self._run(category_id)
+        return hi - lo
+
+
+def products_by_category(products_path: Path = PRODUCTS_PATH, categories_path: Path = CATEGORIES_PATH, code_start: int = 10) -> ProductsByCategory:
+    products_path, categories_path = Path(products_path), Path(categories_path)
+    return file_cache.get(
+        products_path,
+        lambda p: ProductsByCategory(get_product_store(p).ids_by_category(), get_category_tree(categories_path, code_start)),
+        tag=f"by-category:{categories_path.resolve()}:{code_start}",
+        depends_on=(categories_path,),
+    )
+
+
 def filter_products_by_category_id(
     category_id: int,
     *,
@@ -180,23 +243,35 @@ def filter_products_by_category_id(
 ) -> List[Dict]:
     """
     Return all products whose category is category_id (and optionally any descendants of that category).
+    Answered from the product store's category index; only matching products are read.
     """
-    products = load_products(products_path)
+    store = get_product_store(products_path)
     if not include_descendants:
-        return [product for product in products if int(product.get("category_id", -1)) == int(category_id)]
-
-    # Use category_manager helper that returns all descendants with codes; include the parent too
-    # We'll gather descendant IDs and filter products where category_id in that set
-    rows = list_subcategories_with_codes_by_parent_code(
-        parent_code=_code_for_id(category_id, categories_path, code_start),
-        path=categories_path,
-        start_at=code_start,
-        include_all_descendants=True
-    )
-    desc_ids = {int(r["category_id"]) for r in rows}
-    desc_ids.add(int(category_id))
+        return store.get_in_order(store.product_ids_in_categories([category_id]))
 
-    return [product for product in products if int(product.get("category_id", -1)) in desc_ids]
+    # The category's subtree is one slice of the products laid out by category interval
+    layout = products_by_category(products_path, categories_path, code_start)
+    if int(category_id) not in layout.tree.interval:
+        # category missing (or in a parent_id cycle)
+        return store.get_in_order(store.product_ids_in_categories(layout.tree.subtree_ids(category_id)))
+    return store.get_in_order(layout.subtree_product_ids(category_id))
+
+
+def category_product_counts(
+    *,
+    include_descendants: bool = False,
+    products_path: Path = PRODUCTS_PATH,
+    categories_path: Path = CATEGORIES_PATH,
+    code_start: int = 10
+) -> Dict[int, int]:
+    """
+    {category_id: number of products} from the category index, without reading products.
+    include_descendants=True counts each category's whole subtree (categories of the tree only).
+    """
+    if not include_descendants:
+        return get_product_store(products_path).category_counts()
+    layout = products_by_category(products_path, categories_path, code_start)
+    return {cid: layout.subtree_count(cid) for cid in layout.tree.preorder}
 
 def filter_products_by_category_code(
         category_code: str,
@@ -210,7 +285,7 @@ def filter_products_by_category_code(
     Return (products, parent_id) where 'products' are products under the category represented by category_code.
     If include_descendants=True, includes all nested subcategories.
     """
-    cid = get_category_id_by_display_code(category_code.strip(), path=categories_path, start_at=code_start)
+    cid = get_category_tree(categories_path, code_start).id_for_code(category_code)
     if cid is None:
         print("Category code not found.")
         return [], None
@@ -225,5 +300,4 @@ def filter_products_by_category_code(
 
 
 def _code_for_id(category_id: int, categories_path: Path, code_start: int) -> str:
-    codes = compute_category_display_codes(categories_path, start_at=code_start)
-    return codes.get(int(category_id), "")
+    return get_category_tree(categories_path, code_start).code_for(category_id)
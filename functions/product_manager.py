@@ -1,26 +1,61 @@
 from pathlib import Path
 import json
 import os
-from typing import List, Dict, Optional
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Iterator, Tuple
 from env import BASE_DIR, DATA_DIR, DEFAULT_ORDER_PATH, DEFAULT_PRODUCT_PATH, DEFAULT_CATEGORIES_PATH
 from decimal import Decimal
+from functions.product_store import get_product_store, _product_id
+from functions.product_sort import product_sort_index
+from functions.product_search import product_search_index, track_search
+from functions.journal import Transaction
+from functions.order_stream import iter_orders
+from functions.order_index import load_order_index
+from functions.sequences import next_id
+from functions.locks import file_lock, lock_path_for
 
 
 
 def load_products(path: Path = DEFAULT_PRODUCT_PATH) -> List[Dict]:
-    if not path.exists():
-        return []
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, OSError):
-        return []
+    """Load the whole catalog from whichever backend `path` selects (JSON list or SQLite)."""
+    return get_product_store(path).load_all()
 
 def save_products(products: List[Dict], path: Path = DEFAULT_PRODUCT_PATH) -> None:
-    """Save formatted product to JSON file."""
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(products, f, ensure_ascii=False, indent=2)
+    """Replace the whole catalog. Prefer update_products() when only a few products changed."""
+    get_product_store(path).save_all(products)
+
+def get_product(product_id: int, path: Path = DEFAULT_PRODUCT_PATH) -> Optional[Dict]:
+    """Point read of a single product by product_id."""
+    try:
+        return get_product_store(path).get(int(product_id))
+    except (TypeError, ValueError):
+        return None
+
+def get_products_by_id(product_ids: List[int], path: Path = DEFAULT_PRODUCT_PATH) -> Dict[int, Dict]:
+    """Point read of several products: {product_id: product}. Unknown ids are left out."""
+    return get_product_store(path).get_many(product_ids)
+
+@contextmanager
+def tracking_product_changes(path: Path = DEFAULT_PRODUCT_PATH):
+    """
+    Wrap a product write (holds the store lock) and add the ids of the products written
+    or deleted to the yielded set: the category rollups and the search index are then
+    updated for just those products instead of being rebuilt.
+    """
+    from functions.category_manager import track_rollups   # category_manager imports this module
+    with track_rollups(path) as rollups, track_search(path) as search:
+        yield rollups
+        search.update(rollups)
+
+def update_products(products: List[Dict], path: Path = DEFAULT_PRODUCT_PATH) -> None:
+    """Point write: insert or replace only the given products (matched by product_id)."""
+    with tracking_product_changes(path) as touched:
+        get_product_store(path).put_many(products)
+        touched.update(pid for pid in map(_product_id, products) if pid is not None)
+
+def stage_product_updates(txn: Transaction, products: List[Dict], path: Path = DEFAULT_PRODUCT_PATH) -> None:
+    """Same as update_products, but written as part of a multi-file Transaction."""
+    get_product_store(path).stage_put_many(txn, list(products))
 
 def _next_product_id(products: List[Dict]) -> int:
     """Calculate product_id for a new product."""
@@ -93,8 +128,8 @@ def add_product(
         print("Product stock is invalid. Please enter a non-negative whole number (e.g., 0 or 25).")
         return None
 
-    products = load_products(path)
-    new_id = _next_product_id(products)
+    store = get_product_store(path)
+    new_id = next_id(path, seed=lambda: store.max_id() + 1)
 
     product = {
         "product_id": new_id,
@@ -104,8 +139,9 @@ def add_product(
         "category_id": None,
         "category_name": None,
     }
-    products.append(product)
-    save_products(products, path)
+    with tracking_product_changes(path) as touched:
+        store.put_many([product])
+        touched.add(new_id)
     print(f"Added product '{product['name']}' with product_id {product['product_id']}), "
           f"(price {product['price']:.2f})")
 
@@ -126,92 +162,104 @@ def delete_product(
     Delete a product (product) by ID. If any order references this product,
     cancel deletion and print blocking order IDs.
     """
-    products = load_products(products_path)
-    if not products:
+    store = get_product_store(products_path)
+    if store.max_id() == 0:
         print("No products to delete.")
         return False
 
-    # Check orders for references
-    blockers = []
-    if orders_path.exists():
-        try:
-            with orders_path.open("r", encoding="utf-8") as f:
-                orders = json.load(f)
-            if isinstance(orders, list):
-                for order in orders:
-                    oid = order.get("order_id")
-                    for li in order.get("items", []):
-                        try:
-                            if int(li.get("product_id")) == int(product_id):
-                                blockers.append(oid)
-                        except (TypeError, ValueError):
-                            continue
-        except (json.JSONDecodeError, OSError):
-            pass
-
-    if blockers:
-        uniq = sorted(set(b for b in blockers if b is not None))
-        print(f"Cannot delete: product is referenced by orders {uniq}.")
-        return False
+    # Hold the orders lock so no order can reference the product between the check and the delete
+    with file_lock(lock_path_for(orders_path)):
+        blockers = load_order_index(orders_path).orders_for_product(product_id)
 
-    kept: List[Dict] = []
-    removed = None
-    for product in products:
-        try:
-            if int(product.get("product_id", -1)) == int(product_id):
-                removed = product
-            else:
-                kept.append(product)
-        except (TypeError, ValueError):
-            kept.append(product)
+        if blockers:
+            uniq = sorted(set(b for b in blockers if b is not None))
+            print(f"Cannot delete: product is referenced by orders {uniq}.")
+            return False
 
+        with tracking_product_changes(products_path) as touched:
+            removed = store.delete(int(product_id))
+            touched.add(int(product_id))
     if not removed:
         print("Product ID not found.")
         return False
 
-    save_products(kept, products_path)
     print(f"Deleted product '{removed.get('name','(unnamed)')}' (id {product_id}).")
     return True
 
 
-def _sorted_product(by: str, direction: str, *, products_path: Path = DEFAULT_PRODUCT_PATH) -> List[Dict]:
-    products = load_products(products_path)
-    reverse = str(direction).lower() == "desc"
-
-    def safe_int(v) -> int:
-        try:
-            return int(v)
-        except (TypeError, ValueError):
-            return 0
-
-    def safe_float(v) -> float:
-        try:
-            return float(v)
-        except (TypeError, ValueError):
-            return 0.0
-
-    def key(p: Dict):
-        if by == "id":
-            return safe_int(p.get("product_id") or p.get("id"))
-        if by == "name":
-            return str(p.get("name", "")).casefold()
-        if by == "price":
-            return safe_float(p.get("price"))
-        if by == "orders":
-            return safe_int(p.get("order_tally") or p.get("total_ordered") or p.get("orders"))
-        if by == "stock":
-            return safe_int(p.get("stock"))
-        return safe_int(p.get("product_id") or p.get("id"))
-
-    return sorted(products, key=key, reverse=reverse)
+def _sorted_product(
+    by: str,
+    direction: str,
+    *,
+    products_path: Path = DEFAULT_PRODUCT_PATH,
+    limit: Optional[int] = None
+) -> List[Dict]:
+    """
+    Products sorted by id/name/price/orders/stock. Sort keys are precomputed once
+    per catalog version (see functions/product_sort.py), so re-sorting by another
+    field or direction doesn't reload or re-convert anything. limit=k returns
+    only the first k, e.g. the top 50 best sellers.
+    """
+    index = product_sort_index(products_path)
+    positions = index.order(by, direction) if limit is None else index.top(by, direction, limit)
+    return [dict(index.products[i]) for i in positions]
 
 def sort_products(
     *,
     by: str = "id",
     direction: str = "asc",
-    products_path: Path = DEFAULT_PRODUCT_PATH
+    products_path: Path = DEFAULT_PRODUCT_PATH,
+    limit: Optional[int] = None
 ) -> List[Dict]:
-    return _sorted_product(by=by, direction=direction, products_path=products_path)
+    return _sorted_product(by=by, direction=direction, products_path=products_path, limit=limit)
+
+
+def product_page(
+    start: int = 0,
+    page_size: int = 20,
+    *,
+    by: str = "name",
+    direction: str = "asc",
+    products_path: Path = DEFAULT_PRODUCT_PATH
+) -> Tuple[List[Dict], int]:
+    """
+    (products ranked start .. start+page_size-1 in the by/direction ordering, catalog size).
+    Served from the sort index, so a page costs O(page_size) once the ordering exists.
+    """
+    index = product_sort_index(products_path)
+    start = max(0, int(start))
+    positions = index.order(by, direction)[start:start + max(0, int(page_size))]
+    return [dict(index.products[i]) for i in positions], len(index)
+
+def iter_product_pages(
+    page_size: int = 20,
+    *,
+    by: str = "name",
+    direction: str = "asc",
+    products_path: Path = DEFAULT_PRODUCT_PATH
+) -> Iterator[List[Dict]]:
+    """The catalog a page at a time, in the by/direction ordering."""
+    start = 0
+    while True:
+        page, _ = product_page(start, page_size, by=by, direction=direction, products_path=products_path)
+        if not page:
+            return
+        yield page
+        start += len(page)
+
+def seek_product_name(prefix: str, products_path: Path = DEFAULT_PRODUCT_PATH) -> int:
+    """Rank (in name order) of the first product whose name is at or after `prefix`, for product_page()."""
+    return product_sort_index(products_path).seek(prefix)
+
+
+def search_products(query: str, *, limit: int = 10, products_path: Path = DEFAULT_PRODUCT_PATH) -> List[Dict]:
+    """
+    Products whose name/SKU words start with every word of `query` ("blue sh" finds
+    "Blue Shirt"), best matches first. See functions/product_search.py.
+    """
+    ids = product_search_index(products_path).search(query, limit)
+    found = get_product_store(products_path).get_many(ids)
+    return [found[pid] for pid in ids if pid in found]
 
 
 def calculate_product_order_tally(
@@ -238,22 +286,15 @@ def calculate_product_order_tally(
 
     # Sum quantities per product
     totals = {pid: 0 for pid in index.keys()}
-    if orders_path.exists():
-        try:
-            with orders_path.open("r", encoding="utf-8") as f:
-                orders = json.load(f)
-            if isinstance(orders, list):
-                for o in orders:
-                    for li in o.get("items", []):
-                        try:
-                            pid = int(li.get("product_id"))
-                            qty = int(li.get("qty", 0))
-                            if pid in totals:
-                                totals[pid] += max(0, qty)
-                        except (TypeError, ValueError):
-                            continue
-        except (json.JSONDecodeError, OSError):
-            pass
+    for o in iter_orders(orders_path):
+        for li in o.get("items", []):
+            try:
+                pid = int(li.get("product_id"))
+                qty = int(li.get("qty", 0))
+                if pid in totals:
+                    totals[pid] += max(0, qty)
+            except (TypeError, ValueError):
+                continue
 
     # Write back totals
     changed = False
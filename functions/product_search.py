@@ -0,0 +1,143 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple, Iterable
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+import heapq
+import re
+from functions.cache import file_cache
+from functions.product_store import get_product_store, _product_id
+
+_WORD = re.compile(r"\w+")
+_PREFIX_END = "\U0010ffff"   # sorts after every continuation of a prefix
+_FILTER_BELOW = 256           # matches left at which remaining words are checked per product
+
+
+def _tokens(text: str) -> List[str]:
+    """Casefolded words of `text`, first occurrence order, no repeats."""
+    return list(dict.fromkeys(_WORD.findall(str(text or "").casefold())))
+
+def _searchable(product: Dict) -> Tuple[str, Tuple[str, ...]]:
+    """(casefolded name, tokens) of a product: words of its name and SKU, plus the whole SKU."""
+    name = str(product.get("name") or "").casefold()
+    tokens = _tokens(name)
+    sku = str(product.get("sku") or product.get("product_sku") or "").strip().casefold()
+    if sku:
+        tokens += [t for t in _tokens(sku) + [sku] if t not in tokens]
+    return name, tuple(tokens)
+
+
+class ProductSearchIndex:
+    """
+    Prefix index over casefolded product names and SKUs.
+
+    `words` is every distinct token, sorted, so the tokens starting with a prefix
+    are one bisected slice; `postings` maps each token to the ids of products
+    containing it. A query matches products where every query word is a prefix
+    of one of their tokens ("blue sh" -> "Blue Shirt"). Built once per catalog
+    version; product writers keep it current with track_search().
+    """
+    def __init__(self, products: Iterable[Dict]):
+        self.postings: Dict[str, Set[int]] = {}
+        self.entries: Dict[int, Tuple[str, Tuple[str, ...]]] = {}
+        for product in products:
+            pid = _product_id(product) if isinstance(product, dict) else None
+            if pid is not None:
+                self._insert(pid, product, new_words=None)
+        self.words: List[str] = sorted(self.postings)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _insert(self, pid: int, product: Dict, new_words: Optional[List[str]]) -> None:
+        entry = self.entries[pid] = _searchable(product)
+        for token in entry[1]:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                if new_words is not None:
+                    new_words.append(token)
+            ids.add(pid)
+
+    def apply(self, product_id, product: Optional[Dict]) -> None:
+        """Re-index one product (None: it was deleted)."""
+        try:
+            pid = int(product_id)
+        except (TypeError, ValueError):
+            return
+        old = self.entries.pop(pid, None)
+        if old is not None:
+            for token in old[1]:
+                ids = self.postings[token]
+                ids.discard(pid)
+                if not ids:
+                    del self.postings[token]
+                    del self.words[bisect_left(self.words, token)]
+        if product is not None:
+            new_words: List[str] = []
+            self._insert(pid, product, new_words)
+            for token in new_words:
+                insort(self.words, token)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        return bisect_left(self.words, prefix), bisect_left(self.words, prefix + _PREFIX_END)
+
+    def search(self, query: str, limit: int = 10) -> List[int]:
+        """
+        Ids of the best `limit` matches. Query words are taken narrowest first: each
+        one's postings are intersected (set operations) with the matches so far, and
+        once few matches remain the rest are checked per product instead.
+        Ranking: name starts with the whole query, then more whole-word hits,
+        then shorter names, then lower id.
+        """
+        terms = _tokens(query)
+        if not terms or limit <= 0:
+            return []
+        spans = sorted((hi - lo, lo, hi, term) for term in terms for lo, hi in [self._range(term)])
+        matched: Optional[Set[int]] = None
+        rest: List[str] = []
+        for width, lo, hi, term in spans:
+            if width == 0:
+                return []
+            if matched is not None and len(matched) <= _FILTER_BELOW:
+                rest.append(term)
+                continue
+            ids = self.postings[self.words[lo]] if width == 1 else set().union(*(self.postings[w] for w in self.words[lo:hi]))
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return []
+
+        phrase = " ".join(terms)
+        ranked = []
+        for pid in matched:
+            name, tokens = self.entries[pid]
+            if rest and not all(any(tok.startswith(term) for tok in tokens) for term in rest):
+                continue
+            exact = sum(1 for term in terms if term in tokens)
+            ranked.append((0 if name.startswith(phrase) else 1, -exact, len(name), pid))
+        return [key[-1] for key in heapq.nsmallest(limit, ranked)]
+
+
+def product_search_index(path: Path) -> ProductSearchIndex:
+    """The search index for the catalog at `path`, built once per catalog version."""
+    path = Path(path)
+    return file_cache.get(path, lambda p: ProductSearchIndex(get_product_store(p).load_all()), tag="search")
+
+@contextmanager
+def track_search(products_path: Path):
+    """
+    Wrap a product write: yields a set to add the ids of written or deleted products to.
+    Under the store lock; when the block succeeds a cached search index is re-indexed for
+    just those products and kept for the new catalog version (no-op if none is cached).
+    """
+    products_path = Path(products_path)
+    store = get_product_store(products_path)
+    with store.lock():
+        index = file_cache.peek(products_path, tag="search")
+        touched: Set[int] = set()
+        yield touched
+        if index is None or not touched:
+            return
+        written = store.get_many(touched)
+        for pid in touched:
+            index.apply(pid, written.get(int(pid)))
+        file_cache.put(products_path, index, tag="search")
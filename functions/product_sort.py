@@ -0,0 +1,127 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import heapq
+from bisect import bisect_left
+from functions.cache import file_cache
+from functions.product_store import get_product_store
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python orderings below
+    np = None
+
+
+SORT_FIELDS = ("id", "name", "price", "orders", "stock")
+
+
+def _safe_int(v) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+def _safe_float(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _sort_keys(p: Dict) -> Tuple:
+    """
+    (id, name, price, orders, stock) sort keys of one product, in SORT_FIELDS order.
+    Orders and stock are the fields order placement maintains (product_total_ordered,
+    product_stock); the older names are read for products that predate them.
+    """
+    return (
+        _safe_int(p.get("product_id") or p.get("id")),
+        str(p.get("name", "")).casefold(),
+        _safe_float(p.get("price")),
+        _safe_int(p.get("product_total_ordered", p.get("order_tally") or p.get("total_ordered") or p.get("orders"))),
+        _safe_int(p.get("product_stock", p.get("stock"))),
+    )
+
+
+class ProductSortIndex:
+    """
+    Sort keys for one version of the catalog, converted once into columns
+    (NumPy arrays when NumPy is installed, plain lists otherwise). Orderings are
+    lists of positions into `products` and are computed lazily, once per
+    (field, direction). Ties keep catalog order in both directions, exactly
+    like sorted(..., reverse=True).
+    """
+    def __init__(self, products: List[Dict]):
+        self.products = products
+        rows = [_sort_keys(p) for p in products]
+        columns = list(zip(*rows)) if rows else [() for _ in SORT_FIELDS]
+        self.columns: Dict[str, object] = {}
+        for field, values in zip(SORT_FIELDS, columns):
+            if np is None:
+                self.columns[field] = list(values)
+            elif field == "name":
+                self.columns[field] = np.array(values, dtype=str)
+            elif field == "price":
+                self.columns[field] = np.array(values, dtype=np.float64)
+            else:
+                self.columns[field] = np.array(values, dtype=np.int64)
+        self._orders: Dict[Tuple[str, bool], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def order(self, by: str = "id", direction: str = "asc") -> List[int]:
+        """Positions of the products sorted by `by` ("id" for unknown fields)."""
+        by = by if by in SORT_FIELDS else "id"
+        reverse = str(direction).lower() == "desc"
+        cached = self._orders.get((by, reverse))
+        if cached is None:
+            cached = self._orders[(by, reverse)] = self._argsort(self.columns[by], reverse)
+        return cached
+
+    @staticmethod
+    def _argsort(values, reverse: bool) -> List[int]:
+        n = len(values)
+        if np is None:
+            return sorted(range(n), key=values.__getitem__, reverse=reverse)
+        if not reverse:
+            return np.argsort(values, kind="stable").tolist()
+        # stable descending: sort the reversed column, then map back and flip
+        return (n - 1 - np.argsort(values[::-1], kind="stable"))[::-1].tolist()
+
+    def seek(self, prefix: str) -> int:
+        """Rank in order("name") of the first product whose name sorts at or after prefix (casefolded)."""
+        return bisect_left(self.order("name"), str(prefix).casefold(), key=self.columns["name"].__getitem__)
+
+    def top(self, by: str = "orders", direction: str = "desc", k: int = 50) -> List[int]:
+        """
+        The first k positions of order(by, direction) without sorting everything
+        when that ordering has not been built yet (e.g. "top 50 best sellers").
+        """
+        by = by if by in SORT_FIELDS else "id"
+        reverse = str(direction).lower() == "desc"
+        k = max(0, int(k))
+        cached = self._orders.get((by, reverse))
+        if cached is not None or k >= len(self) or by == "name":
+            return self.order(by, direction)[:k]
+        values = self.columns[by]
+        if np is None:
+            pick = heapq.nlargest if reverse else heapq.nsmallest
+            return pick(k, range(len(values)), key=values.__getitem__)
+        if k == 0:
+            return []
+        # value of the k-th element, then everything strictly better plus as
+        # many ties as fit, taken in catalog order (same result as a stable sort)
+        if reverse:
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            better = np.flatnonzero(values > kth)
+        else:
+            kth = np.partition(values, k - 1)[k - 1]
+            better = np.flatnonzero(values < kth)
+        ties = np.flatnonzero(values == kth)[:k - len(better)]
+        chosen = np.concatenate([better, ties])
+        return chosen[self._argsort(values[chosen], reverse)].tolist()
+
+
+def product_sort_index(path: Path) -> ProductSortIndex:
+    """The sort index for the catalog at `path`, rebuilt only when the catalog changes."""
+    path = Path(path)
+    return file_cache.get(path, lambda p: ProductSortIndex(get_product_store(p).load_all()), tag="sort")
@@ -0,0 +1,384 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable
+from contextlib import closing
+import json
+import sqlite3
+from functions.cache import cached_json_list, copy_records, file_cache, file_signature, _read_json_list
+from functions.journal import atomic_write_json, Transaction
+from functions.locks import file_lock, lock_path_for
+
+
+# Suffixes that select the SQLite backend; anything else is the JSON list file.
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# Fields owned by order placement. Every change to them bumps "version".
+STOCK_FIELDS = ("product_stock", "product_total_ordered", "version")
+
+
+def _product_id(product: Dict) -> Optional[int]:
+    try:
+        return int(product.get("product_id"))
+    except (TypeError, ValueError):
+        return None
+
+def _category_id(product: Dict) -> Optional[int]:
+    try:
+        return int(product.get("category_id"))
+    except (TypeError, ValueError):
+        return None
+
+def product_version(product: Optional[Dict]) -> int:
+    try:
+        return int((product or {}).get("version", 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _reconcile(incoming: List[Dict], stored_by_id: Dict[int, Dict]) -> List[Dict]:
+    """
+    Guard against lost stock updates from writers holding a stale copy
+    (e.g. a menu that loaded the catalog before an order was placed): when an
+    incoming record is older than the stored one, the stored stock fields win.
+    """
+    out = []
+    for product in incoming:
+        stored = stored_by_id.get(_product_id(product))
+        if stored is not None and product_version(product) < product_version(stored):
+            product = {**product, **{k: stored[k] for k in STOCK_FIELDS if k in stored}}
+        out.append(product)
+    return out
+
+
+# ---------------- JSON list file (legacy layout) ----------------
+
+class _CatalogIds:
+    """
+    Lookup maps over one version of a JSON catalog:
+      position     {product_id: index in records}
+      by_category  {category_id: [product_id, ...]} in catalog order
+    """
+    def __init__(self, records: List[Dict]):
+        self.records = records
+        self.position: Dict[int, int] = {}
+        self.by_category: Dict[int, List[int]] = {}
+        for i, product in enumerate(records):
+            if not isinstance(product, dict):
+                continue
+            pid = _product_id(product)
+            if pid is None:
+                continue
+            self.position[pid] = i
+            cid = _category_id(product)
+            if cid is not None:
+                self.by_category.setdefault(cid, []).append(pid)
+
+
+class JsonProductStore:
+    """
+    The original storage/product_catalog.json layout: one JSON array.
+    Point operations are emulated with a full load + rewrite.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load_all(self) -> List[Dict]:
+        return cached_json_list(self.path)
+
+    def lock(self):
+        """Exclusive lock for read-modify-write of this catalog (re-entrant)."""
+        return file_lock(lock_path_for(self.path))
+
+    def save_all(self, products: List[Dict]) -> None:
+        with self.lock():
+            stored = {_product_id(p): p for p in self.load_all()}
+            atomic_write_json(self.path, _reconcile(products, stored))
+
+    def get(self, product_id: int) -> Optional[Dict]:
+        return self.get_many([product_id]).get(int(product_id))
+
+    def _ids(self) -> _CatalogIds:
+        """Maps over the current catalog version, built once per version of the file."""
+        return file_cache.get(self.path, lambda p: _CatalogIds(file_cache.get(p, _read_json_list)), tag="ids")
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Dict]:
+        ids = self._ids()
+        found: Dict[int, Dict] = {}
+        for pid in {int(pid) for pid in product_ids}:
+            i = ids.position.get(pid)
+            if i is not None:
+                found[pid] = dict(ids.records[i])
+        return found
+
+    def get_in_order(self, product_ids: Iterable[int]) -> List[Dict]:
+        """The given products in catalog order (unknown ids are left out)."""
+        ids = self._ids()
+        positions = sorted(ids.position[pid] for pid in {int(pid) for pid in product_ids} if pid in ids.position)
+        return [dict(ids.records[i]) for i in positions]
+
+    def ids_by_category(self) -> Dict[int, List[int]]:
+        """{category_id: [product_id, ...]} for every assigned category (don't modify)."""
+        return self._ids().by_category
+
+    def product_ids_in_categories(self, category_ids: Iterable[int]) -> List[int]:
+        """Ids of products assigned to any of category_ids, in catalog order."""
+        ids = self._ids()
+        found = [pid for cid in {int(c) for c in category_ids} for pid in ids.by_category.get(cid, [])]
+        return sorted(found, key=ids.position.__getitem__)
+
+    def category_counts(self) -> Dict[int, int]:
+        """{category_id: number of products assigned to it}."""
+        return {cid: len(pids) for cid, pids in self._ids().by_category.items()}
+
+    def _merged(self, products: List[Dict]) -> List[Dict]:
+        current = self.load_all()
+        stored = {_product_id(p): p for p in current}
+        incoming = {_product_id(p): p for p in _reconcile(products, stored) if _product_id(p) is not None}
+        for i, product in enumerate(current):
+            pid = _product_id(product)
+            if pid in incoming:
+                current[i] = incoming.pop(pid)
+        current.extend(incoming.values())
+        return current
+
+    def put_many(self, products: List[Dict]) -> None:
+        """Insert or replace products by product_id."""
+        if not products:
+            return
+        with self.lock():
+            atomic_write_json(self.path, self._merged(products))
+
+    def stage_put_many(self, txn: Transaction, products: List[Dict]) -> None:
+        """Like put_many, but applied when `txn` commits."""
+        if products:
+            txn.write_json(self.path, self._merged(products))
+
+    def delete(self, product_id: int) -> Optional[Dict]:
+        """Remove a product; returns the removed record or None if not found."""
+        with self.lock():
+            products = self.load_all()
+            kept: List[Dict] = []
+            removed = None
+            for product in products:
+                if removed is None and _product_id(product) == int(product_id):
+                    removed = product
+                else:
+                    kept.append(product)
+            if removed is not None:
+                atomic_write_json(self.path, kept)
+        return removed
+
+    def max_id(self) -> int:
+        max_id = 0
+        for product in self.load_all():
+            pid = _product_id(product)
+            if pid is not None:
+                max_id = max(max_id, pid)
+        return max_id
+
+
+# ---------------- SQLite (indexed by product_id) ----------------
+
+# (resolved path, inode) of SQLite catalogs whose schema has been set up in this process
+_schema_ready = set()
+
+
+class SqliteProductStore:
+    """
+    Products keyed by product_id in a single SQLite table. Each row holds the
+    full product dict as JSON, so the record shape stays identical to the JSON
+    layout, but reads and writes by product_id only touch the affected rows.
+    category_id is copied into its own indexed column, kept in step by every
+    write, so category lookups never parse the JSON.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path))
+        # the schema check runs once per database file per process; a file replaced
+        # on disk (new inode) or still empty is checked again
+        sig = file_signature(self.path) or (0, 0, 0)
+        key = (str(self.path.resolve()), sig[2])
+        if key not in _schema_ready or sig[1] == 0:
+            self._ensure_schema(conn)
+            _schema_ready.add(key)
+        return conn
+
+    @staticmethod
+    def _ensure_schema(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS products ("
+            " product_id INTEGER PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " category_id INTEGER)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+        if "category_id" not in columns:
+            # database created before the category column: add and backfill it
+            with conn:
+                conn.execute("ALTER TABLE products ADD COLUMN category_id INTEGER")
+                conn.executemany("UPDATE products SET category_id = ? WHERE product_id = ?", [
+                    (_category_id(json.loads(data)), pid)
+                    for pid, data in conn.execute("SELECT product_id, data FROM products").fetchall()])
+        conn.execute("CREATE INDEX IF NOT EXISTS products_by_category ON products (category_id)")
+
+    @staticmethod
+    def _rows(products: Iterable[Dict]) -> List[tuple]:
+        rows = []
+        for product in products:
+            pid = _product_id(product)
+            if pid is None:
+                continue
+            rows.append((pid, json.dumps(product, ensure_ascii=False), _category_id(product)))
+        return rows
+
+    def _read_all(self, path: Path) -> List[Dict]:
+        if not path.exists():
+            return []
+        with closing(self._connect()) as conn:
+            return [json.loads(data) for (data,) in conn.execute(
+                "SELECT data FROM products ORDER BY product_id")]
+
+    def load_all(self) -> List[Dict]:
+        return copy_records(file_cache.get(self.path, self._read_all))
+
+    def lock(self):
+        """Exclusive lock for read-modify-write of this catalog (re-entrant)."""
+        return file_lock(lock_path_for(self.path))
+
+    def save_all(self, products: List[Dict]) -> None:
+        with self.lock():
+            products = _reconcile(products, {_product_id(p): p for p in self.load_all()})
+            self._replace_all(products)
+
+    def _replace_all(self, products: List[Dict]) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM products")
+            conn.executemany("INSERT OR REPLACE INTO products (product_id, data, category_id) VALUES (?, ?, ?)",
+                             self._rows(products))
+        file_cache.invalidate(self.path)
+
+    def get(self, product_id: int) -> Optional[Dict]:
+        return self.get_many([product_id]).get(int(product_id))
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Dict]:
+        ids = sorted({int(pid) for pid in product_ids})
+        if not ids or not self.path.exists():
+            return {}
+        found: Dict[int, Dict] = {}
+        with closing(self._connect()) as conn:
+            # stay well under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for pid, data in conn.execute(
+                        f"SELECT product_id, data FROM products WHERE product_id IN ({marks})", chunk):
+                    found[int(pid)] = json.loads(data)
+        return found
+
+    def get_in_order(self, product_ids: Iterable[int]) -> List[Dict]:
+        """The given products in catalog (product_id) order."""
+        found = self.get_many(product_ids)
+        return [found[pid] for pid in sorted(found)]
+
+    def ids_by_category(self) -> Dict[int, List[int]]:
+        if not self.path.exists():
+            return {}
+        by_category: Dict[int, List[int]] = {}
+        with closing(self._connect()) as conn:
+            for cid, pid in conn.execute("SELECT category_id, product_id FROM products "
+                                         "WHERE category_id IS NOT NULL ORDER BY product_id"):
+                by_category.setdefault(int(cid), []).append(int(pid))
+        return by_category
+
+    def product_ids_in_categories(self, category_ids: Iterable[int]) -> List[int]:
+        cids = sorted({int(c) for c in category_ids})
+        if not cids or not self.path.exists():
+            return []
+        found: List[int] = []
+        with closing(self._connect()) as conn:
+            for start in range(0, len(cids), 500):
+                chunk = cids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                found.extend(int(pid) for (pid,) in conn.execute(
+                    f"SELECT product_id FROM products WHERE category_id IN ({marks})", chunk))
+        return sorted(found)
+
+    def category_counts(self) -> Dict[int, int]:
+        if not self.path.exists():
+            return {}
+        with closing(self._connect()) as conn:
+            return {int(cid): int(n) for cid, n in conn.execute(
+                "SELECT category_id, COUNT(*) FROM products WHERE category_id IS NOT NULL GROUP BY category_id")}
+
+    def put_many(self, products: List[Dict]) -> None:
+        if not products:
+            return
+        with self.lock():
+            self._put_rows(products)
+
+    def _put_rows(self, products: List[Dict]) -> None:
+        """
+        put_many without the store lock, for a Transaction applying its "put_products"
+        op: the live commit already holds the lock, and recovery must not wait for it
+        (the committer holding it waits for recovery to release the journal lock).
+        The stored versions are read and the rows written in one SQLite write
+        transaction, so a replay can never roll back newer stock.
+        """
+        ids = sorted({pid for pid in map(_product_id, products) if pid is not None})
+        if not ids:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stored: Dict[int, Dict] = {}
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for pid, data in conn.execute(
+                        f"SELECT product_id, data FROM products WHERE product_id IN ({marks})", chunk):
+                    stored[int(pid)] = json.loads(data)
+            conn.executemany("INSERT OR REPLACE INTO products (product_id, data, category_id) VALUES (?, ?, ?)",
+                             self._rows(_reconcile(products, stored)))
+        file_cache.invalidate(self.path)
+
+    def stage_put_many(self, txn: Transaction, products: List[Dict]) -> None:
+        """Like put_many, but applied (idempotently) when `txn` commits."""
+        if products:
+            txn.add_op({"op": "put_products", "path": str(self.path), "products": list(products)})
+
+    def delete(self, product_id: int) -> Optional[Dict]:
+        with self.lock(), closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT data FROM products WHERE product_id = ?",
+                               (int(product_id),)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM products WHERE product_id = ?", (int(product_id),))
+        file_cache.invalidate(self.path)
+        return json.loads(row[0])
+
+    def max_id(self) -> int:
+        if not self.path.exists():
+            return 0
+        with closing(self._connect()) as conn:
+            (max_id,) = conn.execute("SELECT MAX(product_id) FROM products").fetchone()
+        return int(max_id or 0)
+
+
+def get_product_store(path: Path):
+    """Pick the backend from the file suffix: .db/.sqlite/.sqlite3 => SQLite, otherwise JSON."""
+    path = Path(path)
+    if path.suffix.lower() in SQLITE_SUFFIXES:
+        return SqliteProductStore(path)
+    return JsonProductStore(path)
+
+
+def versions_match(store, expected: Dict[int, int]) -> bool:
+    """Compare-and-set check: do the stored versions still equal `expected` {product_id: version}?"""
+    current = store.get_many(expected.keys())
+    return all(product_version(current.get(pid)) == v for pid, v in expected.items())
+
+
+def migrate_products(source: Path, destination: Path) -> int:
+    """Copy every product from one backend to another (e.g. .json -> .db). Returns the count."""
+    products = get_product_store(source).load_all()
+    get_product_store(destination).save_all(products)
+    return len(products)
@@ -0,0 +1,44 @@
+from pathlib import Path
+from typing import Callable
+import json
+from functions.journal import atomic_write_json
+from functions.locks import file_lock, lock_path_for
+
+
+def sequence_path_for(data_path: Path) -> Path:
+    """storage/orders.json -> storage/orders.json.seq.json (orders.jsonl gets its own)"""
+    data_path = Path(data_path)
+    return data_path.with_name(f"{data_path.name}.seq.json")
+
+
+def _read_next(seq_path: Path):
+    try:
+        with seq_path.open("r", encoding="utf-8") as f:
+            return int(json.load(f)["next"])
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def reserve_ids(data_path: Path, count: int, *, seed: Callable[[], int]) -> range:
+    """
+    Reserve `count` consecutive ids for the records stored in data_path.
+
+    The next free id is kept in a small sequence file beside the data file and
+    updated under an exclusive file lock, so concurrent processes never hand
+    out the same id. `seed()` must return the first free id by scanning the
+    data (e.g. _next_order_id(orders)); it is only called when the sequence
+    file is missing or unreadable.
+    """
+    count = max(0, int(count))
+    seq_path = sequence_path_for(data_path)
+    with file_lock(lock_path_for(seq_path)):
+        start = _read_next(seq_path)
+        if start is None:
+            start = max(1, int(seed()))
+        atomic_write_json(seq_path, {"next": start + count})
+    return range(start, start + count)
+
+
+def next_id(data_path: Path, *, seed: Callable[[], int]) -> int:
+    """Allocate a single id (see reserve_ids)."""
+    return reserve_ids(data_path, 1, seed=seed)[0]
@@ -0,0 +1,101 @@
+from pathlib import Path
+from typing import Optional, Callable, Any, List
+import json
+from functions.cache import file_signature
+from functions.journal import atomic_write_json, append_lines
+
+# Structures derived from a data file (the order index and customer summaries from
+# the orders file, the customer index from the customers file) are persisted as
+# a snapshot stamped with the data file's signature, plus a delta log with one
+# line per later write:
+#
+#   {"from": <signature before>, "to": <signature after>, "changes": [[kind, arg, ...], ...]}
+#
+# so placing an order appends a few hundred bytes instead of rewriting the whole
+# sidecar. Loading replays the deltas over the snapshot; the result is current
+# only if they chain from the snapshot's stamp to the data file as it is now.
+# The log is folded into a new snapshot once it outgrows half the snapshot, and
+# on rebuild and compaction.
+#
+# A persisted structure provides to_dict(), from_dict(), apply_change(change)
+# and two attributes managed here: `source` (the signature it matches) and
+# `changes` (what was changed since it was last saved, as apply_change input).
+
+FOLD_MIN_BYTES = 1024 * 1024
+
+
+def delta_path_for(sidecar_path: Path) -> Path:
+    """storage/orders.jsonl.index.json -> storage/orders.jsonl.index.delta.jsonl"""
+    sidecar_path = Path(sidecar_path)
+    return sidecar_path.with_name(f"{sidecar_path.stem}.delta.jsonl")
+
+def stamp_of(data_path: Path) -> Optional[list]:
+    sig = file_signature(Path(data_path))
+    return list(sig) if sig else None
+
+
+def _read_deltas(path: Path) -> List[dict]:
+    """The delta lines in order, stopping at a torn or corrupt one."""
+    deltas = []
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    delta = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if not isinstance(delta, dict) or not isinstance(delta.get("changes"), list):
+                    break
+                deltas.append(delta)
+    except OSError:
+        pass
+    return deltas
+
+def read_sidecar(path: Path, from_dict: Callable[[dict], Any]) -> Optional[Any]:
+    """
+    The snapshot at `path` with its delta log replayed, its `source` set to the
+    signature the chain reaches; None if there is no readable snapshot. The caller
+    compares `source` with the data file's signature.
+    """
+    path = Path(path)
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    obj = from_dict(data)
+    obj.source = data.get("source")
+    for delta in _read_deltas(delta_path_for(path)):
+        if delta.get("from") != obj.source:
+            break   # a write in between went unrecorded; the chain ends here
+        for change in delta["changes"]:
+            obj.apply_change(change)
+        obj.source = delta.get("to")
+    obj.changes = []
+    return obj
+
+def save_sidecar(obj: Any, path: Path, data_path: Path, *, snapshot: bool = False, stamp: Optional[list] = None) -> None:
+    """
+    Stamp obj with the data file's current signature (or `stamp`, the signature it
+    had when obj was built from it) and persist it: by appending its pending
+    changes to the delta log, or (snapshot=True, no snapshot yet, or the log has
+    grown past half the snapshot) by writing a new snapshot.
+    Call with the data file's lock held, straight after the write it reflects.
+    """
+    path = Path(path)
+    delta_path = delta_path_for(path)
+    to = stamp if stamp is not None else stamp_of(data_path)
+    if not snapshot and path.exists():
+        line = json.dumps({"from": obj.source, "to": to, "changes": obj.changes}, ensure_ascii=False)
+        logged = delta_path.stat().st_size if delta_path.exists() else 0
+        snapshot = logged + len(line) > max(FOLD_MIN_BYTES, path.stat().st_size // 2)
+        if not snapshot and (obj.changes or to != obj.source):
+            append_lines(delta_path, [line])
+    if snapshot:
+        # drop the log first: a crash in between leaves a stale snapshot, which is rebuilt
+        delta_path.unlink(missing_ok=True)
+        atomic_write_json(path, {"source": to, **obj.to_dict()})
+    obj.source = to
+    obj.changes = []
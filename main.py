@@ -3,6 +3,15 @@ import os
 import sys
 from pathlib import Path
 from typing import List, Dict, Any
+from env import DATA_DIR, DEFAULT_ORDER_PATH
+from functions.journal import recover_journal
+from functions.order_store import compact_orders
+
+# Finish any save that was interrupted by a crash before the menus read the data
+recover_journal(DATA_DIR)
+# An orders log (.jsonl) is compacted once most of it is superseded records
+compact_orders(DEFAULT_ORDER_PATH, min_garbage=1000, min_ratio=0.5)
+
 import menus.menus as menus
 
 
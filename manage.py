@@ -0,0 +1,238 @@
+"""
+Maintenance commands for the ecommerce data files (run from the project root):
+
+    python manage.py import_orders feed.jsonl
+    python manage.py rebuild_indexes
+    python manage.py rebuild_customer_summaries
+    python manage.py migrate_orders storage/orders.json storage/orders.jsonl
+    python manage.py compact_orders
+    python manage.py import_categories supplier_taxonomy.csv --under 12
+    python manage.py import_customers legacy_customers.jsonl --workers 8
+    python manage.py migrate_customers storage/customers.json storage/customers.shards --shard-size 50000
+    python manage.py export_categories categories.json
+    python manage.py stress_orders --workers 8 --orders 200
+    python manage.py bench_category_rename --products 100000 --backend db
+"""
+import argparse
+import sys
+from pathlib import Path
+from env import DATA_DIR, DEFAULT_ORDER_PATH, DEFAULT_PRODUCT_PATH, DEFAULT_CUSTOMER_PATH
+from functions.journal import recover_journal
+from functions.order_manager import add_orders_bulk, read_orders_jsonl
+from functions.order_index import rebuild_order_index
+from functions.customer_index import rebuild_customer_index
+from functions.customer_summary import rebuild_customer_summaries as rebuild_summaries
+from functions.customer_manager import import_customers as import_customer_stream, read_customers_jsonl
+from functions.customer_store import migrate_customers as migrate_customer_store, DEFAULT_SHARD_SIZE
+from functions.order_store import compact_orders as compact_order_log, migrate_orders as migrate_order_file
+from functions.category_io import import_category_tree, export_category_tree
+from functions.benchmarks import stress_order_placement, bench_category_rename as run_category_rename_bench
+
+
+def import_orders(args: argparse.Namespace) -> int:
+    source = Path(args.source)
+    if not source.exists():
+        print(f"File not found: {source}")
+        return 1
+    report = add_orders_bulk(
+        read_orders_jsonl(source),
+        orders_path=DEFAULT_ORDER_PATH,
+        products_path=DEFAULT_PRODUCT_PATH,
+        allow_negative_stock=args.allow_negative_stock,
+        all_or_nothing=args.all_or_nothing,
+    )
+    for r in report["rejected"]:
+        print(f"  - entry {r['entry']}: {r['reason']}")
+    return 0 if report["committed"] or not report["rejected"] else 2
+
+
+def rebuild_indexes(args: argparse.Namespace) -> int:
+    index = rebuild_order_index(DEFAULT_ORDER_PATH)
+    print(f"Rebuilt order indexes: {len(index.positions)} orders, "
+          f"{len(index.by_customer)} customers, {len(index.by_product)} products.")
+    customers = rebuild_customer_index(DEFAULT_CUSTOMER_PATH)
+    print(f"Rebuilt customer indexes: {len(customers.positions)} customers, "
+          f"{len(customers.by_email)} emails, {len(customers.by_postcode)} postcodes.")
+    return rebuild_customer_summaries(args)
+
+
+def rebuild_customer_summaries(args: argparse.Namespace) -> int:
+    summaries = rebuild_summaries(DEFAULT_ORDER_PATH)
+    orders = sum(len(s["orders"]) for s in summaries.by_customer.values())
+    print(f"Rebuilt customer summaries: {len(summaries.by_customer)} customers, {orders} orders.")
+    return 0
+
+
+def migrate_orders(args: argparse.Namespace) -> int:
+    source, destination = Path(args.source), Path(args.destination)
+    if not source.exists():
+        print(f"File not found: {source}")
+        return 1
+    if destination.exists() and not args.force:
+        print(f"{destination} already exists (use --force to overwrite).")
+        return 1
+    count = migrate_order_file(source, destination)
+    rebuild_order_index(destination)
+    rebuild_summaries(destination)
+    print(f"Migrated {count} orders from {source} to {destination}. "
+          f"Point DEFAULT_ORDER_PATH in env.py at {destination.name} to use it.")
+    return 0
+
+
+def compact_orders(args: argparse.Namespace) -> int:
+    path = Path(args.path) if args.path else DEFAULT_ORDER_PATH
+    result = compact_order_log(path)
+    if result is None:
+        print(f"Nothing to compact in {path}.")
+    else:
+        print(f"Compacted {path}: {result[0]} records -> {result[1]}.")
+    return 0
+
+
+def import_categories(args: argparse.Namespace) -> int:
+    source = Path(args.source)
+    if not source.exists():
+        print(f"File not found: {source}")
+        return 1
+    report = import_category_tree(source, under=args.under, merge_existing=args.merge)
+    for error in report["errors"]:
+        print(f"  - {error}")
+    return 2 if report["errors"] else 0
+
+
+def import_customers(args: argparse.Namespace) -> int:
+    source = Path(args.source)
+    if not source.exists():
+        print(f"File not found: {source}")
+        return 1
+    report = import_customer_stream(
+        read_customers_jsonl(source),
+        path=DEFAULT_CUSTOMER_PATH,
+        workers=args.workers,
+        all_or_nothing=args.all_or_nothing,
+    )
+    for r in report["rejected"][:args.show_errors]:
+        print(f"  - row {r['row']}: {r['error']}")
+    if len(report["rejected"]) > args.show_errors:
+        print(f"  ... and {len(report['rejected']) - args.show_errors} more")
+    return 0 if report["imported"] or not report["rejected"] else 2
+
+
+def migrate_customers(args: argparse.Namespace) -> int:
+    source, destination = Path(args.source), Path(args.destination)
+    if not source.exists():
+        print(f"Not found: {source}")
+        return 1
+    if destination.exists() and not args.force:
+        print(f"{destination} already exists (use --force to overwrite).")
+        return 1
+    count = migrate_customer_store(source, destination, shard_size=args.shard_size)
+    rebuild_customer_index(destination)
+    print(f"Migrated {count} customers from {source} to {destination}. "
+          f"Point DEFAULT_CUSTOMER_PATH in env.py at {destination.name} to use it.")
+    return 0
+
+
+def export_categories(args: argparse.Namespace) -> int:
+    count = export_category_tree(Path(args.destination))
+    print(f"Exported {count} categories to {args.destination}.")
+    return 0
+
+
+def stress_orders(args: argparse.Namespace) -> int:
+    result = stress_order_placement(
+        workers=args.workers,
+        orders_per_worker=args.orders,
+        products=args.products,
+        stock=args.stock,
+    )
+    print(f"{result['workers']} workers, {result['attempted']} attempts: {result['placed']} orders placed, "
+          f"{result['units_sold']}/{result['units_available']} units sold in {result['seconds']}s "
+          f"({result['orders_per_sec']} orders/sec)")
+    print("OVERSOLD: stock and orders disagree!" if result["oversold"] else "No oversell.")
+    return 1 if result["oversold"] else 0
+
+
+def bench_category_rename(args: argparse.Namespace) -> int:
+    result = run_category_rename_bench(products=args.products, categories=args.categories, backend=args.backend)
+    print(f"Renaming a category with {result['renamed_products']} of {result['products']} products "
+          f"({result['backend']} catalog):")
+    for strategy, seconds in result["seconds"].items():
+        print(f"  {strategy:<13} {seconds:.4f}s")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="manage.py", description="Ecommerce data maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import_orders", help="Import orders from a JSONL file in one batch.")
+    p.add_argument("source", help="JSONL file: one {customer_id, items:[{product_id, qty}]} per line")
+    p.add_argument("--all-or-nothing", action="store_true", help="Cancel the batch if any order is rejected")
+    p.add_argument("--allow-negative-stock", action="store_true")
+    p.set_defaults(handler=import_orders)
+
+    p = commands.add_parser("rebuild_indexes", help="Regenerate the secondary indexes from the data files.")
+    p.set_defaults(handler=rebuild_indexes)
+
+    p = commands.add_parser("rebuild_customer_summaries", help="Recompute per-customer order summaries from the order history.")
+    p.set_defaults(handler=rebuild_customer_summaries)
+
+    p = commands.add_parser("migrate_orders", help="Copy orders into another layout (e.g. orders.json -> orders.jsonl).")
+    p.add_argument("source")
+    p.add_argument("destination", help="A .jsonl destination is written as an append-only log")
+    p.add_argument("--force", action="store_true", help="Overwrite an existing destination")
+    p.set_defaults(handler=migrate_orders)
+
+    p = commands.add_parser("compact_orders", help="Rewrite an orders log as a snapshot of the live orders.")
+    p.add_argument("path", nargs="?", help="Orders log (default: DEFAULT_ORDER_PATH)")
+    p.set_defaults(handler=compact_orders)
+
+    p = commands.add_parser("import_categories", help="Import a category tree from nested JSON or CSV in one write.")
+    p.add_argument("source", help=".json (nested name/children) or .csv (category_id,name,parent_id)")
+    p.add_argument("--under", type=int, help="Attach the imported top-level categories under this category_id")
+    p.add_argument("--merge", action="store_true", help="Reuse existing categories with the same name and parent")
+    p.set_defaults(handler=import_categories)
+
+    p = commands.add_parser("import_customers", help="Import customers from a JSONL file, validated in parallel, in one write.")
+    p.add_argument("source", help="JSONL file: one object per line with add_customer's fields")
+    p.add_argument("--workers", type=int, help="Validation processes (default: one per CPU; 1 = no pool)")
+    p.add_argument("--all-or-nothing", action="store_true", help="Import nothing if any row is rejected")
+    p.add_argument("--show-errors", type=int, default=20, help="Rejected rows to list")
+    p.set_defaults(handler=import_customers)
+
+    p = commands.add_parser("migrate_customers", help="Copy customers into another layout (e.g. customers.json -> customers.shards).")
+    p.add_argument("source")
+    p.add_argument("destination", help="A .shards destination is a directory of customer_id-range shards")
+    p.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Customer ids per shard")
+    p.add_argument("--force", action="store_true", help="Overwrite an existing destination")
+    p.set_defaults(handler=migrate_customers)
+
+    p = commands.add_parser("export_categories", help="Export the category tree to .json (nested) or .csv.")
+    p.add_argument("destination")
+    p.set_defaults(handler=export_categories)
+
+    p = commands.add_parser("stress_orders", help="Place orders from parallel processes and check for oversell.")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--orders", type=int, default=100, help="Orders attempted per worker")
+    p.add_argument("--products", type=int, default=5)
+    p.add_argument("--stock", type=int, default=100, help="Starting stock per product")
+    p.set_defaults(handler=stress_orders)
+
+    p = commands.add_parser("bench_category_rename", help="Time category rename propagation strategies.")
+    p.add_argument("--products", type=int, default=20000)
+    p.add_argument("--categories", type=int, default=50, help="The renamed category holds 1/N of the products")
+    p.add_argument("--backend", choices=("json", "db"), default="json")
+    p.set_defaults(handler=bench_category_rename)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    recover_journal(DATA_DIR)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 # app_menus/customers_menu.py
 from pathlib import Path
 from env import DEFAULT_CUSTOMER_PATH, DEFAULT_ORDER_PATH, DEFAULT_CATEGORIES_PATH, DEFAULT_PRODUCT_PATH
-from functions.customer_manager import add_customer, list_customers_sorted, get_customer_by_id, get_customer_orders
+from functions.customer_manager import add_customer, list_customers_sorted, get_customer_by_id, get_customer_orders, customer_page, seek_customer_name, get_customer_summary
+from functions.product_manager import get_products_by_id
+from menus.menu_pager import browse
 from functions.order_manager import list_orders
 from typing import List, Dict, Optional
 from decimal import Decimal
@@ -88,16 +90,19 @@ def add_customer_menu() -> None:
     )
 
 def list_customers_menu() -> None:
-    customers = list_customers_sorted(CUSTOMERS_PATH)
-    if not customers:
+    if customer_page(0, 1, path=CUSTOMERS_PATH)[1] == 0:
         print("\nNo customers.")
         return
-    print("\nCustomers:")
-    for c in customers:
-        cid = c.get("customer_id")
+    def fmt(i: int, c: dict) -> str:
         name = f"{c.get('first_name','')} {c.get('last_name','')}".strip()
-        email = c.get("email", "")
-        print(f"  - id={cid}: {name} | {email}")
+        return f"  - id={c.get('customer_id')}: {name} | {c.get('email', '')}"
+    # one page at a time, by last name; "/smi" jumps to last names starting at "smi"
+    print("\nCustomers:")
+    browse(
+        lambda start, size: customer_page(start, size, path=CUSTOMERS_PATH),
+        fmt,
+        seek=lambda prefix: seek_customer_name(prefix, CUSTOMERS_PATH),
+    )
 
 def view_customer_menu() -> None:
     raw = input("\nEnter customer ID to view (or Enter to cancel): ").strip()
@@ -144,22 +149,22 @@ Preferred payment: {c.get('preferred_payment_method')}
     else:
         print("\nPayment Methods: (none)")
 
-    # Orders (most recent first)
-    orders = get_customer_orders(cid, orders_path=ORDERS_PATH)
-    if not orders:
+    # Orders (most recent first), from the customer's summary - the orders file isn't read
+    summary = get_customer_summary(cid, orders_path=ORDERS_PATH)
+    if not summary["orders"]:
         print("\nOrders: (none)")
     else:
+        print(f"\nOrders: {summary['order_count']}  |  Lifetime spend: £{summary['lifetime_spend']:.2f}  |  Last order: {summary['last_order_at']}")
+        names = get_products_by_id([pid for pid, _ in summary["top_products"]], DEFAULT_PRODUCT_PATH)
+        top = ", ".join(f"{names.get(pid, {}).get('name', f'product #{pid}')} x{units}" for pid, units in summary["top_products"])
+        print(f"Top products: {top}")
         print("""\n
               ------------- Customers Orders --------------
               
               Orders (most recent first): \n
               """)
-        for o in orders:
-            oid = o.get("order_id")
-            total = o.get("order_total")
-            pro
-            created = o.get("created_at")
-            print(f"  - Order #{oid}  |  £{total:.2f}  |  {created}")
+        for o in summary["orders"]:
+            print(f"  - Order #{o['order_id']}  |  £{o['order_total']:.2f}  |  {o['created_at']}")
 
 def customer_menu() -> None:
     while True:
@@ -4,12 +4,13 @@ from decimal import Decimal
 from pathlib import Path
 from typing import List, Dict, Optional
 from env import DEFAULT_PRODUCT_PATH, DEFAULT_CATEGORIES_PATH, DEFAULT_CUSTOMER_PATH
-from functions.product_manager import delete_product, load_products, save_products, add_product, _convert_product_price_from_string, _convert_product_stock, _sorted_product, sort_products
+from functions.product_manager import delete_product, load_products, save_products, add_product, _convert_product_price_from_string, _convert_product_stock, _sorted_product, sort_products, get_products_by_id, product_page, seek_product_name, search_products
 from functions.category_manager import list_categories, add_category
 from functions.product_categories import get_category_menu, assign_category_to_product_by_index
-from functions.customer_manager import list_customers_sorted, get_customer_by_id, get_customer_orders, add_customer, save_customers, load_customers
+from functions.customer_manager import list_customers_sorted, get_customer_by_id, get_customer_by_email, get_customer_orders, add_customer, save_customers, load_customers, customer_page, seek_customer_name
 from functions.order_manager import add_order, edit_order, delete_order, list_orders, DEFAULT_ORDER_PATH
 from menus.menu_product_sort import sort_products_menu
+from menus.menu_pager import browse, PAGE_SIZE
 
 
 ORDERS_PATH: Path = DEFAULT_ORDER_PATH
@@ -19,52 +20,75 @@ CATEGORY_PATH: Path = DEFAULT_CATEGORIES_PATH
 
 
 def _pick_customer_id() -> int:
-    customers = list_customers_sorted(DEFAULT_CUSTOMER_PATH)
-    if not customers:
+    if customer_page(0, 1, path=CUSTOMER_PATH)[1] == 0:
         print("No customers. Please add a customer first.")
         return -1
-    print("\nCustomers:")
-    for c in customers:
-        print(f"  id={c.get('customer_id')}: {c.get('first_name','')} {c.get('last_name','')} | {c.get('email','')}")
-    raw = input("Enter customer ID (or Enter to cancel): ").strip()
+    raw = input("Enter customer ID or email (L to browse by name, Enter to cancel): ").strip()
     if raw == "":
         return -1
-    try:
-        return int(raw)
-    except ValueError:
-        print("Please enter a numeric ID.")
+    if raw.lower() == "l":
+        # one page at a time, by last name; "/smi" jumps to last names starting at "smi"
+        print("\nCustomers:")
+        customer = browse(
+            lambda start, size: customer_page(start, size, path=CUSTOMER_PATH),
+            lambda i, c: f"  {i}. {c.get('last_name','')}, {c.get('first_name','')} (id={c.get('customer_id')}) | {c.get('email','')}",
+            seek=lambda prefix: seek_customer_name(prefix, CUSTOMER_PATH),
+            choose=True,
+            prompt=">> Pick a customer number (or Enter to cancel): ",
+        )
+        if customer is None:
+            return -1
+    elif "@" in raw:
+        customer = get_customer_by_email(raw, CUSTOMER_PATH)
+    else:
+        try:
+            customer = get_customer_by_id(int(raw), CUSTOMER_PATH)
+        except ValueError:
+            print("Please enter a numeric ID or an email address.")
+            return -1
+    if customer is None:
+        print("Customer not found.")
         return -1
+    return int(customer["customer_id"])
 
 def _pick_product(items_accum: List[Dict]) -> bool:
     """
     Add one product+qty into items_accum.
     Returns False if user finished; True if an item was added or retry needed.
     """
-    products = load_products(PRODUCT_PATH)
-    if not products:
-        print("No products available.")
-        return False
-
-    print("\nProducts:")
-    for i, product in enumerate(products, start=1):
+    def fmt(i: int, product: Dict) -> str:
         price = product.get("price", 0)
         stock = product.get("stock", 0)
-        print(f"  {i}. {product.get('name','(unnamed)')} (id={product.get('product_id')}) | £{price:.2f} | stock {stock}")
+        return f"  {i}. {product.get('name','(unnamed)')} (id={product.get('product_id')}) | £{price:.2f} | stock {stock}"
 
-    raw = input(">> Pick a product number (or Enter to finish): ").strip()
+    raw = input(">> Search products by name or SKU (L to list all, Enter to finish): ").strip()
     if raw == "":
         return False
-    try:
-        index = int(raw) - 1
-    except ValueError:
-        print("Please enter a valid number.")
-        return True
-
-    if index < 0 or index >= len(products):
-        print("Out of range.")
+    if raw.lower() == "l":
+        # one page at a time, in name order; "/blue" jumps to names starting at "blue"
+        print("\nProducts:")
+        product = browse(
+            lambda start, size: product_page(start, size, products_path=PRODUCT_PATH),
+            fmt,
+            seek=lambda prefix: seek_product_name(prefix, PRODUCT_PATH),
+            choose=True,
+            prompt=">> Pick a product number (or Enter to go back): ",
+        )
+    else:
+        matches = search_products(raw, limit=PAGE_SIZE, products_path=PRODUCT_PATH)
+        if not matches:
+            print("No products match.")
+            return True
+        print(f"\nBest matches for '{raw}':")
+        product = browse(
+            lambda start, size: (matches[start:start + size], len(matches)),
+            fmt,
+            choose=True,
+            prompt=">> Pick a product number (or Enter to go back): ",
+        )
+    if product is None:
         return True
 
-    product = products[index]
     qty_raw = input(f"Enter quantity for '{product.get('name','(unnamed)')}' (>=1): ").strip()
     try:
         qty = int(qty_raw)
@@ -84,7 +108,7 @@ def _preview_basket(items: List[Dict]) -> None:
         print("\nBasket: (empty)")
         return
     print("\nBasket:")
-    products = {int(product["product_id"]): product for product in load_products(PRODUCT_PATH)}
+    products = get_products_by_id([it["product_id"] for it in items], PRODUCT_PATH)
     total = 0.0
     for it in items:
         pid, qty = it["product_id"], it["qty"]
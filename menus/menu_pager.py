@@ -0,0 +1,66 @@
+from typing import Callable, List, Optional, Tuple, Any
+
+PAGE_SIZE = 20
+
+
+def browse(
+    fetch_page: Callable[[int, int], Tuple[List[Any], int]],
+    fmt: Callable[[int, Any], str],
+    *,
+    seek: Optional[Callable[[str], Optional[int]]] = None,
+    choose: bool = False,
+    page_size: int = PAGE_SIZE,
+    prompt: str = ">> "
+) -> Optional[Any]:
+    """
+    Show a list one page at a time. fetch_page(start, size) returns (items, total);
+    only the page on screen is fetched and printed.
+      n / p       next / previous page
+      /text       jump to where `text` would be (uses seek(text) -> 0-based position)
+      number      choose that item (choose=True only) and return it
+      Enter       leave; returns None
+    """
+    start = 0
+    while True:
+        items, total = fetch_page(start, page_size)
+        if total == 0:
+            print("Nothing to show.")
+            return None
+        for n, item in enumerate(items, start=start + 1):
+            print(fmt(n, item))
+        keys = "n: next  p: previous" + ("  /text: jump to" if seek else "") + ("  number: choose" if choose else "")
+        print(f"  -- {start + 1}-{start + len(items)} of {total} --  {keys}  Enter: done")
+
+        raw = input(prompt).strip()
+        if raw == "":
+            return None
+        if raw.lower() == "n":
+            if start + page_size < total:
+                start += page_size
+            else:
+                print("Last page.")
+            continue
+        if raw.lower() == "p":
+            start = max(0, start - page_size)
+            continue
+        if raw.startswith("/") and seek is not None:
+            pos = seek(raw[1:].strip())
+            if pos is None:
+                print("Not found.")
+            else:
+                start = min(max(0, pos), total - 1)
+            continue
+        if not choose:
+            print("Please enter n, p" + (", /text" if seek else "") + " or press Enter.")
+            continue
+        try:
+            number = int(raw)
+        except ValueError:
+            print("Please enter a valid number.")
+            continue
+        if number < 1 or number > total:
+            print("Out of range.")
+            continue
+        chosen, _ = fetch_page(number - 1, 1)
+        if chosen:
+            return chosen[0]
@@ -1,11 +1,12 @@
 from decimal import Decimal
 from pathlib import Path
 from typing import List, Dict, Optional
-from functions.product_manager import delete_product, load_products, save_products, add_product, _convert_product_price_from_string, _convert_product_stock, _sorted_product, sort_products
+from functions.product_manager import delete_product, load_products, save_products, add_product, _convert_product_price_from_string, _convert_product_stock, _sorted_product, sort_products, product_page, seek_product_name
 from functions.category_manager import list_categories, add_category
-from functions.product_categories import assign_category_to_product_by_code, get_category_menu, assign_category_to_product_by_index, get_category_picker_with_codes, filter_products_by_category_code, filter_products_by_category_id
+from functions.product_categories import assign_category_to_product_by_code, get_category_menu, assign_category_to_product_by_index, get_category_picker_with_codes, filter_products_by_category_code, filter_products_by_category_id, category_picker_page, seek_category_code
 from env import DEFAULT_PRODUCT_PATH, DEFAULT_CATEGORIES_PATH
 from menus.menu_product_sort import sort_products_menu
+from menus.menu_pager import browse
 
 PRODUCTS_PATH: Path = DEFAULT_PRODUCT_PATH
 CATEGORIES_PATH: Path = DEFAULT_CATEGORIES_PATH
@@ -62,15 +63,25 @@ def product_menu():
             print("* Invalid selection. Please enter a number between 1 and 4.")
 
 
-def view_products() -> None:
-    products = load_products(PRODUCTS_PATH)
-    if not products:
-        print("\nNo products found.")
-        return
+def _product_pages(start: int, size: int):
+    return product_page(start, size, products_path=PRODUCTS_PATH)
+
+def _seek_product(prefix: str) -> int:
+    return seek_product_name(prefix, PRODUCTS_PATH)
+
+def _browse_category_tree() -> None:
+    """Page through the category tree; "/10.2" jumps to that code."""
+    browse(
+        lambda start, size: category_picker_page(start, size, categories_path=CATEGORIES_PATH),
+        lambda i, line: "  " + line,
+        seek=lambda code: seek_category_code(code, CATEGORIES_PATH),
+    )
 
+def view_products() -> None:
+    # a page at a time, in name order ("/text" jumps by name)
     print("\nProducts:")
 
-    for i, product in enumerate(products, start=1):
+    def fmt(i: int, product: Dict) -> str:
         name = product.get("name", "(unnamed)")
         category = product.get("category_name") or "-"
         price = product.get("price", 0)
@@ -82,7 +93,9 @@ def view_products() -> None:
         order_tally_str = f" | Order Tally: {order_tally}" if isinstance(order_tally, int) else ""
         # print(f"  {i}. {name}  | Category: {category}{price_str}{stock_str}{order_tally_str}")
 
-        print(f" ID {i}. | Name: {name}  | Category: {category} | Price: £{price:.2f} | Stock: {stock} | Order Tally: {order_tally}\n")
+        return f" ID {i}. | Name: {name}  | Category: {category} | Price: £{price:.2f} | Stock: {stock} | Order Tally: {order_tally}\n"
+
+    browse(_product_pages, fmt, seek=_seek_product)
 
 
 def _find_product_index_by_id(products: List[Dict], product_id: int) -> int:
@@ -129,8 +142,7 @@ def add_product_with_category_menu() -> None:
     # Assign category by index or code
     print("\nYou can assign a category by display code (e.g., 10 or 10.2).")
     print("Current category tree:")
-    for line in get_category_picker_with_codes(CATEGORIES_PATH):
-        print("  " + line)
+    _browse_category_tree()
     raw_code = input("Enter category code (or press Enter to choose from list): ").strip()
     if raw_code:
         if assign_category_to_product_by_code(
@@ -300,14 +312,13 @@ def change_product_category_menu() -> None:
 
 
 def delete_product_menu() -> None:
-    products = load_products(PRODUCTS_PATH)
-    if not products:
+    _, total = _product_pages(0, 0)
+    if not total:
         print("\nNo products to delete.")
         return
 
     print("\nProducts:")
-    for product in products:
-        print(f" [ID {product.get('product_id')}] - {product.get('name','(unnamed)')}")
+    browse(_product_pages, lambda i, product: f" [ID {product.get('product_id')}] - {product.get('name','(unnamed)')}", seek=_seek_product)
 
     raw = input("\n>> Enter the Product ID Number to delete (or Enter to cancel): ").strip()
     if raw == "":
@@ -348,8 +359,7 @@ def filter_products_by_category_menu() -> None:
     Option: include descendants or direct children only.
     """
     print("\nCategory tree (with display codes):")
-    for line in get_category_picker_with_codes(CATEGORIES_PATH):
-        print("  " + line)
+    _browse_category_tree()
 
     code = input("\nEnter display code to filter (e.g., 10 or 10.2, or Enter to cancel): ").strip()
     if not code:
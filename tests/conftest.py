@@ -0,0 +1,90 @@
+import json
+import random
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    import env  # noqa: F401
+except ImportError:
+    # env.py holds the deployment's data paths and is not committed. The code under
+    # test is always given explicit paths; the defaults only need to point somewhere.
+    _data_dir = Path(tempfile.mkdtemp(prefix="ecommerce-tests-"))
+    env = types.ModuleType("env")
+    env.BASE_DIR = ROOT
+    env.DATA_DIR = _data_dir
+    env.DEFAULT_PRODUCT_PATH = _data_dir / "product_catalog.json"
+    env.DEFAULT_ORDER_PATH = _data_dir / "orders.json"
+    env.DEFAULT_CATEGORIES_PATH = _data_dir / "category_catalog.json"
+    env.DEFAULT_CUSTOMER_PATH = _data_dir / "customers.json"
+    env.DEFAULT_REPORTS_PATH = ROOT / "reports" / "records.txt"
+    sys.modules["env"] = env
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    """Every test starts and ends with an empty in-process file cache."""
+    from functions.cache import file_cache
+    file_cache.invalidate()
+    yield
+    file_cache.invalidate()
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def products_path(request, tmp_path):
+    """
+    A small product catalog with plenty of stock (the fields order placement maintains),
+    in each storage backend.
+    """
+    path = tmp_path / "product_catalog.json"
+    path.write_text(json.dumps([
+        {"product_id": pid, "name": f"Product {pid}", "price": float(pid), "product_stock": 1000,
+         "product_total_ordered": 0, "category_id": None, "category_name": None}
+        for pid in range(1, 9)
+    ]), encoding="utf-8")
+    if request.param == "sqlite":
+        from functions.product_store import migrate_products
+        db = tmp_path / "product_catalog.db"
+        migrate_products(path, db)
+        path.unlink()
+        return db
+    return path
+
+
+@pytest.fixture
+def churn():
+    """
+    churn(orders_path, products_path, seed, steps): random add_order / add_orders_bulk /
+    edit_order / delete_order calls. Returns the ids of the orders left.
+    """
+    from functions.order_manager import add_order, add_orders_bulk, edit_order, delete_order
+
+    def run(orders_path, products_path, seed=3, steps=60):
+        rnd = random.Random(seed)
+        live = []
+        for _ in range(steps):
+            action = rnd.random()
+            items = [{"product_id": rnd.randint(1, 8), "qty": rnd.randint(1, 3)} for _ in range(rnd.randint(1, 3))]
+            if action < 0.45 or not live:
+                order = add_order(items, customer_id=rnd.randint(1, 6), orders_path=orders_path, products_path=products_path)
+                live.append(order["order_id"])
+            elif action < 0.6:
+                report = add_orders_bulk(
+                    [{"customer_id": rnd.randint(1, 6), "items": items, "created_at": f"2023-0{rnd.randint(1, 9)}-01T00:00:00Z"}
+                     for _ in range(3)], orders_path=orders_path, products_path=products_path)
+                live.extend(o["order_id"] for o in report["accepted"])
+            elif action < 0.85:
+                assert edit_order(rnd.choice(live), items, orders_path=orders_path, products_path=products_path)
+            else:
+                oid = rnd.choice(live)
+                assert delete_order(oid, orders_path=orders_path, products_path=products_path)
+                live.remove(oid)
+        return live
+    return run
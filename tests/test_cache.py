@@ -0,0 +1,108 @@
+import json
+import os
+
+from functions.cache import FileCache, file_signature, cached_json_list
+from functions.journal import atomic_write_json
+
+
+def _counting_loader():
+    calls = []
+    def load(path):
+        calls.append(path)
+        return json.loads(path.read_text(encoding="utf-8"))
+    return load, calls
+
+
+def test_reused_until_the_file_changes(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("[1]", encoding="utf-8")
+    cache, (load, calls) = FileCache(), _counting_loader()
+    assert cache.get(path, load) == [1]
+    assert cache.get(path, load) is cache.get(path, load)
+    assert len(calls) == 1 and cache.stats()["hits"] == 2
+
+    # same size, new mtime
+    st = os.stat(path)
+    path.write_text("[2]", encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert cache.get(path, load) == [2] and len(calls) == 2
+
+
+def test_a_same_size_rewrite_within_the_same_mtime_is_caught_by_an_atomic_replace(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("[1]", encoding="utf-8")
+    cache, (load, _) = FileCache(), _counting_loader()
+    assert cache.get(path, load) == [1]
+    before = file_signature(path)
+    tmp = tmp_path / "data.json.tmp"
+    tmp.write_text("[2]", encoding="utf-8")
+    os.utime(tmp, ns=(before[0], before[0]))   # identical mtime and size: only the inode differs
+    os.replace(tmp, path)
+    assert file_signature(path)[:2] == before[:2] and file_signature(path) != before
+    assert cache.get(path, load) == [2]
+
+
+def test_size_change_and_deletion(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("[1]", encoding="utf-8")
+    cache, (load, calls) = FileCache(), _counting_loader()
+    cache.get(path, load)
+    st = os.stat(path)
+    path.write_text("[1, 2]", encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))   # same mtime, different size
+    assert cache.get(path, load) == [1, 2]
+    path.unlink()
+    assert cache.peek(path) is None
+    assert cache.get(path, lambda p: "missing") == "missing" and cache.get(path, lambda p: "again") == "again"
+
+
+def test_derived_entries_follow_their_dependencies(tmp_path):
+    data, other = tmp_path / "products.json", tmp_path / "categories.json"
+    data.write_text("[1]", encoding="utf-8")
+    other.write_text("[]", encoding="utf-8")
+    cache = FileCache()
+    builds = []
+    def derive(path):
+        builds.append(1)
+        return len(builds)
+    assert cache.get(data, derive, tag="derived", depends_on=(other,)) == 1
+    assert cache.get(data, derive, tag="derived", depends_on=(other,)) == 1
+    atomic_write_json(other, [1])
+    assert cache.get(data, derive, tag="derived", depends_on=(other,)) == 2
+    other.unlink()
+    assert cache.get(data, derive, tag="derived", depends_on=(other,)) == 3
+    # a plain entry on the same path is independent of the derived one
+    assert cache.get(data, lambda p: "plain") == "plain"
+    assert cache.get(data, derive, tag="derived", depends_on=(other,)) == 3
+
+
+def test_put_peek_and_invalidate(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("[1]", encoding="utf-8")
+    cache = FileCache()
+    assert cache.peek(path, tag="index") is None
+    cache.put(path, "derived", tag="index")
+    assert cache.peek(path, tag="index") == "derived"
+    assert cache.get(path, lambda p: "rebuilt", tag="index") == "derived"
+
+    atomic_write_json(path, [2])   # a new version: the put value is stale
+    assert cache.peek(path, tag="index") is None
+    cache.put(path, "after", tag="index")
+    cache.put(tmp_path / "missing.json", "never", tag="index")   # no file, nothing stored
+    assert cache.peek(tmp_path / "missing.json", tag="index") is None
+
+    cache.get(path, lambda p: "plain")
+    cache.invalidate(path)
+    assert cache.peek(path, tag="index") is None and cache.peek(path) is None
+    cache.put(path, "back", tag="index")
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_cached_lists_are_copied_per_record(tmp_path):
+    path = tmp_path / "data.json"
+    atomic_write_json(path, [{"id": 1, "tags": ["a"]}])
+    first = cached_json_list(path)
+    first[0]["id"] = 99
+    first.append({"id": 2})
+    assert cached_json_list(path) == [{"id": 1, "tags": ["a"]}]
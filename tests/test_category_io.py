@@ -0,0 +1,92 @@
+import json
+import random
+
+import pytest
+
+from functions.category_io import import_category_tree, export_category_tree
+from functions.category_manager import Category, _save_categories, get_category_tree
+
+
+def _catalog(tmp_path, categories=(), name="category_catalog.json"):
+    path = tmp_path / name
+    _save_categories(list(categories), False, path)
+    return path
+
+def _paths(path):
+    """Every category as its path of names from the top: what an export/import must keep."""
+    tree = get_category_tree(path)
+    return sorted(tuple(tree.path_for(cid)) for cid in tree.by_id)
+
+def _random_taxonomy(seed, n=60):
+    rnd = random.Random(seed)
+    categories = []
+    for cid in range(1, n + 1):
+        parent = rnd.choice([None] + [c.category_id for c in categories]) if categories else None
+        categories.append(Category(cid, f"Cat {cid} {rnd.choice(['é', 'ß', 'x', ','])}", parent))
+    return categories
+
+
+@pytest.mark.parametrize("fmt", ["json", "csv"])
+@pytest.mark.parametrize("seed", range(3))
+def test_export_then_import_rebuilds_the_same_tree(tmp_path, fmt, seed):
+    source = _catalog(tmp_path, _random_taxonomy(seed))
+    exported = tmp_path / f"taxonomy.{fmt}"
+    assert export_category_tree(exported, path=source) == 60
+
+    target = _catalog(tmp_path, name="imported.json")
+    report = import_category_tree(exported, path=target)
+    assert report["errors"] == [] and len(report["added"]) == 60
+    assert _paths(target) == _paths(source)
+
+
+def test_nested_export_is_valid_json_in_display_order(tmp_path):
+    source = _catalog(tmp_path, [Category(1, "Beta"), Category(2, "Alpha"), Category(3, "Shirts", 1),
+                                 Category(4, "Caps", 1), Category(5, "Linen", 3)])
+    exported = tmp_path / "taxonomy.json"
+    export_category_tree(exported, path=source)
+    assert json.loads(exported.read_text(encoding="utf-8")) == [
+        {"category_id": 2, "name": "Alpha", "children": []},
+        {"category_id": 1, "name": "Beta", "children": [
+            {"category_id": 4, "name": "Caps", "children": []},
+            {"category_id": 3, "name": "Shirts", "children": [{"category_id": 5, "name": "Linen", "children": []}]},
+        ]},
+    ]
+
+
+def test_reimporting_with_merge_reuses_existing_categories(tmp_path):
+    source = _catalog(tmp_path, _random_taxonomy(7, 20))
+    exported = tmp_path / "taxonomy.csv"
+    export_category_tree(exported, path=source)
+    before = _paths(source)
+
+    refused = import_category_tree(exported, path=source)
+    assert refused["errors"] and not refused["added"]
+    merged = import_category_tree(exported, merge_existing=True, path=source)
+    assert merged["errors"] == [] and merged["added"] == [] and merged["merged"] == 20
+    assert _paths(source) == before
+
+
+def test_import_under_a_category_nests_the_whole_source(tmp_path):
+    source = _catalog(tmp_path, [Category(1, "Shoes"), Category(2, "Boots", 1)])
+    exported = tmp_path / "taxonomy.json"
+    export_category_tree(exported, path=source)
+    target = _catalog(tmp_path, [Category(1, "Archive")], name="target.json")
+    report = import_category_tree(exported, under=1, path=target)
+    assert report["errors"] == []
+    assert _paths(target) == [("Archive",), ("Archive", "Shoes"), ("Archive", "Shoes", "Boots")]
+
+
+@pytest.mark.parametrize("rows, problem", [
+    ("1,Shoes,\n2,Boots,1\n3,boots,1\n", "Duplicate name"),
+    ("1,Shoes,\n2,Boots,9\n", "Unknown parent_id 9"),
+    ("1,Shoes,\n2,Boots,3\n3,Laces,2\n", "cycle"),
+    ("1,Shoes,\n1,Boots,\n", "Duplicate category_id 1"),
+])
+def test_a_bad_source_writes_nothing(tmp_path, rows, problem):
+    target = _catalog(tmp_path, [Category(1, "Existing")])
+    before = target.read_bytes()
+    source = tmp_path / "bad.csv"
+    source.write_text("category_id,name,parent_id\n" + rows, encoding="utf-8")
+    report = import_category_tree(source, path=target)
+    assert report["added"] == [] and any(problem in e for e in report["errors"])
+    assert target.read_bytes() == before
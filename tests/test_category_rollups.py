@@ -0,0 +1,94 @@
+import multiprocessing
+import random
+
+import pytest
+
+from functions.category_manager import (Category, CategoryTree, CategoryRollups, _save_categories, get_category_tree,
+                                        get_category_rollups, category_rollup, ROLLUP_FIELDS)
+from functions.order_manager import add_order
+from functions.product_manager import add_product, update_products, delete_product, get_product, load_products
+
+# fork, so the child sees the test's env module (see conftest.py)
+ctx = multiprocessing.get_context("fork")
+
+
+@pytest.fixture
+def shop(tmp_path, products_path):
+    """Categories 1 > 2 > 3 and 4, with the products spread over them."""
+    path = tmp_path / "category_catalog.json"
+    _save_categories([Category(1, "Clothing"), Category(2, "Shirts", 1), Category(3, "Linen", 2),
+                      Category(4, "Shoes")], False, path)
+    update_products([{**p, "category_id": [1, 2, 3, 4, None][i % 5], "price": 1.25 * (i + 1)}
+                     for i, p in enumerate(load_products(products_path))], products_path)
+    return path, products_path
+
+
+def _recount(path, products_path):
+    """Totals from scratch: every product counted in its category and each ancestor."""
+    tree = get_category_tree(path)
+    totals = {}
+    for cid in tree.by_id:
+        below = tree.subtree_ids(cid)
+        products = [p for p in load_products(products_path) if p.get("category_id") in below]
+        stock = [int(p.get("product_stock", p.get("stock")) or 0) for p in products]
+        totals[cid] = {
+            "product_count": len(products),
+            "total_stock": sum(stock),
+            "stock_value": round(sum(float(p["price"]) * s for p, s in zip(products, stock)), 2),
+            "product_total_ordered": sum(int(p.get("product_total_ordered") or 0) for p in products),
+        }
+    return totals
+
+def _current(path, products_path):
+    return {cid: category_rollup(cid, path=path, products_path=products_path) for cid in get_category_tree(path).by_id}
+
+
+def test_writes_update_the_cached_rollups_in_place(shop, tmp_path):
+    path, products_path = shop
+    assert _current(path, products_path) == _recount(path, products_path)
+    rollups = get_category_rollups(path, products_path)
+    rnd = random.Random(4)
+
+    added = add_product("Linen Shirt", "20", "7", path=products_path)
+    update_products([{**added, "category_id": 3}], products_path)                           # assign
+    update_products([{**get_product(2, products_path), "category_id": 4}], products_path)   # recategorise
+    update_products([{**get_product(1, products_path), "product_stock": 5, "price": 9.99}], products_path)
+    assert delete_product(5, products_path=products_path, orders_path=tmp_path / "orders.json")
+    for _ in range(5):
+        add_order([{"product_id": rnd.choice([1, 3, 4, 6]), "qty": rnd.randint(1, 3)}], customer_id=1,
+                  orders_path=tmp_path / "orders.json", products_path=products_path)
+
+    assert get_category_rollups(path, products_path) is rollups   # kept current, not rebuilt
+    assert _current(path, products_path) == _recount(path, products_path)
+
+
+def test_a_category_move_rebuilds_them(shop):
+    path, products_path = shop
+    get_category_rollups(path, products_path)
+    _save_categories([Category(1, "Clothing"), Category(2, "Shirts", 4), Category(3, "Linen", 2),
+                      Category(4, "Shoes")], False, path)
+    assert _current(path, products_path) == _recount(path, products_path)
+    assert category_rollup(4, path=path, products_path=products_path)["product_count"] == 5
+
+
+def _restock(products_path):
+    update_products([{**get_product(3, products_path), "product_stock": 1}], products_path)
+
+def test_another_process_writing_products_is_picked_up(shop):
+    path, products_path = shop
+    before = category_rollup(1, path=path, products_path=products_path)
+    writer = ctx.Process(target=_restock, args=(products_path,))
+    writer.start()
+    writer.join()
+    assert writer.exitcode == 0
+    after = category_rollup(1, path=path, products_path=products_path)
+    assert after["total_stock"] == before["total_stock"] - 999
+    assert _current(path, products_path) == _recount(path, products_path)
+
+
+def test_cycles_and_unknown_categories_count_only_where_they_reach():
+    tree = CategoryTree([Category(1, "Top"), Category(2, "Loop a", 3), Category(3, "Loop b", 2)])
+    rollups = CategoryRollups([{"product_id": 1, "category_id": 2, "product_stock": 2, "price": 1.0},
+                               {"product_id": 2, "category_id": 99, "product_stock": 5, "price": 1.0}], tree)
+    assert rollups.get(2)["product_count"] == 1 and rollups.get(3)["product_count"] == 1
+    assert rollups.get(1) == dict(zip(ROLLUP_FIELDS, [0, 0, 0.0, 0]))
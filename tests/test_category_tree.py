@@ -0,0 +1,179 @@
+import random
+
+import pytest
+
+from functions.cache import file_cache
+from functions.category_manager import (Category, CategoryTree, _descendant_ids, add_category, add_subcategory,
+                                        update_category_name, delete_category, get_category_tree,
+                                        category_code_changes, _load_categories, resolve_category_names)
+from functions.product_manager import load_products, update_products
+
+
+def _random_categories(rnd, n):
+    categories = []
+    for cid in range(1, n + 1):
+        parent = rnd.choice([None] + [c.category_id for c in categories]) if categories else None
+        categories.append(Category(cid, f"Cat {rnd.randint(0, 10 ** 6):07d}", parent))
+    return categories
+
+
+def _copies(categories):
+    return [Category(c.category_id, c.name, c.parent_id) for c in categories]
+
+
+def _shape(tree):
+    """Everything a tree derives from the catalog, in comparable form."""
+    return {
+        "codes": dict(tree.id_to_code),
+        "by_code": dict(tree.code_to_id),
+        "by_name": dict(tree.by_name),
+        "preorder": list(tree.preorder),
+        "interval": dict(tree.interval),
+        "children": {k: [c.category_id for c in v] for k, v in tree.by_parent.items() if v},
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_intervals_agree_with_walking_parent_links(seed):
+    rnd = random.Random(seed)
+    categories = _random_categories(rnd, 80)
+    tree = CategoryTree(categories)
+    assert sorted(tree.preorder) == [c.category_id for c in categories]
+    for c in rnd.sample(categories, 20):
+        expected = _descendant_ids(categories, c.category_id)
+        assert tree.descendant_ids(c.category_id) == expected
+        assert tree.subtree_ids(c.category_id) == expected | {c.category_id}
+        for other in rnd.sample(categories, 10):
+            assert tree.is_within(other.category_id, c.category_id) == (other.category_id in expected | {c.category_id})
+
+
+def test_orphans_get_intervals_but_no_codes():
+    tree = CategoryTree([Category(1, "Top"), Category(2, "Lost", parent_id=99), Category(3, "Under lost", parent_id=2)])
+    assert tree.descendant_ids(2) == {3} and tree.is_within(3, 2)
+    assert tree.code_for(1) == "10" and tree.code_for(2) == "" and tree.code_for(3) == ""
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_updates_match_a_fresh_build(seed):
+    rnd = random.Random(seed)
+    categories = _random_categories(rnd, 40)
+    tree = CategoryTree(_copies(categories))   # the tree shares its Category objects
+    next_id = 41
+    for _ in range(60):
+        by_id = {c.category_id: c for c in categories}
+        leaves = [c.category_id for c in categories if not tree.children(c.category_id)]
+        action = rnd.random()
+        if action < 0.4 or not leaves:
+            parent = rnd.choice([None] + list(by_id))
+            change = ("add", Category(next_id, f"New {rnd.randint(0, 10 ** 6):07d}", parent))
+            categories.append(Category(next_id, change[1].name, parent))
+            next_id += 1
+        elif action < 0.75:
+            cid = rnd.choice(list(by_id))
+            change = ("rename", cid, f"Renamed {rnd.randint(0, 10 ** 6):07d}")
+            by_id[cid].name = change[2]
+        else:
+            cid = rnd.choice(leaves)
+            change = ("delete", cid)
+            categories = [c for c in categories if c.category_id != cid]
+
+        before = dict(tree.id_to_code)
+        tree, moves = tree.updated(change)
+        fresh = CategoryTree(_copies(categories))
+        assert _shape(tree) == _shape(fresh)
+        # the moves are exactly the codes that changed
+        after = fresh.id_to_code
+        changed = {(cid, before.get(cid), after.get(cid)) for cid in set(before) | set(after)
+                   if before.get(cid) != after.get(cid)}
+        assert set(moves) == changed
+
+
+def test_updates_around_orphans_and_cycles_match_a_fresh_build():
+    categories = [Category(1, "Top"), Category(2, "Shirts", 1), Category(3, "Lost", parent_id=90),
+                  Category(4, "Loop a", 5), Category(5, "Loop b", 4), Category(6, "Also lost", parent_id=91)]
+    tree = CategoryTree(_copies(categories))
+    changes = [
+        ("add", Category(7, "Under lost", 3)),
+        ("add", Category(8, "Under loop", 4)),
+        ("rename", 3, "A lost one"),
+        ("rename", 2, "Blouses"),
+        ("add", Category(90, "Found", 1)),      # adopts the orphan 3 and its child
+        ("add", Category(9, "New orphan", 92)),
+        ("delete", 8),
+        ("delete", 1),                          # orphans 2 and 90
+    ]
+    for change in changes:
+        if change[0] == "add":
+            categories.append(Category(change[1].category_id, change[1].name, change[1].parent_id))
+        elif change[0] == "rename":
+            next(c for c in categories if c.category_id == change[1]).name = change[2]
+        else:
+            categories = [c for c in categories if c.category_id != change[1]]
+        before = dict(tree.id_to_code)
+        advanced, moves = tree.updated(change)
+        assert advanced is tree   # edited in place, not copied
+        fresh = CategoryTree(_copies(categories))
+        assert _shape(tree) == _shape(fresh)
+        assert set(moves) == {(cid, before.get(cid), fresh.id_to_code.get(cid))
+                              for cid in set(before) | set(fresh.id_to_code)
+                              if before.get(cid) != fresh.id_to_code.get(cid)}
+
+
+def test_edits_through_the_api_keep_the_cached_tree_and_code_feed_current(tmp_path, products_path):
+    path = tmp_path / "category_catalog.json"
+    path.write_text("[]", encoding="utf-8")
+    beta = add_category("Beta", path=path)
+    alpha = add_category("Alpha", path=path)
+    shirts = add_subcategory("Shirts", beta["category_id"], path=path)
+    seen, _ = category_code_changes(path=path)
+
+    assert update_category_name(alpha["category_id"], "Zeta", path=path, products_path=products_path)
+    seen, moves = category_code_changes(seen, path=path)
+    assert {(m["category_id"], m["old_code"], m["new_code"]) for m in moves} == {
+        (alpha["category_id"], "10", "11"), (beta["category_id"], "11", "10"), (shirts["category_id"], "11.1", "10.1")}
+
+    assert delete_category(alpha["category_id"], path=path, products_path=products_path)
+    seen, moves = category_code_changes(seen, path=path)
+    assert moves == [{"category_id": alpha["category_id"], "old_code": "11", "new_code": None}]
+
+    cached = get_category_tree(path)
+    file_cache.invalidate()
+    assert _shape(cached) == _shape(CategoryTree(_load_categories(path)[0]))
+
+
+def _assign(products_path, categories):
+    """Products 1-3 in the first category, 4-5 in the second (with their names), the rest unassigned."""
+    update_products([{**p, "category_id": c["category_id"], "category_name": c["name"]}
+                     for p in load_products(products_path)
+                     for c in [categories[0] if p["product_id"] <= 3 else categories[1] if p["product_id"] <= 5 else None]
+                     if c], products_path)
+
+def test_a_rename_is_propagated_to_the_products_in_that_category_only(tmp_path, products_path):
+    path = tmp_path / "category_catalog.json"
+    path.write_text("[]", encoding="utf-8")
+    shirts = add_category("Shirts", path=path)
+    linen = add_subcategory("Linen", shirts["category_id"], path=path)
+    _assign(products_path, [shirts, linen])
+    before = {p["product_id"]: p for p in load_products(products_path)}
+
+    assert update_category_name(shirts["category_id"], "Tops", path=path, products_path=products_path)
+    after = {p["product_id"]: p for p in load_products(products_path)}
+    assert {pid: p["category_name"] for pid, p in after.items()} == {
+        1: "Tops", 2: "Tops", 3: "Tops", 4: "Linen", 5: "Linen", 6: None, 7: None, 8: None}
+    # nothing else about the products changed
+    assert all({**p, "category_name": before[pid]["category_name"]} == before[pid] for pid, p in after.items())
+
+
+def test_without_propagation_readers_resolve_the_new_name(tmp_path, products_path):
+    path = tmp_path / "category_catalog.json"
+    path.write_text("[]", encoding="utf-8")
+    shirts = add_category("Shirts", path=path)
+    shoes = add_category("Shoes", path=path)
+    _assign(products_path, [shirts, shoes])
+    stored = load_products(products_path)
+
+    assert update_category_name(shoes["category_id"], "Footwear", path=path, products_path=products_path,
+                                propagate=False)
+    assert load_products(products_path) == stored   # the catalog was not rewritten
+    resolved = resolve_category_names(load_products(products_path), path)
+    assert [p["category_name"] for p in resolved] == ["Shirts"] * 3 + ["Footwear"] * 2 + [None] * 3
@@ -0,0 +1,118 @@
+import json
+import multiprocessing
+import random
+
+import pytest
+
+from functions.cache import file_cache
+from functions.customer_summary import load_customer_summaries, rebuild_customer_summaries, summary_path_for
+from functions import journal
+from functions.journal import recover_journal, JOURNAL_PREFIX, TMP_SUFFIX
+from functions.order_index import load_order_index, rebuild_order_index, index_path_for
+from functions.order_manager import add_order
+from functions.order_store import get_order_store
+from functions.product_manager import load_products, save_products
+from functions.product_store import get_product_store
+
+# fork, so the children see the test's env module (see conftest.py)
+ctx = multiprocessing.get_context("fork")
+
+
+def _place_orders(orders_path, products_path, worker_no, n_orders, placed):
+    rnd = random.Random(worker_no)
+    for _ in range(n_orders):
+        items = [{"product_id": rnd.randint(1, 3), "qty": rnd.randint(1, 4)}]
+        if add_order(items, customer_id=worker_no + 1, orders_path=orders_path, products_path=products_path):
+            with placed.get_lock():
+                placed.value += 1
+
+
+@pytest.mark.parametrize("orders_name", ["orders.json", "orders.jsonl"])
+def test_processes_starting_up_mid_commit_lose_no_orders_and_oversell_nothing(tmp_path, products_path, orders_name):
+    orders_path = tmp_path / orders_name
+    products = load_products(products_path)
+    for p in products:
+        p["product_stock"] = 60   # less than the workers will try to buy
+    save_products(products, products_path)
+    stock = {int(p["product_id"]): 60 for p in products}
+
+    placed = ctx.Value("i", 0)
+    workers = [ctx.Process(target=_place_orders, args=(orders_path, products_path, w, 25, placed)) for w in range(3)]
+    for w in workers:
+        w.start()
+    starts = 0
+    while any(w.is_alive() for w in workers) or starts < 5:
+        # a new process starting up runs recovery, as manage.py does
+        starter = ctx.Process(target=recover_journal, args=(tmp_path,))
+        starter.start()
+        starter.join()
+        assert starter.exitcode == 0
+        starts += 1
+    for w in workers:
+        w.join()
+        assert w.exitcode == 0
+
+    file_cache.invalidate()
+    orders = get_order_store(orders_path).load_all()
+    assert len(orders) == placed.value > 0
+    ordered = {pid: 0 for pid in stock}
+    for order in orders:
+        for li in order["items"]:
+            ordered[int(li["product_id"])] += int(li["qty"])
+    final = {int(p["product_id"]): int(p["product_stock"]) for p in load_products(products_path)}
+    assert all(final[pid] >= 0 and final[pid] + ordered[pid] == stock[pid] for pid in stock)
+    assert not list(tmp_path.glob(f"{JOURNAL_PREFIX}*.json"))
+    assert not list(tmp_path.glob(f"*{TMP_SUFFIX}"))
+
+    # the sidecars every process kept up to date agree with a fresh rebuild
+    index = load_order_index(orders_path).to_dict()
+    summaries = load_customer_summaries(orders_path).to_dict()
+    index_path_for(orders_path).unlink()
+    summary_path_for(orders_path).unlink()
+    file_cache.invalidate()
+    fresh = rebuild_order_index(orders_path).to_dict()
+    for field in ("by_customer", "by_product"):
+        assert {k: sorted(v) for k, v in index[field].items()} == {k: sorted(v) for k, v in fresh[field].items()}
+    assert [index[f] for f in ("by_created", "positions", "offsets")] == [fresh[f] for f in ("by_created", "positions", "offsets")]
+    assert summaries == rebuild_customer_summaries(orders_path).to_dict()
+
+
+def _recover_signalling(directory, started):
+    real_apply = journal._apply_op
+    def apply(op, recovering=False):
+        started.set()   # the journal lock is held from here on
+        real_apply(op, recovering)
+    journal._apply_op = apply
+    recover_journal(directory)
+
+def _order_holding_the_store_lock(orders_path, products_path, started):
+    with get_product_store(products_path).lock():   # as _serialised does
+        assert started.wait(10)
+        assert add_order([{"product_id": 2, "qty": 1}], customer_id=1,
+                         orders_path=orders_path, products_path=products_path)
+
+
+def test_sqlite_order_commit_during_recovery_does_not_deadlock(tmp_path, products_path):
+    db = products_path
+    if db.suffix != ".db":
+        pytest.skip("only the SQLite backend applies journaled puts itself")
+    # a commit that died after writing its journal: product 1 renamed
+    renamed = {**get_product_store(db).get(1), "name": "Renamed"}
+    (tmp_path / f"{JOURNAL_PREFIX}.{'0' * 32}.json").write_text(
+        json.dumps({"ops": [{"op": "put_products", "path": str(db), "products": [renamed]}]}), encoding="utf-8")
+
+    started = ctx.Event()
+    placer = ctx.Process(target=_order_holding_the_store_lock, args=(tmp_path / "orders.json", db, started))
+    starter = ctx.Process(target=_recover_signalling, args=(tmp_path, started))
+    placer.start()
+    starter.start()
+    for p in (placer, starter):
+        p.join(20)
+    hung = [p for p in (placer, starter) if p.is_alive()]
+    for p in hung:
+        p.kill()
+    assert not hung and placer.exitcode == 0 and starter.exitcode == 0
+    file_cache.invalidate()
+    assert get_product_store(db).get(1)["name"] == "Renamed"
+    assert get_product_store(db).get(2)["product_stock"] == 999
+    assert len(get_order_store(tmp_path / "orders.json").load_all()) == 1
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from functions.customer_manager import import_customers, read_customers_jsonl, get_customer_by_email, load_customers
+
+
+def _row(n, **overrides):
+    row = {
+        "title": "Ms", "first_name": f"First{n}", "last_name": f"Last{n}", "email": f"c{n}@example.com",
+        "phone": "01234 567890", "mobile": "07700 900000",
+        "home_address": {"line1": f"{n} High St", "line2": "", "line3": "", "postcode": "AB1 2CD", "country": "UK"},
+        "delivery_address": None,
+        "payment_methods": [{"type": "credit_card", "card_number": "4111 1111 1111 1111",
+                             "exp_month": "12", "exp_year": "2030", "card_holder": f"First{n} Last{n}"}],
+        "preferred_payment_method": "credit_card",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def customers_path(tmp_path):
+    path = tmp_path / "customers.json"
+    path.write_text("[]", encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_badly_shaped_rows_are_rejected_without_aborting_the_import(customers_path, workers):
+    rows = [
+        _row(1),
+        _row(2, home_address="12 High St"),
+        _row(3, payment_methods={"type": "paypal"}),
+        _row(4, payment_methods=["paypal"]),
+        _row(5, payment_methods=[{"type": "credit_card", "card_number": "4111111111111111",
+                                  "exp_month": "²", "exp_year": "2030"}]),
+        "not an object",
+        _row(6, title=7, phone=1234567, home_address={"line1": 42, "postcode": None},
+             payment_methods=[{"type": "paypal", "paypal_email": None},
+                              {"type": "debit_card", "card_number": 4111111111111111,
+                               "exp_month": 1, "exp_year": 31, "card_holder": 99}]),
+    ]
+    report = import_customers(rows, path=customers_path, workers=workers, chunk_size=2)
+
+    assert report["rows"] == 7 and report["imported"] == 2
+    assert [r["row"] for r in report["rejected"]] == [2, 3, 4, 5, 6]
+    assert "address" in report["rejected"][0]["error"]
+
+    coerced = get_customer_by_email("c6@example.com", path=customers_path)
+    assert coerced["title"] == "7" and coerced["phone"] == "1234567"
+    assert coerced["home_address"]["line1"] == "42" and coerced["home_address"]["postcode"] == ""
+    paypal, card = coerced["payment_methods"]
+    assert paypal == {"type": "paypal", "paypal_email": "c6@example.com"}
+    assert card["last4"] == "1111" and card["exp_year"] == 2031 and card["card_holder"] == "99"
+
+
+def test_jsonl_import_reports_unparseable_lines(customers_path, tmp_path):
+    feed = tmp_path / "customers.jsonl"
+    feed.write_text("\n".join([json.dumps(_row(1)), "{not json", "", json.dumps(_row(2))]), encoding="utf-8")
+    report = import_customers(read_customers_jsonl(feed), path=customers_path, workers=1)
+    assert report["imported"] == 2 and [r["row"] for r in report["rejected"]] == [2]
+    assert [c["email"] for c in load_customers(customers_path)] == ["c1@example.com", "c2@example.com"]
@@ -0,0 +1,152 @@
+import random
+
+import pytest
+
+from functions import customer_index
+from functions.cache import file_cache
+from functions.customer_index import CustomerIndex, load_customer_index, rebuild_customer_index, customer_index_path_for
+from functions.customer_manager import (add_customer, import_customers, save_customers, load_customers,
+                                        list_customers_sorted, customer_page, customers_after, seek_customer_name,
+                                        get_customer_by_email, get_customers_by_postcode)
+from functions.customer_store import get_customer_store, ShardedCustomerStore
+from functions.sidecar import delta_path_for
+
+LAST_NAMES = ["Smith", "smith", "Jones", "Ávila", "O'Brien", "Zhang"]
+POSTCODES = ["SW1A 1AA", "sw1a 2bb", "SW2 9ZZ", "M1 1AE", "EC1A 1BB"]
+
+
+def _row(rnd, n):
+    postcode = rnd.choice(POSTCODES)
+    address = {"line1": f"{n} High St", "line2": "", "line3": "", "postcode": postcode, "country": "UK"}
+    return {
+        "title": "Ms", "first_name": rnd.choice(["Ann", "ann", "Bea", "Cy"]), "last_name": rnd.choice(LAST_NAMES),
+        "email": f"Customer{n}@Example.com", "phone": "01234 567890", "mobile": "07700 900000",
+        "home_address": address, "delivery_address": dict(address),
+        "payment_methods": [{"type": "paypal", "paypal_email": f"c{n}@example.com"}],
+        "preferred_payment_method": "paypal",
+    }
+
+
+@pytest.fixture(params=["json", "shards"])
+def customers_path(request, tmp_path):
+    if request.param == "json":
+        path = tmp_path / "customers.json"
+        path.write_text("[]", encoding="utf-8")
+    else:
+        path = tmp_path / "customers.shards"
+        ShardedCustomerStore(path).save_all([], shard_size=7)
+    return path
+
+
+def _populate(path, seed=5, steps=12):
+    """add_customer and import_customers in random turns; returns (rnd, rows used) to carry on from."""
+    rnd = random.Random(seed)
+    n = 0
+    for _ in range(steps):
+        if rnd.random() < 0.5:
+            n += 1
+            assert add_customer(**_row(rnd, n), path=path) is not None
+        else:
+            rows = [_row(rnd, n + i) for i in range(1, rnd.randint(2, 6))]
+            n += len(rows)
+            assert import_customers(rows, path=path, workers=1)["imported"] == len(rows)
+    return rnd, n
+
+
+def test_maintained_index_matches_a_fresh_rebuild(customers_path):
+    _populate(customers_path)
+    maintained = load_customer_index(customers_path)
+    fresh = CustomerIndex.build(get_customer_store(customers_path).records())
+    assert maintained.to_dict() == fresh.to_dict()
+    assert maintained.postcodes == fresh.postcodes
+    # and from disk in a new process
+    file_cache.invalidate()
+    assert load_customer_index(customers_path).to_dict() == fresh.to_dict()
+
+
+def test_adds_append_to_the_delta_log_and_a_new_process_replays_it(customers_path, monkeypatch):
+    rnd, n = _populate(customers_path, steps=4)
+    snapshot = customer_index_path_for(customers_path)
+    before = snapshot.read_bytes()
+    logged = len(delta_path_for(snapshot).read_text(encoding="utf-8").splitlines())
+    for i in range(1, 4):
+        assert add_customer(**_row(rnd, n + i), path=customers_path) is not None
+    assert snapshot.read_bytes() == before
+    assert len(delta_path_for(snapshot).read_text(encoding="utf-8").splitlines()) == logged + 3
+
+    maintained = load_customer_index(customers_path).to_dict()
+    file_cache.invalidate()
+    monkeypatch.setattr(customer_index, "rebuild_customer_index", lambda p: pytest.fail("rebuilt"))
+    assert load_customer_index(customers_path).to_dict() == maintained
+
+
+def test_a_write_that_skips_the_index_triggers_a_rebuild(customers_path):
+    _populate(customers_path)
+    customers = load_customers(customers_path)
+    customers[0]["email"] = "Renamed@Example.com"
+    save_customers(customers, customers_path)   # the index is not updated
+    file_cache.invalidate()
+    assert load_customer_index(customers_path).to_dict() == CustomerIndex.build(customers).to_dict()
+    assert get_customer_by_email("renamed@example.COM", customers_path)["customer_id"] == customers[0]["customer_id"]
+
+
+def test_lookups_agree_with_scanning_the_customers(customers_path):
+    _populate(customers_path)
+    customers = load_customers(customers_path)
+    for customer in customers:
+        assert get_customer_by_email(customer["email"].upper(), customers_path) == customer
+    for postcode in POSTCODES:
+        key = postcode.replace(" ", "").upper()
+        expected = [c for c in customers if c["delivery_address"]["postcode"].replace(" ", "").upper() == key]
+        assert get_customers_by_postcode(postcode.lower(), path=customers_path) == expected
+    expected = [c for c in customers if c["delivery_address"]["postcode"].upper().startswith("SW1A")]
+    assert get_customers_by_postcode("sw1a", area=True, path=customers_path) == expected
+
+
+def test_name_order_pages_and_cursors(customers_path):
+    _populate(customers_path)
+    customers = load_customers(customers_path)
+    expected = sorted(customers, key=lambda c: (c["last_name"].casefold(), c["first_name"].casefold(), c["customer_id"]))
+    assert list_customers_sorted(customers_path) == expected
+
+    page, total = customer_page(3, 4, path=customers_path)
+    assert page == expected[3:7] and total == len(expected)
+    position = seek_customer_name("smith", customers_path)
+    assert all(c["last_name"].casefold() < "smith" for c in expected[:position])
+    assert all(c["last_name"].casefold() >= "smith" for c in expected[position:])
+
+    walked, cursor = [], None
+    while True:
+        page, cursor = customers_after(cursor, 5, path=customers_path)
+        walked.extend(page)
+        if cursor is None:
+            break
+    assert walked == expected
+    assert customers_after(10 ** 6, 5, path=customers_path) == ([], None)
+
+
+def test_cursor_stays_valid_while_customers_are_added(customers_path):
+    rnd, n = _populate(customers_path)
+    first, cursor = customers_after(None, 4, path=customers_path)
+    for i in range(1, 6):
+        assert add_customer(**_row(rnd, n + i), path=customers_path) is not None
+    rest, cursor = customers_after(cursor, 10 ** 6, path=customers_path)
+    assert cursor is None
+    expected = list_customers_sorted(customers_path)
+    assert rest == expected[expected.index(first[-1]) + 1:]
+    maintained = load_customer_index(customers_path).to_dict()
+    assert rebuild_customer_index(customers_path).to_dict() == maintained
+
+
+def test_a_rebuild_that_misses_a_concurrent_write_is_not_trusted(customers_path, monkeypatch):
+    rnd, n = _populate(customers_path, steps=4)
+    real_build = CustomerIndex.build
+    def build_then_write(customers):
+        index = real_build(customers)
+        # another writer lands after the records were read (save_customers takes no lock)
+        get_customer_store(customers_path).append([{"customer_id": 10 ** 5, "email": "late@example.com"}])
+        return index
+    monkeypatch.setattr(CustomerIndex, "build", staticmethod(build_then_write))
+    rebuild_customer_index(customers_path)
+    monkeypatch.setattr(CustomerIndex, "build", real_build)
+    assert load_customer_index(customers_path).customer_id_for_email("late@example.com") == 10 ** 5
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from functions.cache import file_cache
+from functions.customer_store import (get_customer_store, migrate_customers, ShardedCustomerStore, JsonCustomerStore,
+                                      MANIFEST_NAME)
+
+
+def _customers(ids):
+    return [{"customer_id": cid, "first_name": f"F{cid}", "last_name": f"L{cid}", "email": f"c{cid}@example.com"}
+            for cid in ids]
+
+
+def _manifest(path):
+    return json.loads((path / MANIFEST_NAME).read_text(encoding="utf-8"))
+
+
+def test_customers_are_partitioned_by_id_range_and_listed_in_the_manifest(tmp_path):
+    store = get_customer_store(tmp_path / "customers.shards")
+    assert isinstance(store, ShardedCustomerStore)
+    store.save_all(_customers(range(1, 26)) + [{"first_name": "No id"}], shard_size=10)
+
+    manifest = _manifest(store.path)
+    assert manifest["shard_size"] == 10
+    assert manifest["shards"] == [
+        {"file": "000000.json", "first_id": 1, "count": 11},   # records without an id live in the first shard
+        {"file": "000001.json", "first_id": 11, "count": 10},
+        {"file": "000002.json", "first_id": 21, "count": 5},
+    ]
+    for shard in manifest["shards"]:
+        records = json.loads((store.path / shard["file"]).read_text(encoding="utf-8"))
+        ids = [c["customer_id"] for c in records if "customer_id" in c]
+        assert all(shard["first_id"] <= cid < shard["first_id"] + 10 for cid in ids)
+    assert store.count() == 26
+    assert [c.get("customer_id") for c in store.load_all()] == list(range(1, 11)) + [None] + list(range(11, 26))
+
+
+def test_point_reads_and_appends_touch_only_their_shards(tmp_path):
+    store = get_customer_store(tmp_path / "customers.shards")
+    store.save_all(_customers(range(1, 31)), shard_size=10)
+    first_shard = (store.path / "000000.json").read_bytes()
+
+    file_cache.invalidate()
+    assert store.get(15)["email"] == "c15@example.com"
+    assert store.get(999) is None
+    assert [file_cache.peek(p) is not None for p in store.shard_paths()] == [False, True, False]
+
+    store.append(_customers([31, 32]))
+    assert (store.path / "000000.json").read_bytes() == first_shard
+    assert [s["count"] for s in _manifest(store.path)["shards"]] == [10, 10, 10, 2]
+    assert sorted(store.get_many([2, 31, 32])) == [2, 31, 32]
+
+
+def test_resharding_removes_shards_no_longer_listed(tmp_path):
+    store = get_customer_store(tmp_path / "customers.shards")
+    store.save_all(_customers(range(1, 31)), shard_size=10)
+    store.save_all(store.load_all(), shard_size=20)
+    assert sorted(p.name for p in store.path.glob("0*.json")) == ["000000.json", "000001.json"]
+    assert [s["count"] for s in _manifest(store.path)["shards"]] == [20, 10]
+    assert [c["customer_id"] for c in store.load_all()] == list(range(1, 31))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_migration_round_trips_between_layouts(tmp_path, workers):
+    source = tmp_path / "customers.json"
+    JsonCustomerStore(source).save_all(_customers(range(1, 42)))
+    assert migrate_customers(source, tmp_path / "customers.shards", shard_size=8) == 41
+    file_cache.invalidate()
+    sharded = get_customer_store(tmp_path / "customers.shards")
+    assert len(sharded.shard_paths()) == 6
+    assert sharded.load_all(workers=workers) == _customers(range(1, 42))
+    assert migrate_customers(tmp_path / "customers.shards", tmp_path / "back.json") == 41
+    assert get_customer_store(tmp_path / "back.json").load_all() == _customers(range(1, 42))
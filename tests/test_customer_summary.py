@@ -0,0 +1,49 @@
+import pytest
+
+from functions.cache import file_cache
+from functions import customer_summary
+from functions.customer_summary import load_customer_summaries, rebuild_customer_summaries, summary_path_for
+from functions.order_manager import add_order
+from functions.order_store import compact_orders
+from functions.sidecar import delta_path_for
+
+
+@pytest.fixture(params=["orders.json", "orders.jsonl"])
+def orders_path(request, tmp_path):
+    return tmp_path / request.param
+
+
+def _fresh(orders_path):
+    file_cache.invalidate()
+    summary_path_for(orders_path).unlink()
+    return rebuild_customer_summaries(orders_path)
+
+
+def test_maintained_summaries_match_a_fresh_rebuild(orders_path, products_path, churn):
+    churn(orders_path, products_path, seed=21)
+    maintained = load_customer_summaries(orders_path).to_dict()
+    assert maintained == _fresh(orders_path).to_dict()
+
+
+def test_writes_append_to_the_delta_log_and_a_new_process_replays_it(orders_path, products_path, churn, monkeypatch):
+    churn(orders_path, products_path, seed=8, steps=10)
+    snapshot = summary_path_for(orders_path)
+    before = snapshot.read_bytes()
+    churn(orders_path, products_path, seed=9, steps=15)
+    assert snapshot.read_bytes() == before and delta_path_for(snapshot).exists()
+
+    maintained = load_customer_summaries(orders_path).to_dict()
+    file_cache.invalidate()
+    monkeypatch.setattr(customer_summary, "rebuild_customer_summaries", lambda p: pytest.fail("rebuilt"))
+    assert load_customer_summaries(orders_path).to_dict() == maintained
+
+
+def test_summaries_are_shared_and_survive_compaction(tmp_path, products_path, churn):
+    orders_path = tmp_path / "orders.jsonl"
+    churn(orders_path, products_path, seed=2, steps=25)
+    summaries = load_customer_summaries(orders_path)
+    add_order([{"product_id": 1, "qty": 1}], customer_id=1, orders_path=orders_path, products_path=products_path)
+    assert load_customer_summaries(orders_path) is summaries
+    compact_orders(orders_path)
+    assert not delta_path_for(summary_path_for(orders_path)).exists()
+    assert load_customer_summaries(orders_path).to_dict() == _fresh(orders_path).to_dict()
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from functions import journal
+from functions.journal import Transaction, recover_journal, atomic_write_json, JOURNAL_PREFIX
+
+
+def _read(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def _journals(directory):
+    return list(directory.glob(f"{JOURNAL_PREFIX}*.json"))
+
+def _tmp_files(directory):
+    return list(directory.glob(f"*{journal.TMP_SUFFIX}"))
+
+
+def test_commit_replaces_every_staged_file_and_removes_its_journal(tmp_path):
+    a, b = tmp_path / "a.json", tmp_path / "b.json"
+    atomic_write_json(a, [1])
+    txn = Transaction(tmp_path)
+    txn.write_json(a, [2])
+    txn.write_json(b, {"x": 1})
+    txn.write_json(a, [3])   # supersedes the first write to a
+    txn.commit()
+    assert _read(a) == [3] and _read(b) == {"x": 1}
+    assert not _journals(tmp_path) and not _tmp_files(tmp_path)
+
+
+def test_recovery_during_a_staged_commit_leaves_it_intact(tmp_path):
+    target = tmp_path / "orders.json"
+    atomic_write_json(target, ["old"])
+    txn = Transaction(tmp_path)
+    txn.write_json(target, ["new"])
+    assert recover_journal(tmp_path) is False   # another process starting up
+    txn.commit()
+    assert _read(target) == ["new"]
+
+
+def test_each_transaction_has_its_own_journal(tmp_path):
+    first, second = Transaction(tmp_path), Transaction(tmp_path)
+    assert first.journal_path != second.journal_path
+    first.write_json(tmp_path / "a.json", [1])
+    second.write_json(tmp_path / "b.json", [2])
+    second.commit()
+    first.commit()
+    assert _read(tmp_path / "a.json") == [1] and _read(tmp_path / "b.json") == [2]
+
+
+def test_interrupted_commit_is_rolled_forward(tmp_path, monkeypatch):
+    a, b = tmp_path / "a.json", tmp_path / "b.json"
+    atomic_write_json(a, ["a0"])
+    atomic_write_json(b, ["b0"])
+    txn = Transaction(tmp_path)
+    txn.write_json(a, ["a1"])
+    txn.write_json(b, ["b1"])
+
+    applied = []
+    real_apply = journal._apply_op
+    def crash_after_first(op, recovering=False):
+        if applied:
+            raise SystemExit("power cut")
+        applied.append(op)
+        real_apply(op, recovering)
+    monkeypatch.setattr(journal, "_apply_op", crash_after_first)
+    with pytest.raises(SystemExit):
+        txn.commit()
+    monkeypatch.setattr(journal, "_apply_op", real_apply)
+
+    assert _read(a) == ["a1"] and _read(b) == ["b0"]   # half applied
+    assert recover_journal(tmp_path) is True
+    assert _read(a) == ["a1"] and _read(b) == ["b1"]
+    assert not _journals(tmp_path) and not _tmp_files(tmp_path)
+    assert recover_journal(tmp_path) is False
+
+
+def test_commit_that_never_wrote_its_journal_changes_nothing(tmp_path):
+    target = tmp_path / "a.json"
+    atomic_write_json(target, ["old"])
+    txn = Transaction(tmp_path)
+    txn.write_json(target, ["new"])
+    # the process dies here: no journal, only a staged temp file
+    assert recover_journal(tmp_path) is False
+    assert _read(target) == ["old"]
+
+
+def test_live_commit_with_a_missing_staged_file_raises_and_saves_nothing(tmp_path):
+    a, b = tmp_path / "a.json", tmp_path / "b.json"
+    atomic_write_json(a, ["a0"])
+    atomic_write_json(b, ["b0"])
+    txn = Transaction(tmp_path)
+    txn.write_json(a, ["a1"])
+    txn.write_json(b, ["b1"])
+    staged_b = next(op["tmp"] for op in txn.ops if op["path"] == str(b))
+    (tmp_path / staged_b).unlink()   # e.g. removed by an over-eager cleanup
+    with pytest.raises(FileNotFoundError):
+        txn.commit()
+    assert _read(a) == ["a0"] and _read(b) == ["b0"]
+    assert not _journals(tmp_path) and not _tmp_files(tmp_path)
+
+
+def test_append_ops_are_replayed_by_recovery(tmp_path):
+    log = tmp_path / "orders.jsonl"
+    (tmp_path / f"{JOURNAL_PREFIX}.{'0' * 32}.json").write_text(
+        json.dumps({"ops": [{"op": "append", "path": str(log), "lines": ['{"op": "del", "order_id": 1}']}]}),
+        encoding="utf-8")
+    assert recover_journal(tmp_path) is True
+    assert log.read_text(encoding="utf-8").splitlines() == ['{"op": "del", "order_id": 1}']
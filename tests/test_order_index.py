@@ -0,0 +1,136 @@
+import pytest
+
+from functions import order_index, order_stream, sidecar
+from functions.cache import file_cache
+from functions.order_index import OrderIndex, load_order_index, rebuild_order_index, index_path_for
+from functions.customer_manager import get_customer_orders
+from functions.order_manager import (add_order, list_orders_for_customer, get_orders_for_product,
+                                     list_orders_created_between)
+from functions.order_store import compact_orders
+from functions.sidecar import delta_path_for
+
+
+def _normalised(index):
+    d = index.to_dict()
+    for field in ("by_customer", "by_product"):
+        d[field] = {k: sorted(v) for k, v in d[field].items()}
+    return d
+
+def _fresh(orders_path):
+    """What a rebuild from the orders file alone gives."""
+    file_cache.invalidate()
+    index_path_for(orders_path).unlink()
+    return rebuild_order_index(orders_path)
+
+
+@pytest.fixture(params=["orders.json", "orders.jsonl"])
+def orders_path(request, tmp_path):
+    return tmp_path / request.param
+
+
+def test_maintained_index_matches_a_fresh_rebuild(orders_path, products_path, churn):
+    live = churn(orders_path, products_path)
+    maintained = _normalised(load_order_index(orders_path))
+    fresh = _fresh(orders_path)
+    assert maintained == _normalised(fresh)
+    assert sorted(fresh.positions) == sorted(live)
+    if orders_path.suffix == ".jsonl":
+        assert sorted(fresh.offsets) == sorted(live)
+
+
+def test_index_survives_compaction(tmp_path, products_path, churn):
+    orders_path = tmp_path / "orders.jsonl"
+    churn(orders_path, products_path, seed=9)
+    assert compact_orders(orders_path) is not None
+    maintained = _normalised(load_order_index(orders_path))
+    assert maintained == _normalised(_fresh(orders_path))
+
+
+def test_the_parsed_index_is_shared_until_the_orders_change(orders_path, products_path):
+    add_order([{"product_id": 1, "qty": 1}], customer_id=1, orders_path=orders_path, products_path=products_path)
+    first = load_order_index(orders_path)
+    assert load_order_index(orders_path) is first
+    add_order([{"product_id": 2, "qty": 1}], customer_id=1, orders_path=orders_path, products_path=products_path)
+    # the writer updated and re-shared it rather than leaving it to be re-read
+    assert load_order_index(orders_path) is first and len(first.positions) == 2
+
+
+def test_log_lookups_read_only_the_indexed_records(tmp_path, products_path, monkeypatch, churn):
+    orders_path = tmp_path / "orders.jsonl"
+    churn(orders_path, products_path, seed=5)
+    expected = {cid: list_orders_for_customer(cid, orders_path=orders_path) for cid in range(1, 7)}
+    by_product = get_orders_for_product(3, orders_path=orders_path)
+    between = list_orders_created_between("2023-01-01", "2023-12-31", orders_path=orders_path)
+
+    file_cache.invalidate(orders_path)   # as after another process's append
+    def no_scans(*args, **kwargs):
+        raise AssertionError("the whole log was scanned")
+    monkeypatch.setattr(order_index, "iter_orders", no_scans)
+    for cid, orders in expected.items():
+        assert list_orders_for_customer(cid, orders_path=orders_path) == orders
+        assert get_customer_orders(cid, orders_path=orders_path) == orders
+    assert get_orders_for_product(3, orders_path=orders_path) == by_product
+    assert list_orders_created_between("2023-01-01", "2023-12-31", orders_path=orders_path) == between
+
+
+def test_stale_offsets_fall_back_to_a_scan(tmp_path):
+    orders_path = tmp_path / "orders.jsonl"
+    orders_path.write_text('{"op": "put", "order": {"order_id": 1, "customer_id": 4}}\n', encoding="utf-8")
+    index = OrderIndex.build(order_stream.iter_orders(orders_path))
+    index.offsets = {1: 5}   # not the start of that order's record
+    assert order_index.orders_at(orders_path, [1], index) == [{"order_id": 1, "customer_id": 4}]
+
+
+def _place(orders_path, products_path, n, customer_id=1):
+    for _ in range(n):
+        add_order([{"product_id": 1, "qty": 1}], customer_id=customer_id, orders_path=orders_path, products_path=products_path)
+
+
+def test_writes_append_to_the_delta_log_instead_of_rewriting_the_index(orders_path, products_path):
+    _place(orders_path, products_path, 1)
+    snapshot = index_path_for(orders_path)
+    before = snapshot.read_bytes()
+    logged = len(delta_path_for(snapshot).read_text(encoding="utf-8").splitlines())
+    _place(orders_path, products_path, 3)
+    assert snapshot.read_bytes() == before
+    assert len(delta_path_for(snapshot).read_text(encoding="utf-8").splitlines()) == logged + 3
+
+
+def test_a_new_process_replays_the_delta_log_without_rebuilding(orders_path, products_path, monkeypatch, churn):
+    churn(orders_path, products_path, seed=12, steps=30)
+    maintained = _normalised(load_order_index(orders_path))
+    file_cache.invalidate()
+    monkeypatch.setattr(order_index, "rebuild_order_index", lambda p: pytest.fail("rebuilt"))
+    assert _normalised(load_order_index(orders_path)) == maintained
+
+
+def test_an_unrecorded_write_or_torn_delta_forces_a_rebuild(tmp_path, products_path):
+    orders_path = tmp_path / "orders.jsonl"
+    _place(orders_path, products_path, 3)
+    delta = delta_path_for(index_path_for(orders_path))
+    with delta.open("ab") as f:
+        f.write(b'{"from": [1, 2')   # a save cut off mid-line
+    file_cache.invalidate()
+    assert len(load_order_index(orders_path).positions) == 3
+
+    with orders_path.open("a", encoding="utf-8") as f:   # written without updating the index
+        f.write('{"op": "put", "order": {"order_id": 99, "customer_id": 5}}\n')
+    file_cache.invalidate()
+    assert load_order_index(orders_path).orders_for_customer(5) == [99]
+
+
+def test_the_delta_log_is_folded_into_a_new_snapshot(orders_path, products_path, monkeypatch):
+    monkeypatch.setattr(sidecar, "FOLD_MIN_BYTES", 2000)
+    _place(orders_path, products_path, 20)
+    snapshot = index_path_for(orders_path)
+    delta = delta_path_for(snapshot)
+    assert not delta.exists() or delta.stat().st_size <= max(2000, snapshot.stat().st_size // 2)
+    file_cache.invalidate()
+    assert len(load_order_index(orders_path).positions) == 20
+
+
+def test_compaction_folds_the_delta_log(tmp_path, products_path, churn):
+    orders_path = tmp_path / "orders.jsonl"
+    churn(orders_path, products_path, seed=4, steps=20)
+    compact_orders(orders_path)
+    assert not delta_path_for(index_path_for(orders_path)).exists()
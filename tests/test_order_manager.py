@@ -0,0 +1,34 @@
+import pytest
+
+from functions.order_manager import add_orders_bulk, list_orders_for_customer
+
+
+@pytest.fixture
+def shop(tmp_path, products_path):
+    orders = tmp_path / "orders.json"
+    orders.write_text("[]", encoding="utf-8")
+    return orders, products_path
+
+
+def test_bulk_import_rejects_created_at_that_is_not_an_iso_timestamp(shop):
+    orders, products = shop
+    report = add_orders_bulk([
+        {"customer_id": 7, "items": [{"product_id": 1, "qty": 1}], "created_at": "2024-03-01T10:00:00Z"},
+        {"customer_id": 7, "items": [{"product_id": 2, "qty": 1}], "created_at": 1709287200},
+        {"customer_id": 7, "items": [{"product_id": 2, "qty": 1}], "created_at": "yesterday"},
+        {"customer_id": 7, "items": [{"product_id": 1, "qty": 2}], "created_at": "2024-03-02T09:30:00"},
+    ], orders_path=orders, products_path=products)
+
+    assert report["committed"]
+    assert [r["entry"] for r in report["rejected"]] == [2, 3]
+    assert all("created_at" in r["reason"] for r in report["rejected"])
+    history = list_orders_for_customer(7, orders_path=orders)
+    assert [o["created_at"] for o in history] == ["2024-03-02T09:30:00", "2024-03-01T10:00:00Z"]
+
+
+def test_bulk_import_stamps_entries_without_created_at(shop):
+    orders, products = shop
+    report = add_orders_bulk([{"customer_id": 3, "items": [{"product_id": 1, "qty": 1}]}],
+                             orders_path=orders, products_path=products)
+    assert isinstance(report["accepted"][0]["created_at"], str)
+    assert report["accepted"][0]["created_at"].endswith("Z")
@@ -0,0 +1,65 @@
+from functions.cache import file_cache
+from functions.order_store import get_order_store, compact_orders, migrate_orders, JsonOrderStore, OrderLogStore
+from functions.journal import Transaction
+
+
+def _orders(n, customer_id=1):
+    return [{"order_id": i, "customer_id": customer_id, "created_at": f"2024-01-{i:02d}T00:00:00Z",
+             "items": [{"product_id": 1, "qty": i}], "order_total": float(i)} for i in range(1, n + 1)]
+
+
+def _stage(store, tmp_path, **changes):
+    txn = Transaction(tmp_path)
+    store.stage_changes(txn, **changes)
+    txn.commit()
+
+
+def test_layout_follows_the_suffix(tmp_path):
+    assert isinstance(get_order_store(tmp_path / "orders.json"), JsonOrderStore)
+    assert isinstance(get_order_store(tmp_path / "orders.jsonl"), OrderLogStore)
+
+
+def test_both_layouts_apply_the_same_changes(tmp_path):
+    results = {}
+    for name in ("orders.json", "orders.jsonl"):
+        store = get_order_store(tmp_path / name)
+        store.save_all(_orders(4))
+        edited = dict(_orders(4)[1], order_total=99.0)
+        _stage(store, tmp_path, put=[edited, _orders(5)[4]], delete=[3])
+        results[name] = {o["order_id"]: o for o in store.load_all()}
+    assert results["orders.json"] == results["orders.jsonl"]
+    assert sorted(results["orders.json"]) == [1, 2, 4, 5] and results["orders.json"][2]["order_total"] == 99.0
+    # an edit keeps its place in the array but moves to the end of the log
+    file_cache.invalidate()
+    assert [o["order_id"] for o in get_order_store(tmp_path / "orders.json").load_all()] == [1, 2, 4, 5]
+    assert [o["order_id"] for o in get_order_store(tmp_path / "orders.jsonl").load_all()] == [1, 4, 2, 5]
+
+
+def test_compaction_keeps_the_live_orders_and_drops_the_rest(tmp_path):
+    store = get_order_store(tmp_path / "orders.jsonl")
+    store.save_all(_orders(6))
+    _stage(store, tmp_path, put=[dict(_orders(6)[0], order_total=7.5)], delete=[2, 4])
+    live = store.load_all()
+    assert store.garbage() == (9, 4)
+
+    assert compact_orders(store.path, min_garbage=10) is None   # below the threshold
+    assert compact_orders(store.path, min_ratio=0.6) is None
+    assert compact_orders(store.path, min_garbage=5) == (9, 4)
+    file_cache.invalidate()
+    assert store.load_all() == live and store.garbage() == (4, 4)
+    assert compact_orders(store.path) is None   # nothing left to reclaim
+
+
+def test_compacting_a_json_array_or_missing_log_does_nothing(tmp_path):
+    JsonOrderStore(tmp_path / "orders.json").save_all(_orders(2))
+    assert compact_orders(tmp_path / "orders.json") is None
+    assert compact_orders(tmp_path / "missing.jsonl") is None
+
+
+def test_migration_round_trips_between_layouts(tmp_path):
+    source = tmp_path / "orders.json"
+    JsonOrderStore(source).save_all(_orders(5, customer_id=3))
+    assert migrate_orders(source, tmp_path / "orders.jsonl") == 5
+    assert migrate_orders(tmp_path / "orders.jsonl", tmp_path / "copy.json") == 5
+    file_cache.invalidate()
+    assert get_order_store(tmp_path / "copy.json").load_all() == _orders(5, customer_id=3)
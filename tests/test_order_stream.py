@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from functions.order_stream import (iter_json_array, iter_log_records, iter_order_log, iter_order_log_entries,
+                                    log_put_offsets, read_orders_at, replay_order_log)
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_numbers_split_across_chunks_are_read_whole(tmp_path, chunk_size):
+    path = _write(tmp_path / "a.json", "[12345, 678, -9.25e3, 0]")
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == [12345, 678, -9250.0, 0]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 8, 13, 64, 1 << 16])
+def test_every_chunk_size_yields_the_same_elements(tmp_path, chunk_size):
+    orders = [
+        {"order_id": i, "customer_id": 100 + i, "created_at": f"2024-01-{i:02d}T00:00:00Z",
+         "items": [{"product_id": i, "qty": i, "name": "café \"quoted\" [x]"}], "order_total": i * 1.5}
+        for i in range(1, 20)
+    ]
+    values = [True, False, None, "end", 3.0, [1, [2]], {}]
+    path = _write(tmp_path / "orders.json", json.dumps(orders + values, indent=2))
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == orders + values
+
+
+@pytest.mark.parametrize("text", ["", "   ", "{}", "[", "[1, 2, {\"a\": "])
+def test_missing_empty_or_truncated_files_end_quietly(tmp_path, text):
+    path = _write(tmp_path / "orders.json", text)
+    expected = [1, 2] if text.startswith("[1") else []
+    assert list(iter_json_array(path, chunk_size=3)) == expected
+    assert list(iter_json_array(tmp_path / "missing.json")) == []
+
+
+def _log(path, records, torn=""):
+    path.write_bytes(("".join(json.dumps(r) + "\n" for r in records) + torn).encode("utf-8"))
+    return path
+
+
+def _put(oid, **fields):
+    return {"op": "put", "order": {"order_id": oid, **fields}}
+
+
+def test_log_replay_keeps_the_last_record_per_order(tmp_path):
+    path = _log(tmp_path / "orders.jsonl",
+                [_put(1, v=1), _put(2, v=1), _put(1, v=2), {"op": "del", "order_id": 2}, _put(3, v="é")],
+                torn='{"op": "put", "order": {"order_id": 4')
+    expected = [{"order_id": 1, "v": 2}, {"order_id": 3, "v": "é"}]
+    assert replay_order_log(path) == expected
+    assert list(iter_order_log(path)) == expected
+    assert [r["op"] for r in iter_log_records(path)] == ["put", "put", "put", "del", "put"]
+
+
+def test_log_offsets_point_at_each_orders_latest_put(tmp_path):
+    path = _log(tmp_path / "orders.jsonl", [_put(1, v=1), _put(2, v=1), _put(1, v="ü"), {"op": "del", "order_id": 2}])
+    entries = list(iter_order_log_entries(path))
+    assert [order for _, order in entries] == [{"order_id": 1, "v": "ü"}]
+    offsets = log_put_offsets(path)
+    assert offsets == {1: entries[0][0]}
+    assert read_orders_at(path, offsets) == [{"order_id": 1, "v": "ü"}]
+    assert read_orders_at(path, {2: offsets[1]}) is None   # wrong order at that offset
+
+    size = path.stat().st_size
+    with path.open("ab") as f:
+        f.write((json.dumps(_put(5)) + "\n").encode("utf-8"))
+    assert log_put_offsets(path, size) == {5: size}
@@ -0,0 +1,90 @@
+import builtins
+
+from functions.category_manager import Category, _save_categories
+from functions.product_categories import category_picker_page, seek_category_code, get_category_picker_with_codes
+from functions.product_manager import product_page, iter_product_pages, seek_product_name, sort_products
+from menus import menu_product
+from menus.menu_pager import browse
+
+
+def _no_input(prompt=""):
+    raise AssertionError(f"asked for input: {prompt!r}")
+
+
+def test_delete_menu_on_an_empty_catalog_returns_without_asking(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "product_catalog.json"
+    path.write_text("[]", encoding="utf-8")
+    monkeypatch.setattr(menu_product, "PRODUCTS_PATH", path)
+    monkeypatch.setattr(builtins, "input", _no_input)
+    menu_product.delete_product_menu()
+    assert "No products to delete." in capsys.readouterr().out
+
+
+# ---------- menus/menu_pager.browse ----------
+
+def _browse(monkeypatch, items, keys, **kwargs):
+    """Run browse over `items` answering its prompts with `keys`; returns (result, printed lines)."""
+    printed = []
+    answers = iter(keys)
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(answers))
+    monkeypatch.setattr(builtins, "print", lambda *a, **k: printed.append(" ".join(map(str, a))))
+    fetch = lambda start, size: (items[start:start + size], len(items))
+    result = browse(fetch, lambda n, item: f"{n}: {item}", **kwargs)
+    return result, printed
+
+def test_browse_an_empty_list(monkeypatch):
+    assert _browse(monkeypatch, [], [], choose=True) == (None, ["Nothing to show."])
+
+def test_browse_ends_on_a_partial_last_page(monkeypatch):
+    items = [f"item {i:02d}" for i in range(1, 46)]
+    _, printed = _browse(monkeypatch, items, ["n", "n", "n", ""], page_size=20)
+    footers = [line for line in printed if line.startswith("  --")]
+    assert [f.split(" of ")[0] for f in footers] == ["  -- 1-20", "  -- 21-40", "  -- 41-45", "  -- 41-45"]
+    assert "Last page." in printed and "45: item 45" in printed
+
+def test_browse_seek_past_the_end_shows_the_last_item(monkeypatch):
+    items = [f"item {i:02d}" for i in range(1, 46)]
+    seek = lambda text: sum(1 for item in items if item < text)
+    result, printed = _browse(monkeypatch, items, ["/zzz", "45"], page_size=20, seek=seek, choose=True)
+    assert result == "item 45"
+    assert [line for line in printed if line.startswith("  --")][-1].startswith("  -- 45-45 of 45")
+
+
+# ---------- product pages ----------
+
+def test_product_pages_at_the_edges(products_path, tmp_path):
+    names = [p["name"] for p in sort_products(by="name", products_path=products_path)]
+    page, total = product_page(6, 3, products_path=products_path)
+    assert [p["name"] for p in page] == names[6:] and total == 8
+    assert product_page(8, 3, products_path=products_path) == ([], 8)
+    assert product_page(-5, 2, products_path=products_path)[0] == product_page(0, 2, products_path=products_path)[0]
+    assert [len(p) for p in iter_product_pages(3, products_path=products_path)] == [3, 3, 2]
+
+    assert seek_product_name("PRODUCT 3", products_path) == names.index("Product 3")
+    assert seek_product_name("zzz", products_path) == 8
+    assert product_page(seek_product_name("zzz", products_path), 3, products_path=products_path) == ([], 8)
+
+    empty = tmp_path / "empty.json"
+    empty.write_text("[]", encoding="utf-8")
+    assert product_page(0, 3, products_path=empty) == ([], 0)
+    assert list(iter_product_pages(3, products_path=empty)) == []
+    assert seek_product_name("a", empty) == 0
+
+
+# ---------- category picker pages ----------
+
+def test_category_picker_pages_at_the_edges(tmp_path):
+    path = tmp_path / "category_catalog.json"
+    _save_categories([Category(1, "Clothing"), Category(2, "Shirts", 1), Category(3, "Linen", 2),
+                      Category(4, "Shoes"), Category(5, "Lost", 99)], False, path)
+    lines = get_category_picker_with_codes(path)
+    assert len(lines) == 4   # the orphan has no code and is not listed
+    assert category_picker_page(3, 10, categories_path=path) == (lines[3:], 4)
+    assert category_picker_page(4, 10, categories_path=path) == ([], 4)
+    assert category_picker_page(0, 0, categories_path=path) == ([], 4)
+    assert seek_category_code("10.1.1", path) == 2 and lines[2].strip().startswith("- [10.1.1] Linen")
+    assert seek_category_code("12", path) is None and seek_category_code("", path) is None
+
+    empty = tmp_path / "empty.json"
+    _save_categories([], False, empty)
+    assert category_picker_page(0, 10, categories_path=empty) == ([], 0)
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from functions.category_manager import Category, _save_categories, _descendant_ids
+from functions.product_categories import filter_products_by_category_id, category_product_counts
+from functions.product_manager import update_products, load_products
+from functions.product_store import get_product_store
+
+
+@pytest.fixture(params=["product_catalog.json", "product_catalog.db"])
+def shop(request, tmp_path):
+    rnd = random.Random(6)
+    categories = []
+    for cid in range(1, 31):
+        parent = rnd.choice([None] + [c.category_id for c in categories]) if categories else None
+        categories.append(Category(cid, f"Category {cid}", parent))
+    categories_path = tmp_path / "category_catalog.json"
+    _save_categories(categories, False, categories_path)
+    products_path = tmp_path / request.param
+    get_product_store(products_path).save_all([
+        {"product_id": pid, "name": f"Product {pid}", "category_id": rnd.choice([None, 999] + list(range(1, 31)))}
+        for pid in range(1, 201)
+    ])
+    return categories, categories_path, products_path, rnd
+
+
+def _check(categories, categories_path, products_path):
+    """Subtree filters and counts agree with walking parent links over every product."""
+    products = load_products(products_path)
+    for c in categories:
+        below = _descendant_ids(categories, c.category_id) | {c.category_id}
+        expected = sorted(p["product_id"] for p in products if p.get("category_id") in below)
+        found = filter_products_by_category_id(c.category_id, products_path=products_path,
+                                               categories_path=categories_path)
+        assert [p["product_id"] for p in found] == expected
+        direct = filter_products_by_category_id(c.category_id, include_descendants=False,
+                                                products_path=products_path, categories_path=categories_path)
+        assert [p["product_id"] for p in direct] == sorted(
+            p["product_id"] for p in products if p.get("category_id") == c.category_id)
+
+    counts = category_product_counts(products_path=products_path, categories_path=categories_path)
+    assigned = [p["category_id"] for p in products if p.get("category_id") is not None]
+    assert counts == {cid: assigned.count(cid) for cid in set(assigned)}
+    subtree = category_product_counts(include_descendants=True, products_path=products_path,
+                                      categories_path=categories_path)
+    assert subtree == {c.category_id: sum(assigned.count(d) for d in _descendant_ids(categories, c.category_id)
+                                          | {c.category_id}) for c in categories}
+
+
+def test_subtree_filters_and_counts_match_a_scan(shop):
+    categories, categories_path, products_path, _ = shop
+    _check(categories, categories_path, products_path)
+
+
+def test_after_moving_categories_and_recategorising_products(shop):
+    categories, categories_path, products_path, rnd = shop
+    _check(categories, categories_path, products_path)   # caches the layout for this version
+    for _ in range(5):
+        moving = rnd.choice(categories)
+        allowed = [c.category_id for c in categories
+                   if c.category_id not in _descendant_ids(categories, moving.category_id) | {moving.category_id}]
+        moving.parent_id = rnd.choice([None] + allowed)
+        _save_categories(categories, False, categories_path)
+        update_products([{**p, "category_id": rnd.randint(1, 30)} for p in rnd.sample(load_products(products_path), 10)],
+                        products_path)
+        _check(categories, categories_path, products_path)
+
+
+def test_unknown_categories_have_no_products(shop):
+    _, categories_path, products_path, _ = shop
+    assert filter_products_by_category_id(12345, products_path=products_path, categories_path=categories_path) == []
+    assert 12345 not in category_product_counts(include_descendants=True, products_path=products_path,
+                                                categories_path=categories_path)
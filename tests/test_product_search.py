@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from functions import product_search
+from functions.cache import file_cache
+from functions.product_manager import add_product, update_products, delete_product, get_product, search_products
+from functions.product_search import ProductSearchIndex, product_search_index, _tokens
+
+WORDS = ["blue", "Blueberry", "shirt", "SHORTS", "short", "sock", "Straße", "strap", "red", "redwood", "ab"]
+
+
+def _catalog(seed, n=300):
+    rnd = random.Random(seed)
+    return [{"product_id": pid, "name": " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 4))),
+             "sku": f"SKU-{pid:04d}" if pid % 3 else None} for pid in range(1, n + 1)]
+
+def _brute_force(products, query):
+    terms = _tokens(query)
+    found = set()
+    for p in products:
+        tokens = ProductSearchIndex([p]).entries[p["product_id"]][1]
+        if terms and all(any(t.startswith(term) for t in tokens) for term in terms):
+            found.add(p["product_id"])
+    return found
+
+def _shape(index):
+    return index.entries, {t: set(ids) for t, ids in index.postings.items()}, index.words
+
+
+@pytest.mark.parametrize("filter_below", [0, 256, 10 ** 6])
+@pytest.mark.parametrize("query", ["bl", "blue sh", "SH BLUE", "s s", "str", "strasse", "redw ab", "sku-00", "sku-0012",
+                                   "xyz", "blue xyz"])
+def test_every_word_must_prefix_a_token(monkeypatch, query, filter_below):
+    monkeypatch.setattr(product_search, "_FILTER_BELOW", filter_below)
+    products = _catalog(1)
+    index = ProductSearchIndex(products)
+    assert set(index.search(query, limit=10 ** 6)) == _brute_force(products, query)
+
+
+def test_case_folding_and_ranking():
+    index = ProductSearchIndex([
+        {"product_id": 1, "name": "Shirt, Blue"},
+        {"product_id": 2, "name": "BLUE SHIRTS for summer"},
+        {"product_id": 3, "name": "Blue shirt"},
+        {"product_id": 4, "name": "Große Straße map"},
+    ])
+    # the name starting with the phrase first, then whole-word hits, then shorter names
+    assert index.search("blue SHIRT") == [3, 2, 1]
+    assert index.search("blue shirt", limit=2) == [3, 2]
+    assert index.search("STRASSE") == [4] and index.search("grosse") == [4]
+
+
+@pytest.mark.parametrize("query", ["", "   ", "--", None])
+def test_an_empty_query_matches_nothing(query):
+    index = ProductSearchIndex(_catalog(2, 20))
+    assert index.search(query) == []
+    assert index.search("blue", limit=0) == []
+
+
+def test_product_writes_keep_the_cached_index_current(products_path, tmp_path):
+    assert search_products("product", products_path=products_path)   # builds and caches the index
+    cached = product_search_index(products_path)
+
+    added = add_product("Blue Linen Shirt", "12.50", "3", path=products_path)
+    update_products([{**get_product(2, products_path), "name": "Red Socks"}], path=products_path)
+    assert delete_product(3, products_path=products_path, orders_path=tmp_path / "orders.json")
+
+    assert product_search_index(products_path) is cached   # updated in place, not rebuilt
+    assert [p["product_id"] for p in search_products("blue sh", products_path=products_path)] == [added["product_id"]]
+    assert [p["product_id"] for p in search_products("red so", products_path=products_path)] == [2]
+    assert search_products("product 3", products_path=products_path) == []
+    file_cache.invalidate()
+    assert _shape(cached) == _shape(product_search_index(products_path))
@@ -0,0 +1,54 @@
+import json
+import random
+
+import pytest
+
+from functions import product_sort
+from functions.product_sort import ProductSortIndex, SORT_FIELDS
+from functions.product_manager import sort_products
+
+
+def _catalog(n=60, seed=7):
+    rnd = random.Random(seed)
+    return [
+        {"product_id": pid, "name": f"Item {rnd.randint(0, 20):02d}", "price": rnd.choice([1.5, 2.0, 9.99]),
+         "product_stock": rnd.randint(0, 10), "product_total_ordered": rnd.randint(0, 10)}
+        for pid in range(1, n + 1)
+    ]
+
+
+def _expected(products, field, reverse):
+    column = {"orders": "product_total_ordered", "stock": "product_stock"}[field]
+    return [p["product_id"] for p in sorted(products, key=lambda p: p[column], reverse=reverse)]
+
+
+@pytest.mark.parametrize("field", ["orders", "stock"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("k", [0, 1, 5, 17, 60, 100])
+def test_top_k_matches_a_full_stable_sort_on_the_maintained_fields(field, direction, k):
+    products = _catalog()
+    index = ProductSortIndex(products)
+    expected = _expected(products, field, direction == "desc")[:k]
+    assert [products[i]["product_id"] for i in index.top(field, direction, k)] == expected
+    assert [products[i]["product_id"] for i in index.order(field, direction)[:k]] == expected
+
+
+@pytest.mark.parametrize("field", ["orders", "stock"])
+def test_top_k_without_numpy(monkeypatch, field):
+    monkeypatch.setattr(product_sort, "np", None)
+    products = _catalog()
+    index = ProductSortIndex(products)
+    assert [products[i]["product_id"] for i in index.top(field, "desc", 10)] == _expected(products, field, True)[:10]
+
+
+def test_best_sellers_come_from_the_catalog_file(tmp_path):
+    products = _catalog(seed=11)
+    path = tmp_path / "product_catalog.json"
+    path.write_text(json.dumps(products), encoding="utf-8")
+    top = sort_products(by="orders", direction="desc", products_path=path, limit=5)
+    assert [p["product_id"] for p in top] == _expected(products, "orders", True)[:5]
+
+
+def test_products_without_the_maintained_fields_fall_back_to_the_older_names():
+    keys = dict(zip(SORT_FIELDS, product_sort._sort_keys({"product_id": 3, "stock": 4, "total_ordered": 9})))
+    assert keys["stock"] == 4 and keys["orders"] == 9
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from functions.cache import file_cache
+from functions.journal import Transaction, recover_journal, JOURNAL_PREFIX
+from functions.product_store import get_product_store, migrate_products, versions_match, SqliteProductStore
+
+
+def _product(pid, **fields):
+    return {"product_id": pid, "name": f"Product {pid}", "price": float(pid), "product_stock": 10,
+            "product_total_ordered": 0, "category_id": pid % 3 or None, "version": 1, **fields}
+
+
+@pytest.fixture(params=["product_catalog.json", "product_catalog.db"])
+def store(request, tmp_path):
+    store = get_product_store(tmp_path / request.param)
+    store.save_all([_product(pid) for pid in range(1, 7)])
+    return store
+
+
+def test_point_reads_and_writes(store):
+    assert isinstance(store, SqliteProductStore) == (store.path.suffix == ".db")
+    assert store.get(3) == _product(3) and store.get(99) is None
+    assert set(store.get_many([1, 2, 99])) == {1, 2}
+    store.put_many([_product(2, name="Changed"), _product(7)])
+    assert store.get(2)["name"] == "Changed" and store.max_id() == 7
+    assert [p["product_id"] for p in store.get_in_order([7, 2, 5, 99])] == [2, 5, 7]
+    assert store.delete(5)["product_id"] == 5 and store.delete(5) is None
+    assert [p["product_id"] for p in store.load_all()] == [1, 2, 3, 4, 6, 7]
+
+
+def test_category_lookups(store):
+    assert store.ids_by_category() == {1: [1, 4], 2: [2, 5]}
+    assert store.product_ids_in_categories([2, 1, 8]) == [1, 2, 4, 5]
+    assert store.category_counts() == {1: 2, 2: 2}
+    store.put_many([_product(4, category_id=2)])
+    assert store.category_counts() == {1: 1, 2: 3}
+
+
+def test_a_stale_writer_cannot_roll_back_stock(store):
+    stale = store.load_all()
+    store.put_many([_product(1, product_stock=4, product_total_ordered=6, version=2)])
+    stale[0]["name"] = "Edited from an old copy"
+    store.save_all(stale)
+    current = store.get(1)
+    assert current["name"] == "Edited from an old copy"
+    assert (current["product_stock"], current["product_total_ordered"], current["version"]) == (4, 6, 2)
+
+
+def test_staged_puts_apply_on_commit_and_versions_are_compared(store, tmp_path):
+    assert versions_match(store, {1: 1, 2: 1})
+    txn = Transaction(tmp_path)
+    store.stage_put_many(txn, [_product(1, product_stock=9, version=2)])
+    assert store.get(1)["product_stock"] == 10   # not yet
+    txn.commit()
+    assert store.get(1)["product_stock"] == 9
+    assert not versions_match(store, {1: 1, 2: 1}) and versions_match(store, {1: 2, 2: 1})
+
+
+def test_an_interrupted_sqlite_put_is_rolled_forward(tmp_path):
+    store = get_product_store(tmp_path / "product_catalog.db")
+    store.save_all([_product(1), _product(2)])
+    (tmp_path / f"{JOURNAL_PREFIX}.{'0' * 32}.json").write_text(json.dumps({"ops": [
+        {"op": "put_products", "path": str(store.path), "products": [_product(2, product_stock=3, version=2)]},
+    ]}), encoding="utf-8")
+    assert recover_journal(tmp_path) is True
+    assert store.get(2)["product_stock"] == 3
+    # replayed again over newer stock (e.g. a second start-up), it changes nothing
+    store.put_many([_product(2, product_stock=1, version=3)])
+    (tmp_path / f"{JOURNAL_PREFIX}.{'1' * 32}.json").write_text(json.dumps({"ops": [
+        {"op": "put_products", "path": str(store.path), "products": [_product(2, product_stock=3, version=2)]},
+    ]}), encoding="utf-8")
+    assert recover_journal(tmp_path) is True
+    assert (store.get(2)["product_stock"], store.get(2)["version"]) == (1, 3)
+
+
+def test_migration_round_trip(store, tmp_path):
+    other = tmp_path / ("copy.json" if store.path.suffix == ".db" else "copy.db")
+    assert migrate_products(store.path, other) == 6
+    back = tmp_path / f"back{store.path.suffix}"
+    migrate_products(other, back)
+    file_cache.invalidate()
+    assert get_product_store(other).load_all() == store.load_all() == get_product_store(back).load_all()
@@ -0,0 +1,57 @@
+import multiprocessing
+
+from functions.sequences import reserve_ids, next_id, sequence_path_for
+from functions.order_index import index_path_for
+from functions.customer_summary import summary_path_for
+from functions.customer_index import customer_index_path_for
+
+
+def test_layouts_sharing_a_stem_get_their_own_sidecars(tmp_path):
+    for sidecar_for in (sequence_path_for, index_path_for, summary_path_for, customer_index_path_for):
+        assert sidecar_for(tmp_path / "orders.json") != sidecar_for(tmp_path / "orders.jsonl")
+    assert sequence_path_for(tmp_path / "orders.jsonl").name == "orders.jsonl.seq.json"
+
+
+def test_each_layout_keeps_its_own_sequence(tmp_path):
+    assert next_id(tmp_path / "orders.json", seed=lambda: 10) == 10
+    assert next_id(tmp_path / "orders.jsonl", seed=lambda: 500) == 500
+    assert next_id(tmp_path / "orders.json", seed=lambda: 1) == 11
+
+
+def _reserve_many(args):
+    data_path, rounds = args
+    return [i for _ in range(rounds) for i in reserve_ids(data_path, 3, seed=lambda: 1)]
+
+
+def test_reservations_from_parallel_processes_never_overlap(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    data_path = tmp_path / "customers.json"
+    with ctx.Pool(4) as pool:
+        batches = pool.map(_reserve_many, [(data_path, 25)] * 4)
+    ids = [i for batch in batches for i in batch]
+    assert sorted(ids) == list(range(1, 4 * 25 * 3 + 1))
+
+
+def test_the_seed_is_only_consulted_when_the_sequence_is_missing_or_unreadable(tmp_path):
+    data_path = tmp_path / "product_catalog.json"
+    calls = []
+    def seed():
+        calls.append(1)
+        return 20
+    assert list(reserve_ids(data_path, 2, seed=seed)) == [20, 21]
+    assert next_id(data_path, seed=seed) == 22
+    assert len(calls) == 1
+    sequence_path_for(data_path).write_text("{not json", encoding="utf-8")
+    assert next_id(data_path, seed=seed) == 20 and len(calls) == 2
+    assert list(reserve_ids(data_path, 0, seed=seed)) == [] and next_id(data_path, seed=seed) == 21
+
+
+def test_new_records_get_ids_from_the_sequence(tmp_path, products_path):
+    from functions.order_manager import add_order, delete_order
+    orders_path = tmp_path / "orders.json"
+    first = add_order([{"product_id": 1, "qty": 1}], customer_id=1, orders_path=orders_path, products_path=products_path)
+    second = add_order([{"product_id": 1, "qty": 1}], customer_id=1, orders_path=orders_path, products_path=products_path)
+    assert delete_order(second["order_id"], orders_path=orders_path, products_path=products_path)
+    third = add_order([{"product_id": 1, "qty": 1}], customer_id=1, orders_path=orders_path, products_path=products_path)
+    # a deleted id is never handed out again
+    assert [first["order_id"], second["order_id"], third["order_id"]] == [1, 2, 3]